@@ -0,0 +1,34 @@
+# backfill_summaries.py
+"""
+Backfill scan summaries: `cd app && python -m backfill_summaries`
+
+Fills the summary columns of finished scans saved before they existed
+(services/summary.py), in batches by id. Safe to re-run; --force
+recomputes rows that already have a summary.
+"""
+import argparse
+import logging
+
+from database import SessionLocal
+from services.summary import backfill_summaries
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill materialized scan summaries")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--force", action="store_true", help="recompute rows that already have a summary")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        count = backfill_summaries(db, batch_size=args.batch_size, force=args.force)
+    finally:
+        db.close()
+    logger.info(f"✅ Backfilled {count} scan summaries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# benchmarks/issue_writes.py
+"""
+Time to persist a scan's issues: per-object ORM adds vs the bulk writer.
+
+    cd app && python -m benchmarks.issue_writes --sizes 100 1000 10000
+    cd app && python -m benchmarks.issue_writes --latency-ms 20
+    cd app && DATABASE_URL=postgresql://... python -m benchmarks.issue_writes
+
+Each run replaces the issues of one scan and commits, as save_scan_results
+does. "orm" is the previous path (one db.add(ScanIssue(...)) per issue),
+"executemany" and "copy" are services/issue_writer.write_issues; "copy"
+only runs against PostgreSQL. Without DATABASE_URL a throwaway SQLite
+database is used, where round-trips are free; --latency-ms adds a sleep
+per statement sent through SQLAlchemy to approximate a remote database
+such as Supabase (COPY batches bypass that hook and are not delayed).
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+MODES = ("orm", "executemany", "copy")
+
+
+def make_issues(count: int):
+    impacts = ('critical', 'serious', 'moderate', 'minor')
+    return [
+        {
+            'code': f"color-contrast-{i % 30}",
+            'type': 'violation' if i % 4 else 'incomplete',
+            'message': f"Element {i} has insufficient color contrast of 3.1 (foreground #777, background #fff)",
+            'context': f'<span class="muted" id="n{i}">Posted 3 days ago</span>',
+            'selector': f"#n{i}",
+            'ai_recommendation': "Darken the text to at least #595959 to reach a 4.5:1 contrast ratio." if i % 3 else None,
+            'description': "Ensures the contrast between foreground and background colors meets WCAG 2 AA",
+            'impact': impacts[i % len(impacts)]
+        }
+        for i in range(count)
+    ]
+
+
+def orm_write(db, scan_id: int, issues):
+    """save_scan_results before the bulk writer"""
+    from models import ScanIssue
+    db.query(ScanIssue).filter(ScanIssue.scan_result_id == scan_id).delete()
+    for issue_data in issues:
+        db.add(ScanIssue(
+            scan_result_id=scan_id,
+            code=issue_data.get('code', ''),
+            type=issue_data.get('type', 'violation'),
+            message=issue_data.get('message', ''),
+            context=issue_data.get('context', ''),
+            selector=issue_data.get('selector', ''),
+            recommendation_text=issue_data.get('ai_recommendation') or issue_data.get('description', ''),
+            impact=issue_data.get('impact')
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Issue persistence benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    tmp = None
+    if not os.environ.get("DATABASE_URL"):
+        tmp = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+
+    import models  # noqa: F401 - registers the tables
+    from sqlalchemy import event
+    from database import SessionLocal, create_tables, engine
+    from models import ScanResult
+    from services.issue_writer import write_issues
+    create_tables()
+
+    statements = {'count': 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _round_trip(conn, cursor, statement, parameters, context, executemany):
+        statements['count'] += 1
+        if args.latency_ms:
+            time.sleep(args.latency_ms / 1000)
+
+    modes = [m for m in MODES if m != "copy" or engine.dialect.name == "postgresql"]
+    print(f"{engine.dialect.name}, latency {args.latency_ms} ms per statement, median of {args.repeat}")
+    print(f"{'issues':>7} {'mode':>12} {'seconds':>9} {'statements':>11} {'rows/s':>9}")
+    db = SessionLocal()
+    try:
+        scan = ScanResult(url="https://example.com/bench", status="completed")
+        db.add(scan)
+        db.commit()
+        scan_id = scan.id
+        for size in args.sizes:
+            issues = make_issues(size)
+            for mode in modes:
+                timings = []
+                for _ in range(args.repeat):
+                    statements['count'] = 0
+                    started = time.perf_counter()
+                    if mode == "orm":
+                        orm_write(db, scan_id, issues)
+                    else:
+                        write_issues(db, scan_id, issues, batch_size=args.batch_size, method=mode)
+                    db.commit()
+                    timings.append(time.perf_counter() - started)
+                    db.expunge_all()
+                seconds = statistics.median(timings)
+                print(f"{size:>7} {mode:>12} {seconds:>9.4f} {statements['count']:>11} {size / seconds:>9.0f}")
+    finally:
+        db.close()
+        if tmp is not None:
+            tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/pdf_memory.py
+"""
+Peak memory and time of PDF report rendering as the issue count grows.
+
+    cd app && python -m benchmarks.pdf_memory --sizes 1000 5000 20000
+
+Seeds one finished scan per size into a throwaway SQLite database and
+renders its PDF in a fresh process per run, reporting that process's
+peak RSS. "streaming" is services/report_store.render_report_pdf_file
+(batched query, chunked tables, output to a file); "single-table" is the
+previous approach of loading every issue and laying out one Table into
+an in-memory buffer; "grouped" is the streaming renderer with
+?group=code.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("streaming", "grouped", "single-table")
+TYPES = ('violation', 'incomplete', 'error', 'warning', 'notice')
+
+
+def seed(db_path: str, sizes):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    import models  # noqa: F401 - registers the tables
+    from database import SessionLocal, create_tables
+    from models import ScanIssue, ScanResult
+    create_tables()
+    db = SessionLocal()
+    scan_ids = {}
+    for size in sizes:
+        scan = ScanResult(url=f"https://example.com/{size}", status="completed")
+        db.add(scan)
+        db.flush()
+        db.execute(ScanIssue.__table__.insert(), [
+            {
+                'scan_result_id': scan.id,
+                'code': f"WCAG2AA.Principle1.Guideline1_{i % 40}.rule-{i % 40}",
+                'type': TYPES[i % len(TYPES)],
+                'message': f"Issue {i}: " + "element is missing an accessible name " * (1 + i % 3),
+                'context': f'<div id="n{i}" class="card">',
+                'selector': f"#n{i}",
+                'recommendation_text': "Add an aria-label or visible text that describes the control. " * (1 + i % 2)
+            }
+            for i in range(size)
+        ])
+        scan_ids[size] = scan.id
+    db.commit()
+    db.close()
+    return scan_ids
+
+
+def _single_table(scan_id: int) -> int:
+    """The pre-chunking renderer: every issue in one Table, built into BytesIO"""
+    import io
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table
+    from database import SessionLocal
+    from models import ScanIssue
+    db = SessionLocal()
+    rows = db.query(ScanIssue).filter(ScanIssue.scan_result_id == scan_id).order_by(ScanIssue.id).all()
+    data = [['Type', 'WCAG Code', 'Issue Description', 'AI Recommendation']] + [
+        [r.type.upper(), r.code[:35], r.message, r.recommendation_text] for r in rows
+    ]
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    doc.build([Table(data, colWidths=[0.6*inch, 1.3*inch, 2.5*inch, 2.5*inch], repeatRows=1)])
+    db.close()
+    return len(buffer.getvalue())
+
+
+def child(mode: str, scan_id: int, db_path: str):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["CPU_POOL_WORKERS"] = "0"
+    from services.report_store import render_report_pdf_file
+    started = time.perf_counter()
+    if mode == "single-table":
+        size = _single_table(scan_id)
+    else:
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        try:
+            size = render_report_pdf_file(scan_id, path, grouped=(mode == "grouped"))
+        finally:
+            os.unlink(path)
+    elapsed = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'seconds': round(elapsed, 2), 'peak_rss_mb': round(peak_kb / 1024, 1), 'pdf_kb': size // 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF report rendering memory benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "SCAN_ID", "DB"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, scan_id, db_path = args.child
+        return child(mode, int(scan_id), db_path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        scan_ids = seed(db_path, args.sizes)
+        print(f"{'issues':>8} {'mode':>13} {'seconds':>8} {'peak RSS MB':>12} {'PDF KB':>8}")
+        for size in args.sizes:
+            for mode in args.modes:
+                out = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.pdf_memory", "--child", mode, str(scan_ids[size]), db_path],
+                    capture_output=True, text=True
+                )
+                if out.returncode != 0:
+                    print(f"{size:>8} {mode:>13} failed: {out.stderr.strip().splitlines()[-1]}")
+                    continue
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+                print(f"{size:>8} {mode:>13} {result['seconds']:>8} {result['peak_rss_mb']:>12} {result['pdf_kb']:>8}")
+
+
+if __name__ == "__main__":
+    main()
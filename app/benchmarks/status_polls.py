@@ -0,0 +1,206 @@
+# benchmarks/status_polls.py
+"""
+Latency of many concurrent GET /scan/{id}/status polls: the route on the
+old synchronous Session vs the current one on AsyncSession.
+
+    cd app && python -m benchmarks.status_polls
+    cd app && python -m benchmarks.status_polls --requests 4000 --query-delay-ms 5
+
+Serves one uvicorn worker with the real status route (/api/v1/...,
+"async") and a copy of the route as it was before, calling the sync
+Session from async def ("sync"), over a throwaway SQLite database of
+pending scans. Each mode gets the same polls with --concurrency in
+flight. --query-delay-ms makes every statement take that much longer
+inside the thread that executes it (a SQLite progress handler), as a
+remote database would: the sync driver waits on the event loop,
+aiosqlite in its connection thread.
+
+Both engines get a pool of --concurrency connections. With fewer, the
+sync route blocks the event loop waiting for a connection that is only
+returned once the loop runs again, and requests stall for DB_POOL_TIMEOUT
+before failing.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("sync", "async")
+
+
+def install_query_delay(sync_engine, seconds: float):
+    """Delay every statement of the engine by seconds, in the thread running it"""
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(dbapi_connection, record):
+        state = record.info['query_delay'] = {'pending': False}
+
+        def handler():
+            if state['pending']:
+                state['pending'] = False
+                time.sleep(seconds)
+            return 0
+
+        if hasattr(dbapi_connection, 'run_async'):
+            # aiosqlite: registered through (and run on) its connection thread
+            dbapi_connection.run_async(lambda connection: connection.set_progress_handler(handler, 1))
+        else:
+            dbapi_connection.set_progress_handler(handler, 1)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        state = conn.connection.info.get('query_delay')
+        if state is not None:
+            state['pending'] = True
+
+
+def create_app():
+    """The API plus the pre-AsyncSession status route under /legacy"""
+    from fastapi import Depends, HTTPException
+    from sqlalchemy.orm import Session
+    import database
+    from database import get_db
+    from main import app
+    from models import ScanResult
+    from services.admission import estimate_wait_seconds, queue_position, recent_scan_seconds
+    from services.progress import event_from_row
+
+    delay = float(os.environ.get("BENCH_QUERY_DELAY_MS", "0")) / 1000
+    if delay:
+        install_query_delay(database.engine, delay)
+        install_query_delay(database.get_async_engine().sync_engine, delay)
+        # Connections opened by create_tables predate the handler
+        database.engine.dispose()
+
+    @app.get("/legacy/scan/{scan_id}/status")
+    async def legacy_scan_status(scan_id: int, db: Session = Depends(get_db)):
+        scan = db.get(ScanResult, scan_id)
+        if not scan:
+            raise HTTPException(status_code=404, detail="Scan not found")
+        progress = event_from_row(scan)
+        position = queue_position(db, scan)
+        return {
+            "scan_id": scan_id,
+            "status": scan.status,
+            "stage": progress['stage'],
+            "queue_position": position,
+            "estimated_wait_seconds": estimate_wait_seconds(position, recent_scan_seconds(db)) if position else None
+        }
+
+    return app
+
+
+if os.environ.get("BENCH_STATUS_POLLS_APP"):
+    app = create_app()
+
+
+def seed(scans: int):
+    import models  # noqa: F401 - registers the tables
+    from database import SessionLocal, create_tables
+    from models import ScanResult
+    create_tables()
+    db = SessionLocal()
+    try:
+        db.add_all(ScanResult(url=f"https://example.com/{i}", status="pending") for i in range(scans))
+        db.commit()
+    finally:
+        db.close()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def poll(base: str, path: str, scans: int, requests: int, concurrency: int):
+    import httpx
+    latencies, errors = [], []
+    gate = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        async def one(i):
+            async with gate:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path.format(id=i % scans + 1))
+                    response.raise_for_status()
+                except httpx.HTTPError as e:
+                    errors.append(e)
+                latencies.append(time.perf_counter() - started)
+
+        # Warm up connections and the engines' pools
+        await asyncio.gather(*(one(i) for i in range(concurrency)))
+        latencies.clear()
+        errors.clear()
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'p50': statistics.median(latencies) * 1000,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'p99': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'max': latencies[-1] * 1000,
+        'rps': len(latencies) / elapsed,
+        'errors': len(errors)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent status poll latency, sync vs async DB session")
+    parser.add_argument("--scans", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--query-delay-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            BENCH_STATUS_POLLS_APP="1",
+            BENCH_QUERY_DELAY_MS=str(args.query_delay_ms),
+            SCAN_DISPATCH="queue",
+            DB_POOL_SIZE=str(args.concurrency),
+            DB_MAX_OVERFLOW="0"
+        )
+        os.environ["DATABASE_URL"] = env["DATABASE_URL"]
+        seed(args.scans)
+
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "benchmarks.status_polls:app", "--port", str(port), "--log-level", "warning"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        base = f"http://127.0.0.1:{port}"
+        try:
+            import httpx
+            for _ in range(300):
+                try:
+                    httpx.get(f"{base}/api/v1/scan/1/status", timeout=1).raise_for_status()
+                    break
+                except httpx.HTTPError:
+                    time.sleep(0.1)
+            else:
+                raise RuntimeError("benchmark server did not start")
+
+            print(f"{args.requests} polls, {args.concurrency} in flight, +{args.query_delay_ms} ms per query, SQLite")
+            print(f"{'mode':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'req/s':>8} {'errors':>7}")
+            paths = {'sync': "/legacy/scan/{id}/status", 'async': "/api/v1/scan/{id}/status"}
+            for mode in MODES:
+                result = asyncio.run(poll(base, paths[mode], args.scans, args.requests, args.concurrency))
+                print(f"{mode:>6} {result['p50']:>8.1f} {result['p95']:>8.1f} {result['p99']:>8.1f} {result['max']:>8.1f} {result['rps']:>8.0f} {result['errors']:>7}")
+        finally:
+            server.kill()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 # app/config.py
 import os
+from typing import Dict
 from pydantic_settings import BaseSettings
 from pydantic import Field
 from urllib.parse import urlparse
@@ -20,7 +21,102 @@ class Settings(BaseSettings):
     # URLs
     frontend_url: str = Field("http://localhost:3000", alias="FRONTEND_URL")
     backend_url: str = Field("http://localhost:8000", alias="RENDER_EXTERNAL_URL")
-    
+
+    # Browser pool (Playwright)
+    browser_pool_size: int = Field(1, alias="BROWSER_POOL_SIZE")
+    browser_max_pages: int = Field(50, alias="BROWSER_MAX_PAGES")
+    browser_max_rss_mb: int = Field(768, alias="BROWSER_MAX_RSS_MB")  # per slot browser
+    playwright_on_heroku: bool = Field(False, alias="PLAYWRIGHT_ON_HEROKU")
+
+    # Scan engine: "async" runs scans on the API event loop, "sync" in BackgroundTasks threads
+    scan_engine: str = Field("async", alias="SCAN_ENGINE")
+    async_scan_concurrency: int = Field(10, alias="ASYNC_SCAN_CONCURRENCY")
+
+    # Fallback scanner HTML parser: auto, selectolax, lxml or html.parser
+    html_parser: str = Field("auto", alias="HTML_PARSER")
+
+    # Fallback page fetch limits
+    fetch_max_bytes: int = Field(5 * 1024 * 1024, alias="FETCH_MAX_BYTES")
+    fetch_max_seconds: float = Field(20.0, alias="FETCH_MAX_SECONDS")
+
+    # Shared outbound HTTP client
+    http_max_connections: int = Field(100, alias="HTTP_MAX_CONNECTIONS")
+    http_max_keepalive_connections: int = Field(20, alias="HTTP_MAX_KEEPALIVE_CONNECTIONS")
+    http_keepalive_expiry: float = Field(30.0, alias="HTTP_KEEPALIVE_EXPIRY")
+    http2_enabled: bool = Field(True, alias="HTTP2_ENABLED")
+    dns_cache_ttl: float = Field(300.0, alias="DNS_CACHE_TTL")
+
+    # Result cache for repeat scans of unchanged pages: in-process LRU in front of the scans table
+    result_cache_enabled: bool = Field(True, alias="RESULT_CACHE_ENABLED")
+    result_cache_max_entries: int = Field(500, alias="RESULT_CACHE_MAX_ENTRIES")
+    result_cache_ttl: float = Field(6 * 3600.0, alias="RESULT_CACHE_TTL")
+
+    # Scan start coalescing: reuse scans finished this recently, expire stuck in-flight scans
+    scan_reuse_window_seconds: int = Field(300, alias="SCAN_REUSE_WINDOW_SECONDS")
+    scan_inflight_timeout_seconds: int = Field(1800, alias="SCAN_INFLIGHT_TIMEOUT_SECONDS")
+
+    # Scan dispatch: "inline" runs scans in the web process, "queue" hands them to `python -m worker`
+    scan_dispatch: str = Field("inline", alias="SCAN_DISPATCH")
+    worker_concurrency: int = Field(2, alias="WORKER_CONCURRENCY")
+    worker_poll_interval: float = Field(2.0, alias="WORKER_POLL_INTERVAL")
+    job_lease_seconds: int = Field(120, alias="JOB_LEASE_SECONDS")
+    job_max_attempts: int = Field(3, alias="JOB_MAX_ATTEMPTS")
+
+    # CPU process pool for HTML analysis, report serialization and PDF rendering (0 = inline)
+    cpu_pool_workers: int = Field(1, alias="CPU_POOL_WORKERS")
+    cpu_pool_start_method: str = Field("spawn", alias="CPU_POOL_START_METHOD")
+    cpu_offload_min_bytes: int = Field(256 * 1024, alias="CPU_OFFLOAD_MIN_BYTES")
+    cpu_offload_min_rows: int = Field(500, alias="CPU_OFFLOAD_MIN_ROWS")
+
+    # Admission control for new scans (0 disables a limit)
+    scan_max_concurrent: int = Field(10, alias="SCAN_MAX_CONCURRENT")
+    scan_max_pending: int = Field(50, alias="SCAN_MAX_PENDING")
+    scan_max_per_client: int = Field(3, alias="SCAN_MAX_PER_CLIENT")
+    # Proxies in front of the app that append to X-Forwarded-For (Heroku/Render router: 1; none: 0)
+    trusted_proxy_count: int = Field(1, alias="TRUSTED_PROXY_COUNT")
+
+    # Queue scheduler: per-host cap, aging, client weights (JSON, e.g. {"10.0.0.1": 2}); SCAN_DISPATCH=queue only
+    scan_max_per_host: int = Field(4, alias="SCAN_MAX_PER_HOST")
+    scheduler_aging_seconds: int = Field(120, alias="SCHEDULER_AGING_SECONDS")
+    scheduler_fair_window_seconds: int = Field(300, alias="SCHEDULER_FAIR_WINDOW_SECONDS")
+    scheduler_histogram_window_seconds: int = Field(3600, alias="SCHEDULER_HISTOGRAM_WINDOW_SECONDS")
+    scheduler_client_weights: Dict[str, float] = Field(default_factory=dict, alias="SCHEDULER_CLIENT_WEIGHTS")
+
+    # Wall-clock budget of one scan across fetch, browser, analysis and AI; results so far are kept
+    scan_deadline_seconds: float = Field(120.0, alias="SCAN_DEADLINE_SECONDS")
+
+    # Progress events: DB write coalescing and polling for scans running in other processes
+    progress_flush_seconds: float = Field(1.0, alias="PROGRESS_FLUSH_SECONDS")
+    progress_poll_seconds: float = Field(1.0, alias="PROGRESS_POLL_SECONDS")
+    sse_keepalive_seconds: float = Field(15.0, alias="SSE_KEEPALIVE_SECONDS")
+
+    # Issues per rule with their elements: "rule", "template" (rule and element template) or "none" (one per element)
+    issue_grouping: str = Field("rule", alias="ISSUE_GROUPING")
+
+    # Issue persistence: "auto" (COPY on PostgreSQL, else executemany), "copy" or "executemany"
+    issue_write_method: str = Field("auto", alias="ISSUE_WRITE_METHOD")
+    issue_write_batch_size: int = Field(1000, alias="ISSUE_WRITE_BATCH_SIZE")
+
+    # Rendered PDF reports: "local" disk store, "none", or "module:factory" for another backend
+    report_artifact_backend: str = Field("local", alias="REPORT_ARTIFACT_BACKEND")
+    report_artifact_dir: str = Field("./report_artifacts", alias="REPORT_ARTIFACT_DIR")
+    report_artifact_max_bytes: int = Field(512 * 1024 * 1024, alias="REPORT_ARTIFACT_MAX_BYTES")
+    report_artifact_max_age_seconds: float = Field(30 * 24 * 3600.0, alias="REPORT_ARTIFACT_MAX_AGE_SECONDS")
+    report_prerender: bool = Field(True, alias="REPORT_PRERENDER")
+
+    # Database pools, per engine and process (sync + async engine in each of 4 web workers, plus
+    # each scan worker): keep 8 x (size + overflow) + workers under the database's connection limit
+    db_pool_mode: str = Field("queue", alias="DB_POOL_MODE")  # "queue", or "null" behind PgBouncer
+    db_pool_size: int = Field(3, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(2, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: float = Field(30.0, alias="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(300, alias="DB_POOL_RECYCLE")
+    # Pre-ping on checkout: "always", "idle" (idle longer than DB_PRE_PING_IDLE_SECONDS) or "never"
+    db_pre_ping: str = Field("idle", alias="DB_PRE_PING")
+    db_pre_ping_idle_seconds: float = Field(30.0, alias="DB_PRE_PING_IDLE_SECONDS")
+    # PgBouncer in transaction mode: no prepared statements kept across transactions
+    db_pgbouncer: bool = Field(False, alias="DB_PGBOUNCER")
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -1,9 +1,14 @@
 import os
+from typing import Optional
 from sqlalchemy import create_engine, text  # ADDED: import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import logging
 
+from services.db_pool import describe as describe_pools, engine_options, instrument, pgbouncer_connect_args
+
 logger = logging.getLogger(__name__)
 
 DATABASE_URL = os.environ.get('DATABASE_URL')
@@ -19,11 +24,10 @@ if DATABASE_URL.startswith('postgres://'):
 logger.info(f"Connecting to: {DATABASE_URL.split('@')[-1].split('?')[0]}")
 
 try:
-    # Base engine configuration
+    # Base engine configuration; pool sizing and pre-ping come from Settings (services/db_pool.py)
     engine_config = {
-        'pool_pre_ping': True,
-        'pool_recycle': 300,
-        'echo': False
+        'echo': False,
+        **engine_options('sync')
     }
     
     # ADD THIS: Check if it's Supabase and add SSL requirement
@@ -35,6 +39,7 @@ try:
         }
     
     engine = create_engine(DATABASE_URL, **engine_config)
+    instrument('sync', engine)
     
     # FIXED: Wrap raw SQL in text()
     with engine.connect() as conn:
@@ -49,10 +54,13 @@ except Exception as e:
     logger.info("🔄 Falling back to SQLite")
     
     DATABASE_URL = "sqlite:///./adaptivetest.db"
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False}, **engine_options('sync'))
+    instrument('sync', engine)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     Base = declarative_base()
 
+logger.info(f"🔌 Database pools: {describe_pools()}")
+
 def get_db():
     db = SessionLocal()
     try:
@@ -60,6 +68,64 @@ def get_db():
     finally:
         db.close()
 
+# Async engine for the API routes, so a slow query no longer blocks the event loop.
+# Same database as the sync engine above (including its SQLite fallback), through
+# asyncpg / aiosqlite; the sync engine stays for the scanner, the worker and CLIs.
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+
+_async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+
+def async_database_url(url: str):
+    """DATABASE_URL with its async driver, and the connect_args that driver needs"""
+    url = make_url(url)
+    connect_args = {}
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {backend} databases")
+    url = url.set(drivername=ASYNC_DRIVERS[backend])
+    if backend == 'postgresql':
+        # asyncpg takes ssl instead of libpq's sslmode
+        sslmode = url.query.get('sslmode')
+        if sslmode:
+            url = url.difference_update_query(['sslmode'])
+            connect_args['ssl'] = sslmode
+        if 'supabase' in str(url.host):
+            connect_args.setdefault('ssl', 'require')
+            connect_args['timeout'] = 30
+        connect_args.update(pgbouncer_connect_args(url.get_driver_name()))
+    return url, connect_args
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine, AsyncSessionLocal
+    if _async_engine is None:
+        url, connect_args = async_database_url(DATABASE_URL)
+        # aiosqlite runs each connection in a non-daemon thread: pooled ones would keep
+        # scripts that never dispose the engine from exiting, and SQLite connects cheaply
+        pooled = url.get_backend_name() != 'sqlite'
+        options = engine_options('async', asynchronous=True, pooled=pooled)
+        _async_engine = create_async_engine(url, connect_args=connect_args, **options)
+        instrument('async', _async_engine.sync_engine)
+        AsyncSessionLocal = async_sessionmaker(_async_engine, expire_on_commit=False, autoflush=False)
+        logger.info(f"⚡ Async database engine: {url.drivername}")
+    return _async_engine
+
+async def get_async_db():
+    """
+    AsyncSession for async routes. Objects stay loaded after commit
+    (no implicit lazy loads); sync service code runs on it through
+    `await db.run_sync(fn, ...)`, which passes fn a regular Session.
+    """
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def dispose_async_engine():
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+
 def create_tables():
     try:
         Base.metadata.create_all(bind=engine)
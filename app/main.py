@@ -2,7 +2,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
-from routes import scan, scan_results
+from routes import scan, scan_results, system
 from config import settings
 from database import create_tables
 import logging
@@ -91,13 +91,33 @@ async def startup_event():
         logger.info(f"📋 CORS configured for {len(allowed_origins)} origins")
         logger.info(f"🌐 Frontend URL: {settings.frontend_url}")
         logger.info(f"🏷️ Environment: {settings.env}")
+        if settings.scan_dispatch != "queue":
+            logger.warning(
+                "⚠️ SCAN_DISPATCH=inline: scans run in arrival order in the web process; priority classes, "
+                "client weights and SCAN_MAX_PER_HOST are ignored (set SCAN_DISPATCH=queue and run `python -m worker`)"
+            )
     except Exception as e:
         logger.error(f"❌ Startup failed: {e}")
         logger.error(traceback.format_exc())
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Close pooled browsers so Chromium processes don't outlive the worker
+    from services.browser_pool import shutdown_browser_pool
+    from services.async_scanner import shutdown_async_engine
+    from services.http_client import close_fetch_client
+    from services.executor import shutdown_cpu_executor
+    shutdown_browser_pool()
+    close_fetch_client()
+    shutdown_cpu_executor()
+    await shutdown_async_engine()
+    from database import dispose_async_engine
+    await dispose_async_engine()
+
 # Routers
 app.include_router(scan.router, prefix="/api/v1", tags=["scans"])
 app.include_router(scan_results.router, prefix="/api/v1", tags=["results"])
+app.include_router(system.router, prefix="/api/v1", tags=["system"])
 
 @app.get("/")
 def root():
@@ -0,0 +1,45 @@
+"""Add materialized summary columns to scan_results
+
+Revision ID: a3c9f0d2e6b4
+Revises: f2b8d6c41a09
+Create Date: 2026-10-18 15:20:00.000000
+
+Existing finished scans keep NULL summaries until `python -m backfill_summaries` runs.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9f0d2e6b4'
+down_revision: Union[str, Sequence[str], None] = 'f2b8d6c41a09'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scan_results', sa.Column('issue_count', sa.Integer(), nullable=True))
+    op.add_column('scan_results', sa.Column('error_count', sa.Integer(), nullable=True))
+    op.add_column('scan_results', sa.Column('warning_count', sa.Integer(), nullable=True))
+    op.add_column('scan_results', sa.Column('notice_count', sa.Integer(), nullable=True))
+    op.add_column('scan_results', sa.Column('accessibility_score', sa.Integer(), nullable=True))
+    op.add_column('scan_results', sa.Column('type_counts', sa.Text(), nullable=True))
+    op.add_column('scan_results', sa.Column('impact_counts', sa.Text(), nullable=True))
+    op.add_column('scan_results', sa.Column('engine', sa.String(), nullable=True))
+    op.add_column('scan_results', sa.Column('duration_seconds', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('scan_results', 'duration_seconds')
+    op.drop_column('scan_results', 'engine')
+    op.drop_column('scan_results', 'impact_counts')
+    op.drop_column('scan_results', 'type_counts')
+    op.drop_column('scan_results', 'accessibility_score')
+    op.drop_column('scan_results', 'notice_count')
+    op.drop_column('scan_results', 'warning_count')
+    op.drop_column('scan_results', 'error_count')
+    op.drop_column('scan_results', 'issue_count')
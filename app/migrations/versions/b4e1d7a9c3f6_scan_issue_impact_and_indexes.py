@@ -0,0 +1,36 @@
+"""Add impact to scan_issues and indexes for paginated, filtered reports
+
+Revision ID: b4e1d7a9c3f6
+Revises: a3c9f0d2e6b4
+Create Date: 2026-10-18 16:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e1d7a9c3f6'
+down_revision: Union[str, Sequence[str], None] = 'a3c9f0d2e6b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scan_issues', sa.Column('impact', sa.String(), nullable=True))
+    op.create_index('ix_scan_issues_scan_id', 'scan_issues', ['scan_result_id', 'id'], unique=False)
+    op.create_index('ix_scan_issues_scan_type', 'scan_issues', ['scan_result_id', 'type', 'id'], unique=False)
+    op.create_index('ix_scan_issues_scan_code', 'scan_issues', ['scan_result_id', 'code', 'id'], unique=False)
+    op.create_index('ix_scan_issues_scan_impact', 'scan_issues', ['scan_result_id', 'impact', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_scan_issues_scan_impact', table_name='scan_issues')
+    op.drop_index('ix_scan_issues_scan_code', table_name='scan_issues')
+    op.drop_index('ix_scan_issues_scan_type', table_name='scan_issues')
+    op.drop_index('ix_scan_issues_scan_id', table_name='scan_issues')
+    op.drop_column('scan_issues', 'impact')
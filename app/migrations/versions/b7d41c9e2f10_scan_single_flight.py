@@ -0,0 +1,46 @@
+"""Single-flight scan starts: idempotency key, completed_at, in-flight URL index
+
+Revision ID: b7d41c9e2f10
+Revises: 92910472b491
+Create Date: 2026-10-18 09:12:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41c9e2f10'
+down_revision: Union[str, Sequence[str], None] = '92910472b491'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+IN_FLIGHT = sa.text("status IN ('pending', 'scanning')")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scan_results', sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('scan_results', sa.Column('idempotency_key', sa.String(), nullable=True))
+    op.create_unique_constraint('uq_scan_results_idempotency_key', 'scan_results', ['idempotency_key'])
+
+    # Older rows may hold several in-flight scans of one URL; keep only the newest
+    op.execute(
+        "UPDATE scan_results SET status = 'failed' "
+        "WHERE status IN ('pending', 'scanning') AND id NOT IN ("
+        "SELECT MAX(id) FROM scan_results WHERE status IN ('pending', 'scanning') GROUP BY url)"
+    )
+    op.create_index(
+        'uq_scan_results_inflight_url', 'scan_results', ['url'], unique=True,
+        postgresql_where=IN_FLIGHT, sqlite_where=IN_FLIGHT
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_scan_results_inflight_url', table_name='scan_results')
+    op.drop_constraint('uq_scan_results_idempotency_key', 'scan_results', type_='unique')
+    op.drop_column('scan_results', 'idempotency_key')
+    op.drop_column('scan_results', 'completed_at')
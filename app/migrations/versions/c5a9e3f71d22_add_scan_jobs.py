@@ -0,0 +1,48 @@
+"""Add scan_jobs table for the database-backed scan queue
+
+Revision ID: c5a9e3f71d22
+Revises: b7d41c9e2f10
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a9e3f71d22'
+down_revision: Union[str, Sequence[str], None] = 'b7d41c9e2f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('scan_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('scan_result_id', sa.Integer(), nullable=False),
+    sa.Column('url', sa.String(), nullable=False),
+    sa.Column('state', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('available_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('worker_id', sa.String(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['scan_result_id'], ['scan_results.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('scan_result_id')
+    )
+    op.create_index(op.f('ix_scan_jobs_id'), 'scan_jobs', ['id'], unique=False)
+    op.create_index('ix_scan_jobs_claim', 'scan_jobs', ['state', 'available_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_scan_jobs_claim', table_name='scan_jobs')
+    op.drop_index(op.f('ix_scan_jobs_id'), table_name='scan_jobs')
+    op.drop_table('scan_jobs')
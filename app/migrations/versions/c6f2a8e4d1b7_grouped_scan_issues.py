@@ -0,0 +1,31 @@
+"""Store scan issues grouped per rule with their occurrences
+
+Revision ID: c6f2a8e4d1b7
+Revises: b4e1d7a9c3f6
+Create Date: 2026-10-18 18:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6f2a8e4d1b7'
+down_revision: Union[str, Sequence[str], None] = 'b4e1d7a9c3f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows are single elements; NULL reads as one occurrence
+    op.add_column('scan_issues', sa.Column('occurrence_count', sa.Integer(), nullable=True))
+    op.add_column('scan_issues', sa.Column('occurrences', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('scan_issues', 'occurrences')
+    op.drop_column('scan_issues', 'occurrence_count')
@@ -0,0 +1,30 @@
+"""Add started_at and client_id to scan_results for admission control
+
+Revision ID: d81f4b6a0c37
+Revises: c5a9e3f71d22
+Create Date: 2026-10-18 11:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f4b6a0c37'
+down_revision: Union[str, Sequence[str], None] = 'c5a9e3f71d22'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scan_results', sa.Column('started_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('scan_results', sa.Column('client_id', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('scan_results', 'client_id')
+    op.drop_column('scan_results', 'started_at')
@@ -0,0 +1,53 @@
+"""Indexes for the hot scan_results and scan_issues queries
+
+Revision ID: d9a4b2c7e5f3
+Revises: c6f2a8e4d1b7
+Create Date: 2026-10-18 20:05:00.000000
+
+Built with CREATE INDEX CONCURRENTLY on PostgreSQL so scans keep being
+written while the indexes build; that cannot run inside a transaction,
+hence the autocommit block. A concurrent build that fails leaves an
+INVALID index behind: drop it and run the upgrade again.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a4b2c7e5f3'
+down_revision: Union[str, Sequence[str], None] = 'c6f2a8e4d1b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INFLIGHT = sa.text("status IN ('pending', 'scanning')")
+COMPLETED = sa.text("status = 'completed'")
+RECOMMENDED = sa.text("recommendation_text IS NOT NULL")
+
+# name, table, columns, dialect options; must match app/models
+INDEXES = (
+    ('ix_scan_results_status', 'scan_results', ['status', 'id'], {}),
+    ('ix_scan_results_inflight_client', 'scan_results', ['client_id'],
+     {'postgresql_where': INFLIGHT, 'sqlite_where': INFLIGHT}),
+    ('ix_scan_results_completed_url', 'scan_results', ['url', 'completed_at'],
+     {'postgresql_where': COMPLETED, 'sqlite_where': COMPLETED}),
+    ('ix_scan_results_completed_at', 'scan_results', ['completed_at'],
+     {'postgresql_include': ['started_at'], 'postgresql_where': COMPLETED, 'sqlite_where': COMPLETED}),
+    ('ix_scan_issues_recommended_code', 'scan_issues', ['code'],
+     {'postgresql_where': RECOMMENDED, 'sqlite_where': RECOMMENDED}),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, **options)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,34 @@
+"""Add scheduling columns to scan_jobs
+
+Revision ID: e4c7a2b95f18
+Revises: d81f4b6a0c37
+Create Date: 2026-10-18 12:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4c7a2b95f18'
+down_revision: Union[str, Sequence[str], None] = 'd81f4b6a0c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scan_jobs', sa.Column('priority', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('scan_jobs', sa.Column('client_id', sa.String(), nullable=True))
+    op.add_column('scan_jobs', sa.Column('host', sa.String(), nullable=True))
+    op.add_column('scan_jobs', sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('scan_jobs', 'claimed_at')
+    op.drop_column('scan_jobs', 'host')
+    op.drop_column('scan_jobs', 'client_id')
+    op.drop_column('scan_jobs', 'priority')
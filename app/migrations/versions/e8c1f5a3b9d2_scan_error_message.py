@@ -0,0 +1,32 @@
+"""Add error_message to scan_results
+
+Revision ID: e8c1f5a3b9d2
+Revises: d9a4b2c7e5f3
+Create Date: 2026-10-19 10:15:00.000000
+
+Scans whose page or axe-core failed are saved as completed with no
+issues; error_message keeps them from being reused as a clean result.
+Existing ones are recognizable by their 'error' engine.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c1f5a3b9d2'
+down_revision: Union[str, Sequence[str], None] = 'd9a4b2c7e5f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scan_results', sa.Column('error_message', sa.Text(), nullable=True))
+    op.execute("UPDATE scan_results SET error_message = 'Scan failed' WHERE engine = 'error'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('scan_results', 'error_message')
@@ -0,0 +1,32 @@
+"""Add progress columns to scan_results for phase-level progress events
+
+Revision ID: f2b8d6c41a09
+Revises: e4c7a2b95f18
+Create Date: 2026-10-18 14:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d6c41a09'
+down_revision: Union[str, Sequence[str], None] = 'e4c7a2b95f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scan_results', sa.Column('phase', sa.String(), nullable=True))
+    op.add_column('scan_results', sa.Column('progress', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('scan_results', sa.Column('progress_detail', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('scan_results', 'progress_detail')
+    op.drop_column('scan_results', 'progress')
+    op.drop_column('scan_results', 'phase')
@@ -0,0 +1,51 @@
+"""Store the scanned page's hash and validators on scan_results
+
+Revision ID: f6a2c9d4b8e1
+Revises: e8c1f5a3b9d2
+Create Date: 2026-10-19 14:40:00.000000
+
+The result cache looks up the latest completed, error-free scan of a
+page per engine in the database, so repeat scans of an unchanged page
+reuse its issues across processes and restarts. Scans from before this
+revision have no content_hash and are never reused.
+
+The index is built with CREATE INDEX CONCURRENTLY on PostgreSQL, as in
+d9a4b2c7e5f3.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a2c9d4b8e1'
+down_revision: Union[str, Sequence[str], None] = 'e8c1f5a3b9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match app/models
+REUSABLE = sa.text("status = 'completed' AND content_hash IS NOT NULL AND error_message IS NULL")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scan_results', sa.Column('normalized_url', sa.String(), nullable=True))
+    op.add_column('scan_results', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('scan_results', sa.Column('etag', sa.String(), nullable=True))
+    op.add_column('scan_results', sa.Column('last_modified', sa.String(), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_scan_results_reusable', 'scan_results', ['normalized_url', 'engine', 'completed_at'],
+            unique=False, postgresql_concurrently=True, postgresql_where=REUSABLE, sqlite_where=REUSABLE
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_scan_results_reusable', table_name='scan_results', postgresql_concurrently=True)
+    op.drop_column('scan_results', 'last_modified')
+    op.drop_column('scan_results', 'etag')
+    op.drop_column('scan_results', 'content_hash')
+    op.drop_column('scan_results', 'normalized_url')
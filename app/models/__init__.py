@@ -1,5 +1,5 @@
 # app/models/__init__.py
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, DateTime, Text, ForeignKey, Index, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -9,11 +9,73 @@ class ScanResult(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     url = Column(String, nullable=False)
-    status = Column(String, default="pending")  # pending, scanning, completed, failed
+    status = Column(String, default="pending")  # pending, scanning, completed, partial, cancelled, failed
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    idempotency_key = Column(String, nullable=True)
+    client_id = Column(String, nullable=True)  # submitting client, for per-client admission limits
+    phase = Column(String, nullable=True)  # pipeline stage, "done" once final (services/progress.py)
+    progress = Column(Integer, nullable=False, default=0, server_default='0')
+    progress_detail = Column(Text, nullable=True)  # JSON: message, elapsed, per-stage timings
+    error_message = Column(Text, nullable=True)  # why a scan produced no results (page or axe-core failure)
+    
+    # Summary materialized when the scan finishes (services/summary.py); NULL until then
+    issue_count = Column(Integer, nullable=True)
+    error_count = Column(Integer, nullable=True)
+    warning_count = Column(Integer, nullable=True)
+    notice_count = Column(Integer, nullable=True)
+    accessibility_score = Column(Integer, nullable=True)
+    type_counts = Column(Text, nullable=True)  # JSON: {issue type: count}
+    impact_counts = Column(Text, nullable=True)  # JSON: {impact: count}
+    engine = Column(String, nullable=True)
+    duration_seconds = Column(Float, nullable=True)
+    
+    # Page the results were computed from, for reuse by later scans (services/result_cache.py)
+    normalized_url = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=True)  # SHA-256; NULL when the results must not be reused
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
     
     # Relationship
     issues = relationship("ScanIssue", back_populates="scan_result")
+    
+    __table_args__ = (
+        UniqueConstraint('idempotency_key', name='uq_scan_results_idempotency_key'),
+        # At most one in-flight scan per URL; concurrent starts coalesce on it
+        Index(
+            'uq_scan_results_inflight_url', 'url', unique=True,
+            postgresql_where=text("status IN ('pending', 'scanning')"),
+            sqlite_where=text("status IN ('pending', 'scanning')")
+        ),
+        # Status filters and counts: scan list, admission, queue position, backfill
+        Index('ix_scan_results_status', 'status', 'id'),
+        # Per-client admission limit, over in-flight scans only
+        Index(
+            'ix_scan_results_inflight_client', 'client_id',
+            postgresql_where=text("status IN ('pending', 'scanning')"),
+            sqlite_where=text("status IN ('pending', 'scanning')")
+        ),
+        # Reuse of a recent completed scan of a URL (services/single_flight.py)
+        Index(
+            'ix_scan_results_completed_url', 'url', 'completed_at',
+            postgresql_where=text("status = 'completed'"),
+            sqlite_where=text("status = 'completed'")
+        ),
+        # Latest reusable results of a page per engine (services/result_cache.py)
+        Index(
+            'ix_scan_results_reusable', 'normalized_url', 'engine', 'completed_at',
+            postgresql_where=text("status = 'completed' AND content_hash IS NOT NULL AND error_message IS NULL"),
+            sqlite_where=text("status = 'completed' AND content_hash IS NOT NULL AND error_message IS NULL")
+        ),
+        # Recent scan durations for Retry-After estimates, index-only on PostgreSQL
+        Index(
+            'ix_scan_results_completed_at', 'completed_at',
+            postgresql_include=['started_at'],
+            postgresql_where=text("status = 'completed'"),
+            sqlite_where=text("status = 'completed'")
+        ),
+    )
 
 class ScanIssue(Base):
     __tablename__ = "scan_issues"
@@ -26,6 +88,47 @@ class ScanIssue(Base):
     selector = Column(Text)
     type = Column(String, default="error")  # error, warning, notice
     recommendation_text = Column(Text)
+    impact = Column(String, nullable=True)  # axe impact: critical, serious, moderate, minor
+    occurrence_count = Column(Integer, nullable=True)  # elements of this rule; NULL (rows before grouping) = 1
+    occurrences = Column(Text, nullable=True)  # JSON [{selector, context}]; NULL for a single element
     
     # Relationship
-    scan_result = relationship("ScanResult", back_populates="issues") 
\ No newline at end of file
+    scan_result = relationship("ScanResult", back_populates="issues") 
+    
+    __table_args__ = (
+        # Keyset pages of one scan's issues, unfiltered or filtered on one column (services/issue_query.py)
+        Index('ix_scan_issues_scan_id', 'scan_result_id', 'id'),
+        Index('ix_scan_issues_scan_type', 'scan_result_id', 'type', 'id'),
+        Index('ix_scan_issues_scan_code', 'scan_result_id', 'code', 'id'),
+        Index('ix_scan_issues_scan_impact', 'scan_result_id', 'impact', 'id'),
+        # Recommendation cache lookup by rule (services/recommendations.py)
+        Index(
+            'ix_scan_issues_recommended_code', 'code',
+            postgresql_where=text("recommendation_text IS NOT NULL"),
+            sqlite_where=text("recommendation_text IS NOT NULL")
+        ),
+    )
+
+class ScanJob(Base):
+    __tablename__ = "scan_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    scan_result_id = Column(Integer, ForeignKey("scan_results.id"), nullable=False, unique=True)
+    url = Column(String, nullable=False)
+    state = Column(String, nullable=False, default="queued")  # queued, running, done, failed
+    priority = Column(Integer, nullable=False, default=0)  # 0 interactive, 1 batch, 2 recurring
+    client_id = Column(String, nullable=True)
+    host = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    available_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    worker_id = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index('ix_scan_jobs_claim', 'state', 'available_at'),
+    )
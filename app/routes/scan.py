@@ -1,22 +1,50 @@
 # app/routes/scan.py
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Header, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse, Response
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, HttpUrl
-from sqlalchemy.orm import Session
-import io
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal, Optional
+import asyncio
+import json
+import os
+import tempfile
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 import time
 
-from database import get_db
+from config import settings
+from database import SessionLocal, get_async_db
 from models import ScanResult, ScanIssue
 from services.scanner import scan_website_with_recommendations
+from services.async_scanner import scan_website_with_recommendations_async
+from services.single_flight import IdempotencyKeyConflict, start_or_attach
+from services.admission import (
+    AdmissionRejected, admit, client_identity, estimate_wait_seconds, queue_position, recent_scan_seconds,
+    wait_for_slot
+)
+from services.job_queue import enqueue_scan
+from services.scheduler import scan_priority
+from services.deadline import cancel_local_scan
+from services.progress import event_from_row, get_broadcaster, load_row_event
+from services.executor import run_cpu
+from services.reports import build_report, issue_dicts
+from services.issue_groups import occurrence_total
+from services.issue_query import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, SORTS, InvalidIssueQuery, IssueFilters, stream_issues
+from services.report_store import ensure_report_pdf, load_report_payload, render_report_pdf_file
+from services.artifacts import get_artifact_store
+from services.summary import count_issues, stored_summary
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 class ScanRequest(BaseModel):
     url: HttpUrl
+    idempotency_key: Optional[str] = None
+    # Requested class, a ceiling: see services.scheduler.scan_priority (queue dispatch only)
+    priority: Literal["interactive", "batch", "recurring"] = "interactive"
 
 class ScanResponse(BaseModel):
     scan_id: int
@@ -27,8 +55,10 @@ class ScanResponse(BaseModel):
 @router.post("/scan", include_in_schema=False)
 async def legacy_start_scan(
     req: ScanRequest, 
+    request: Request,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Legacy endpoint for frontend compatibility
@@ -37,7 +67,9 @@ async def legacy_start_scan(
     try:
         logger.info("🔄 Legacy /scan endpoint called - redirecting to /scan/start")
         # Call the same function as /scan/start
-        return await start_scan(req, background_tasks, db)
+        return await start_scan(req, request, background_tasks, db, idempotency_key)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Legacy /scan endpoint failed: {e}")
         raise HTTPException(status_code=500, detail=f"Scan failed: {str(e)}")
@@ -45,26 +77,49 @@ async def legacy_start_scan(
 @router.post("/scan/start", response_model=ScanResponse)
 async def start_scan(
     req: ScanRequest, 
+    request: Request,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Start accessibility scan for a given URL
-    Returns immediately with scan_id, processes scan in background
+    Returns immediately with scan_id, processes scan in background.
+    Requests for a URL with a scan already in flight (or just finished),
+    or repeating an Idempotency-Key, return the existing scan_id.
+    New scans beyond the admission limits get 429/503 with Retry-After.
     """
     url = str(req.url)
+    client_id = client_identity(request)
     
     try:
-        # Create initial scan record
-        scan_result = ScanResult(url=url, status="pending")
-        db.add(scan_result)
-        db.commit()
-        db.refresh(scan_result)
+        # Create initial scan record, or attach to the one already running
+        scan_result, created = await db.run_sync(
+            lambda session: start_or_attach(
+                session, url, idempotency_key or req.idempotency_key,
+                client_id=client_id,
+                admit=lambda: admit(session, client_id)
+            )
+        )
+        if not created:
+            return ScanResponse(
+                scan_id=scan_result.id,
+                status="attached",
+                message=f"Accessibility scan for {url} already {scan_result.status}"
+            )
         
         logger.info(f"🎯 Scan started for URL: {url} with ID: {scan_result.id}")
         
-        # Process scan in background
-        background_tasks.add_task(process_scan_async, scan_result.id, url, db)
+        # Queue for a scan worker, or process in background - async engine shares the API event loop
+        if settings.scan_dispatch == "queue":
+            priority = await db.run_sync(scan_priority, client_id, req.priority)
+            if priority != req.priority:
+                logger.info(f"🔽 Scan {scan_result.id} queued as {priority}, not {req.priority}: client {client_id} has scans queued")
+            await db.run_sync(enqueue_scan, scan_result.id, url, client_id=client_id, priority=priority)
+        elif settings.scan_engine == "async":
+            background_tasks.add_task(process_scan_on_loop, scan_result.id, url)
+        else:
+            background_tasks.add_task(process_scan_after_slot, scan_result.id, url)
         
         return ScanResponse(
             scan_id=scan_result.id,
@@ -72,11 +127,28 @@ async def start_scan(
             message=f"Accessibility scan initiated for {url}"
         )
         
+    except IdempotencyKeyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"❌ Failed to start scan: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Scan initialization failed: {str(e)}")
 
-def process_scan_async(scan_id: int, url: str, db: Session):
+async def process_scan_after_slot(scan_id: int, url: str):
+    """Background task for the sync engine: wait for a running slot on the loop, then scan in a thread"""
+    stopped = await wait_for_slot(scan_id)
+    if stopped:
+        logger.info(f"⏭️ Not running scan {scan_id}: it is {stopped}")
+        return
+    logger.info(f"📊 Scan {scan_id} status updated to 'scanning'")
+    await run_in_threadpool(process_scan_async, scan_id, url)
+
+def process_scan_async(scan_id: int, url: str):
     """Background task to process the accessibility scan - UPDATED SYNCHRONOUS"""
     start_time = time.time()
     logger.info(f"🔄 Starting background scan process for ID: {scan_id}, URL: {url}")
@@ -87,19 +159,12 @@ def process_scan_async(scan_id: int, url: str, db: Session):
         background_db = SessionLocal()
         
         try:
-            # Update status to scanning immediately
-            scan = background_db.get(ScanResult, scan_id)
-            if scan:
-                scan.status = "scanning"
-                background_db.commit()
-                logger.info(f"📊 Scan {scan_id} status updated to 'scanning'")
-            
             # Process the scan - NOW CALLING SYNCHRONOUS FUNCTION
             logger.info(f"🎯 Starting accessibility scan for ID: {scan_id}")
             results = scan_website_with_recommendations(background_db, url, scan_id)
             
             execution_time = time.time() - start_time
-            logger.info(f"✅ Scan {scan_id} completed successfully in {execution_time:.2f}s with {len(results.get('issues', []))} issues")
+            logger.info(f"✅ Scan {scan_id} completed successfully in {execution_time:.2f}s with {occurrence_total(results.get('issues', []))} issues")
             
         except Exception as scan_error:
             execution_time = time.time() - start_time
@@ -119,320 +184,320 @@ def process_scan_async(scan_id: int, url: str, db: Session):
         execution_time = time.time() - start_time
         logger.error(f"❌ Background scan failed for ID {scan_id} after {execution_time:.2f}s: {str(e)}")
 
+async def process_scan_on_loop(scan_id: int, url: str):
+    """Background task running the scan on the async Playwright engine"""
+    start_time = time.time()
+    logger.info(f"🔄 Starting async scan process for ID: {scan_id}, URL: {url}")
+    try:
+        results = await scan_website_with_recommendations_async(scan_id, url)
+        execution_time = time.time() - start_time
+        logger.info(f"✅ Scan {scan_id} completed successfully in {execution_time:.2f}s with {occurrence_total(results.get('issues', []))} issues")
+    except Exception as e:
+        execution_time = time.time() - start_time
+        logger.error(f"❌ Background scan failed for ID {scan_id} after {execution_time:.2f}s: {str(e)}")
+
+@router.get("/scan/results")
+async def list_scans(
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    status: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Recent scans with their stored summaries, newest first; no issue rows are read"""
+    query = select(ScanResult)
+    if status:
+        query = query.where(ScanResult.status == status)
+    scans = (await db.scalars(query.order_by(ScanResult.id.desc()).offset(offset).limit(limit))).all()
+    return [
+        {
+            "id": scan.id,
+            "url": scan.url,
+            "status": scan.status,
+            "created_at": scan.created_at.isoformat() if scan.created_at else None,
+            "completed_at": scan.completed_at.isoformat() if scan.completed_at else None,
+            "summary": stored_summary(scan)
+        }
+        for scan in scans
+    ]
+
 @router.get("/scan/{scan_id}/status")
-async def scan_status(scan_id: int, db: Session = Depends(get_db)):
+async def scan_status(scan_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get current status of a scan with enhanced progress tracking"""
     try:
-        scan = db.get(ScanResult, scan_id)
+        scan = await db.get(ScanResult, scan_id)
         if not scan:
             raise HTTPException(status_code=404, detail="Scan not found")
         
-        # Calculate progress based on status
-        progress_mapping = {
-            "pending": 10,
-            "scanning": 50, 
-            "completed": 100,
-            "failed": 100
-        }
+        # Real stage progress: live from this process, else as last written by the scan's process
+        progress = None
+        if scan.status in ("pending", "scanning"):
+            progress = get_broadcaster().snapshot(scan_id)
+        progress = progress or event_from_row(scan)
         
-        # Map status to frontend phases
-        status_mapping = {
-            "pending": "crawling",
-            "scanning": "crawling", 
-            "completed": "reporting", 
-            "failed": "failed"
-        }
+        # Issue count materialized at completion; counted only for rows not yet backfilled
+        issue_count = scan.issue_count or 0
+        if scan.issue_count is None and scan.status in ("completed", "partial"):
+            issue_count = await db.run_sync(count_issues, scan_id)
         
-        # Get issue count for completed scans - FIXED: use scan_result_id
-        issue_count = 0
-        if scan.status == "completed":
-            issue_count = db.query(ScanIssue).filter(ScanIssue.scan_result_id == scan_id).count()
+        # Real queue position for scans still waiting for a slot
+        position = await db.run_sync(queue_position, scan)
+        estimated_wait = estimate_wait_seconds(position, await db.run_sync(recent_scan_seconds)) if position else None
         
         return {
             "scan_id": scan_id,
             "status": scan.status,
-            "phase": status_mapping.get(scan.status, "crawling"),
-            "progress": progress_mapping.get(scan.status, 0),
+            "phase": progress['phase'],
+            "stage": progress['stage'],
+            "progress": progress['progress'],
+            "message": progress['message'],
             "url": scan.url,
             "issue_count": issue_count,
+            "accessibility_score": scan.accessibility_score,
+            "queue_position": position,
+            "estimated_wait_seconds": estimated_wait,
             "created_at": scan.created_at.isoformat() if scan.created_at else None,
             "error_message": getattr(scan, 'error_message', None)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Status check failed for scan {scan_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Error checking scan status: {str(e)}")
 
+def _sse(event: dict) -> str:
+    return f"event: progress\ndata: {json.dumps(event, default=str)}\n\n"
+
+@router.get("/scan/{scan_id}/events")
+async def scan_events(scan_id: int, request: Request):
+    """
+    Server-Sent Events stream of a scan's stage progress.
+    Sends the current state, then a `progress` event per stage change or
+    step; the stream ends after the event with "done": true. Holds no DB
+    session: scans running in another process are followed through one
+    shared row poll per scan in this process.
+    """
+    broadcaster = get_broadcaster()
+    # Subscribe before reading the state so no event falls in between
+    queue = broadcaster.subscribe(scan_id)
+    try:
+        initial = broadcaster.snapshot(scan_id) or await run_in_threadpool(load_row_event, scan_id)
+    except Exception:
+        broadcaster.unsubscribe(scan_id, queue)
+        raise
+    if initial is None:
+        broadcaster.unsubscribe(scan_id, queue)
+        raise HTTPException(status_code=404, detail="Scan not found")
+    if not initial['done'] and not broadcaster.is_local(scan_id):
+        broadcaster.watch_remote(scan_id)
+    
+    async def stream():
+        try:
+            yield _sse(initial)
+            if initial['done']:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.sse_keepalive_seconds)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(event)
+                if event['done']:
+                    return
+        finally:
+            broadcaster.unsubscribe(scan_id, queue)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _finished_scan(db: AsyncSession, scan_id: int) -> ScanResult:
+    """The scan if it has a report, else the HTTP error explaining why not"""
+    scan = await db.get(ScanResult, scan_id)
+    if not scan:
+        raise HTTPException(status_code=404, detail="Scan not found")
+    
+    if scan.status == "pending" or scan.status == "scanning":
+        raise HTTPException(status_code=425, detail="Scan not completed yet")
+    
+    if scan.status == "failed":
+        raise HTTPException(status_code=500, detail="Scan failed to complete")
+    
+    if scan.status == "cancelled":
+        raise HTTPException(status_code=409, detail="Scan was cancelled before finding any issues")
+    return scan
+
 @router.get("/scan/{scan_id}/report")
-async def get_report(scan_id: int, db: Session = Depends(get_db)):
-    """Get detailed accessibility report"""
+async def get_report(
+    scan_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    type: Optional[str] = None,
+    code: Optional[str] = None,
+    impact: Optional[str] = None,
+    expand: Optional[Literal["occurrences", "nodes"]] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get detailed accessibility report, one page of issues at a time.
+    Filters take comma-separated values; sort is id, code, type or impact
+    (prefix "-" for descending). Pass page.next_cursor as ?cursor= for the
+    next page; it is null on the last one.
+    
+    Issues are grouped per rule with an occurrence_count; expand=occurrences
+    adds each group's elements, expand=nodes lists one issue per element
+    (limit still counts groups).
+    """
     try:
-        scan = db.get(ScanResult, scan_id)
-        if not scan:
-            raise HTTPException(status_code=404, detail="Scan not found")
-        
-        if scan.status == "pending" or scan.status == "scanning":
-            raise HTTPException(status_code=425, detail="Scan not completed yet")
-        
-        if scan.status == "failed":
-            raise HTTPException(status_code=500, detail="Scan failed to complete")
-        
-        issues = []
-        for issue in scan.issues:
-            issues.append({
-                "id": issue.id,
-                "code": issue.code,
-                "type": getattr(issue, 'type', 'error'),
-                "message": issue.message,
-                "context": issue.context,
-                "selector": issue.selector,
-                "recommendation": getattr(issue, 'recommendation_text', 'No recommendation available'),
-                "severity": "high" if getattr(issue, 'type', 'error') == 'error' else "medium"
-            })
-        
-        # Calculate summary metrics
-        error_count = len([i for i in issues if i.get('type') == 'error' or i.get('severity') == 'high'])
-        warning_count = len([i for i in issues if i.get('type') == 'warning' or i.get('severity') == 'medium'])
-        notice_count = len([i for i in issues if i.get('type') == 'notice' or i.get('severity') == 'low'])
-        
-        summary = {
-            "total_issues": len(issues),
-            "errors": error_count,
-            "warnings": warning_count,
-            "notices": notice_count,
-            "accessibility_score": max(0, 100 - (error_count * 5 + warning_count * 2 + notice_count))
-        }
-        
-        return {
-            "scan_id": scan.id,
-            "url": scan.url,
-            "status": scan.status,
-            "issues": issues,
-            "summary": summary,
-            "created_at": scan.created_at.isoformat() if scan.created_at else None,
-            "scan_duration": "Completed"
-        }
-        
+        scan = await _finished_scan(db, scan_id)
+        filters = IssueFilters.parse(type, code, impact)
+        
+        # Rows load on the async connection, serialization of big pages in the CPU pool
+        payload = await db.run_sync(load_report_payload, scan, filters, sort, cursor, limit, expand)
+        if len(payload['issues']) >= settings.cpu_offload_min_rows:
+            return await run_cpu(build_report, payload)
+        return build_report(payload)
+        
+    except HTTPException:
+        raise
+    except InvalidIssueQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Report generation failed for scan {scan_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Error generating report: {str(e)}")
 
+@router.get("/scan/{scan_id}/report.ndjson")
+async def export_report_ndjson(
+    scan_id: int,
+    sort: str = "id",
+    type: Optional[str] = None,
+    code: Optional[str] = None,
+    impact: Optional[str] = None,
+    expand: Optional[Literal["occurrences", "nodes"]] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Every matching issue as newline-delimited JSON, one object per line,
+    written as rows arrive from a server-side cursor (exports, integrations).
+    Same filters, sorts and expand as the report.
+    """
+    scan = await _finished_scan(db, scan_id)
+    filters = IssueFilters.parse(type, code, impact)
+    if sort not in SORTS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort {sort!r}; use one of {', '.join(SORTS)}")
+    
+    def rows():
+        # Own sync session with a server-side cursor, iterated in the threadpool:
+        # the stream outlives the request's dependency scope
+        stream_db = SessionLocal()
+        try:
+            rows = stream_issues(stream_db, scan_id, filters, sort, occurrences=expand is not None)
+            for issue in issue_dicts(rows, expand):
+                yield json.dumps(dict(issue, scan_id=scan_id)) + "\n"
+        finally:
+            stream_db.close()
+    
+    return StreamingResponse(
+        rows(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="scan-{scan.id}-issues.ndjson"'}
+    )
+
+def _byte_range(header: Optional[str], size: int) -> Optional[tuple]:
+    """(start, end) of a single "bytes=" Range; None to send the whole body"""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, sep, last = header[len("bytes="):].strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else max(start, size - 1)
+            if end < start:
+                return None
+        else:
+            start, end = max(0, size - int(last)), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+def _artifact_response(request: Request, store, artifact, media_type: str, headers: dict):
+    """Stream a stored artifact with ETag validation and single-range support"""
+    headers = dict(headers, **{
+        "ETag": artifact.etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache"
+    })
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or artifact.etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if not if_range or if_range.strip() == artifact.etag:
+        byte_range = _byte_range(request.headers.get("range"), artifact.size)
+    if byte_range is None:
+        headers["Content-Length"] = str(artifact.size)
+        return StreamingResponse(store.iter_range(artifact), media_type=media_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{artifact.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(store.iter_range(artifact, start, end), status_code=206, media_type=media_type, headers=headers)
+
 @router.get("/scan/{scan_id}/report/pdf")
-async def download_report_pdf(scan_id: int, db: Session = Depends(get_db)):
-    """Generate and download PDF report with enhanced formatting"""
+async def download_report_pdf(
+    scan_id: int,
+    request: Request,
+    group: Optional[Literal["code"]] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Download the PDF report, rendered once and then served from the artifact store"""
     try:
-        scan = db.get(ScanResult, scan_id)
+        scan = await db.get(ScanResult, scan_id)
         if not scan:
             raise HTTPException(status_code=404, detail="Scan not found")
         
-        if scan.status != "completed":
+        if scan.status not in ("completed", "partial"):
             raise HTTPException(status_code=425, detail="Scan not completed yet")
-
-        # Use reportlab for PDF generation
-        from reportlab.lib.pagesizes import letter, A4
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib import colors
-        from reportlab.lib.units import inch
-        import textwrap
-        
-        buffer = io.BytesIO()
-        
-        # Use A4 for better international compatibility
-        doc = SimpleDocTemplate(
-            buffer, 
-            pagesize=A4,
-            rightMargin=0.5*inch,
-            leftMargin=0.5*inch,
-            topMargin=0.5*inch,
-            bottomMargin=0.5*inch
-        )
-        
-        styles = getSampleStyleSheet()
-        story = []
-        
-        # === CUSTOM STYLES ===
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            spaceAfter=12,
-            alignment=1,  # Center
-            textColor=colors.HexColor('#2D3748')
-        )
-        
-        header_style = ParagraphStyle(
-            'Header',
-            parent=styles['Heading2'],
-            fontSize=12,
-            spaceAfter=6,
-            textColor=colors.HexColor('#4A5568')
-        )
-        
-        small_text_style = ParagraphStyle(
-            'SmallText',
-            parent=styles['Normal'],
-            fontSize=8,
-            leading=9,
-            spaceAfter=4
-        )
-        
-        # === HEADER SECTION ===
-        story.append(Paragraph("Accessibility Scan Report", title_style))
-        story.append(Paragraph(f"<b>Scanned URL:</b> {scan.url}", styles['Normal']))
-        story.append(Paragraph(f"<b>Scan Date:</b> {scan.created_at.strftime('%Y-%m-%d %H:%M') if scan.created_at else 'Unknown'}", styles['Normal']))
-        story.append(Spacer(1, 0.3*inch))
-        
-        # === EXECUTIVE SUMMARY ===
-        story.append(Paragraph("Executive Summary", header_style))
-        
-        # Calculate scores
-        error_count = len([i for i in scan.issues if getattr(i, 'type', 'error') == 'error'])
-        warning_count = len([i for i in scan.issues if getattr(i, 'type', 'warning') == 'warning'])
-        notice_count = len([i for i in scan.issues if getattr(i, 'type', 'notice') == 'notice'])
-        total_issues = len(scan.issues)
-        score = max(0, 100 - (error_count * 5 + warning_count * 2 + notice_count))
-        
-        summary_data = [
-            ["Total Issues", "Errors", "Warnings", "Notices", "Score"],
-            [
-                str(total_issues),
-                str(error_count),
-                str(warning_count), 
-                str(notice_count),
-                f"{score}/100"
-            ]
-        ]
-        
-        summary_table = Table(summary_data, colWidths=[1.2*inch]*5)
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4A5568')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 9),
-            ('FONT', (0, 1), (-1, 1), 'Helvetica', 10),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ]))
-        
-        story.append(summary_table)
-        story.append(Spacer(1, 0.3*inch))
-        
-        # === DETAILED ISSUES SECTION ===
-        if scan.issues:
-            story.append(Paragraph("Detailed Issues", header_style))
-            story.append(Spacer(1, 0.1*inch))
-            
-            # Helper functions for text formatting
-            def format_wcag_code(code):
-                """Simplify long WCAG codes"""
-                if not code:
-                    return ""
-                simplified = code.replace('WCAG2AA.Principle', 'P')
-                simplified = simplified.replace('Guideline', 'G')
-                return simplified[:35] + '...' if len(simplified) > 35 else simplified
-            
-            def wrap_text(text, width=70):
-                """Wrap long text properly"""
-                if not text:
-                    return ""
-                try:
-                    clean_text = str(text).strip()
-                    wrapped = textwrap.fill(clean_text, width=width)
-                    return wrapped[:200] + '...' if len(wrapped) > 200 else wrapped
-                except:
-                    return str(text)[:150] + '...' if len(str(text)) > 150 else str(text)
-            
-            # Create issues table with better column widths
-            table_data = [['Type', 'WCAG Code', 'Issue Description', 'AI Recommendation']]
-            
-            for issue in scan.issues:
-                issue_type = getattr(issue, 'type', 'error')
-                recommendation = getattr(issue, 'recommendation_text', None)
-                
-                # Color code the type
-                type_display = issue_type.upper()
-                
-                table_data.append([
-                    type_display,
-                    format_wcag_code(issue.code),
-                    wrap_text(issue.message, 60),
-                    wrap_text(recommendation, 60) if recommendation else "No AI recommendation available"
-                ])
-            
-            # Optimized column widths for A4 paper
-            col_widths = [0.6*inch, 1.3*inch, 2.5*inch, 2.5*inch]
-            
-            issues_table = Table(table_data, colWidths=col_widths, repeatRows=1)
-            
-            # Enhanced table styling
-            issues_table.setStyle(TableStyle([
-                # Header row
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2D3748')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 7),
-                ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                
-                # Data rows
-                ('FONT', (0, 1), (-1, -1), 'Helvetica', 6),
-                ('VALIGN', (0, 1), (-1, -1), 'TOP'),
-                ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # Type column centered
-                ('ALIGN', (1, 1), (-1, -1), 'LEFT'),   # Other columns left-aligned
-                
-                # Grid and alternating colors
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f7fafc')]),
-                
-                # Word wrap for text-heavy columns
-                ('WORDWRAP', (2, 1), (-1, -1), True),
-                
-                # Type column styling based on severity
-                ('TEXTCOLOR', (0, 1), (0, -1), 
-                 lambda r, c, data: 
-                    colors.red if data and data[r][c] == 'ERROR' 
-                    else colors.orange if data and data[r][c] == 'WARNING' 
-                    else colors.blue),
-                ('FONT', (0, 1), (0, -1), 'Helvetica-Bold', 6),
-            ]))
-            
-            story.append(issues_table)
-        else:
-            story.append(Paragraph("✅ No accessibility issues found!", styles['Heading2']))
-        
-        # === FOOTER ===
-        story.append(Spacer(1, 0.3*inch))
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=styles['Normal'],
-            fontSize=8,
-            textColor=colors.grey,
-            alignment=1  # Center
-        )
-        story.append(Paragraph("Generated by AdaptiveTest AI - Automated Accessibility Scanner", footer_style))
-        
-        # === BUILD PDF ===
-        doc.build(story)
-        buffer.seek(0)
         
         # Create filename
         from urllib.parse import urlparse
         hostname = urlparse(scan.url).hostname or "website"
         safe_hostname = hostname.replace('.', '_')
-        filename = f"accessibility-report-{safe_hostname}-{scan.id}.pdf"
+        grouped = group == "code"
+        filename = f"accessibility-report-{safe_hostname}-{scan.id}{'-by-code' if grouped else ''}.pdf"
         
         headers = {
             "Content-Disposition": f'attachment; filename="{filename}"',
-            "Access-Control-Expose-Headers": "Content-Disposition"
+            "Access-Control-Expose-Headers": "Content-Disposition, Content-Length, Content-Range, ETag"
         }
         
-        return StreamingResponse(
-            buffer, 
-            media_type="application/pdf", 
-            headers=headers
-        )
+        # Stored artifact (pre-rendered at completion, or rendered now in the CPU pool)
+        artifact = await run_in_threadpool(ensure_report_pdf, scan_id, grouped)
+        if artifact is not None:
+            return _artifact_response(request, get_artifact_store(), artifact, "application/pdf", headers)
+        
+        # No artifact store configured: render to a temp file on every request, stream it, delete it
+        fd, path = tempfile.mkstemp(prefix="report-", suffix=".pdf")
+        os.close(fd)
+        try:
+            await run_cpu(render_report_pdf_file, scan_id, path, grouped)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return FileResponse(path, media_type="application/pdf", headers=headers, background=BackgroundTask(os.unlink, path))
         
+    except HTTPException:
+        raise
     except ImportError:
         logger.warning("ReportLab not installed, using simple PDF fallback")
         raise HTTPException(status_code=501, detail="PDF generation not available. Install reportlab.")
@@ -441,16 +506,19 @@ async def download_report_pdf(scan_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"PDF generation failed: {str(e)}")
 
 @router.post("/scan/{scan_id}/reset")
-async def reset_stuck_scan(scan_id: int, db: Session = Depends(get_db)):
+async def reset_stuck_scan(scan_id: int, db: AsyncSession = Depends(get_async_db)):
     """Emergency endpoint to reset stuck scans"""
     try:
-        scan = db.get(ScanResult, scan_id)
+        scan = await db.get(ScanResult, scan_id)
         if not scan:
             raise HTTPException(status_code=404, detail="Scan not found")
         
         if scan.status in ["pending", "scanning"]:
             scan.status = "failed"
-            db.commit()
+            scan.phase = "done"
+            await db.commit()
+            cancel_local_scan(scan_id)
+            get_broadcaster().finish(scan_id, "failed")
             logger.info(f"🔄 Scan {scan_id} manually reset from '{scan.status}' to 'failed'")
             return {
                 "status": "reset", 
@@ -468,16 +536,65 @@ async def reset_stuck_scan(scan_id: int, db: Session = Depends(get_db)):
         logger.error(f"❌ Failed to reset scan {scan_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Error resetting scan: {str(e)}")
 
+@router.post("/scan/{scan_id}/cancel")
+async def cancel_scan(scan_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Cancel a pending or running scan.
+    A running scan stops at its next checkpoint and keeps the issues found
+    so far (status "partial"); the process running it may be another
+    worker, which picks the cancellation up from the database.
+    """
+    try:
+        scan = await db.get(ScanResult, scan_id)
+        if not scan:
+            raise HTTPException(status_code=404, detail="Scan not found")
+        
+        if scan.status not in ["pending", "scanning"]:
+            return {
+                "status": "no_change",
+                "scan_id": scan_id,
+                "message": f"Scan was already in {scan.status} state"
+            }
+        
+        previous = scan.status
+        scan.status = "cancelled"
+        scan.completed_at = datetime.now(timezone.utc)
+        if previous == "pending":
+            # Nothing is running it; a running scan marks itself done once it has stopped and saved
+            scan.phase = "done"
+        await db.commit()
+        running_here = cancel_local_scan(scan_id)
+        if previous == "pending":
+            get_broadcaster().finish(scan_id, "cancelled")
+        logger.info(f"🛑 Scan {scan_id} cancelled while {previous}")
+        return {
+            "status": "cancelled",
+            "scan_id": scan_id,
+            "message": f"Scan cancelled while {previous}",
+            "stopping": "local" if running_here else "signalled"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Failed to cancel scan {scan_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error cancelling scan: {str(e)}")
+
 @router.get("/scan/{scan_id}/debug")
-async def debug_scan(scan_id: int, db: Session = Depends(get_db)):
+async def debug_scan(scan_id: int, db: AsyncSession = Depends(get_async_db)):
     """Debug endpoint to get detailed scan information"""
     try:
-        scan = db.get(ScanResult, scan_id)
+        scan = await db.get(ScanResult, scan_id)
         if not scan:
             raise HTTPException(status_code=404, detail="Scan not found")
         
-        # FIXED: use scan_result_id instead of scan_id
-        issues = db.query(ScanIssue).filter(ScanIssue.scan_result_id == scan_id).all()
+        # Count and a sample instead of loading every issue row
+        of_scan = ScanIssue.scan_result_id == scan_id
+        issue_count = await db.scalar(select(func.count(ScanIssue.id)).where(of_scan))
+        issues = (await db.scalars(select(ScanIssue).where(of_scan).order_by(ScanIssue.id).limit(5))).all()
+        has_recommendations = await db.scalar(
+            select(ScanIssue.id).where(of_scan, ScanIssue.recommendation_text.isnot(None)).limit(1)
+        )
         
         return {
             "scan_id": scan_id,
@@ -485,7 +602,7 @@ async def debug_scan(scan_id: int, db: Session = Depends(get_db)):
             "url": scan.url,
             "created_at": scan.created_at.isoformat() if scan.created_at else None,
             "updated_at": getattr(scan, 'updated_at', None),
-            "issue_count": len(issues),
+            "issue_count": issue_count,
             "issues_sample": [
                 {
                     "id": issue.id,
@@ -493,14 +610,13 @@ async def debug_scan(scan_id: int, db: Session = Depends(get_db)):
                     "type": getattr(issue, 'type', 'unknown'),
                     "message": issue.message[:100] + "..." if len(issue.message) > 100 else issue.message
                 }
-                for issue in issues[:5]  # First 5 issues only
+                for issue in issues  # First 5 issues only
             ],
-            "has_ai_recommendations": any(
-                getattr(issue, 'recommendation_text', None) 
-                for issue in issues
-            )
+            "has_ai_recommendations": has_recommendations is not None
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Debug endpoint failed for scan {scan_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Debug error: {str(e)}")
\ No newline at end of file
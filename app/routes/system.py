@@ -0,0 +1,65 @@
+# app/routes/system.py
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+import logging
+
+from database import get_db
+from services.admission import admission_status
+from services.artifacts import get_artifact_store
+from services.db_pool import pool_stats
+from services.executor import get_cpu_executor
+from services.http_client import get_fetch_client
+from services.job_queue import queue_stats
+from services.progress import get_broadcaster
+from services.result_cache import get_result_cache
+from services.scheduler import scheduler_stats
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.get("/system/http-client")
+async def http_client_stats():
+    """Connection pool and reuse statistics of the shared outbound HTTP client"""
+    return get_fetch_client().stats()
+
+@router.get("/system/result-cache")
+async def result_cache_stats():
+    """Hit/miss counters of the scan result cache"""
+    cache = get_result_cache()
+    return cache.stats() if cache else {'enabled': False}
+
+@router.get("/system/report-artifacts")
+def report_artifact_stats():
+    """Size, hit/miss and eviction counters of the stored PDF reports"""
+    store = get_artifact_store()
+    return store.stats() if store else {'enabled': False}
+
+@router.get("/system/job-queue")
+def job_queue_stats(db: Session = Depends(get_db)):
+    """Scan jobs by state in the database queue"""
+    return queue_stats(db)
+
+@router.get("/system/executor")
+async def executor_stats():
+    """Saturation metrics of the CPU process pool"""
+    return get_cpu_executor().stats()
+
+@router.get("/system/admission")
+def admission_stats(db: Session = Depends(get_db)):
+    """Scan admission limits, current queue depth and estimated drain time"""
+    return admission_status(db)
+
+@router.get("/system/scheduler")
+def scheduler_state(db: Session = Depends(get_db)):
+    """Queued jobs and claim wait-time histograms per priority class"""
+    return scheduler_stats(db)
+
+@router.get("/system/progress")
+async def progress_stats():
+    """Progress event fan-out: subscribers, DB writes and polls in this process"""
+    return get_broadcaster().stats()
+
+@router.get("/system/db-pool")
+async def db_pool_stats():
+    """Database pool settings, connections in use and checkout wait times in this process"""
+    return pool_stats()
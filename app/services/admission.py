@@ -0,0 +1,225 @@
+# services/admission.py
+"""
+Admission control for new scans.
+
+Limits are checked against the scans table, so they hold across web
+workers (as soft limits; two workers may admit at the same instant):
+
+- SCAN_MAX_PER_CLIENT in-flight scans per client (IP, from the
+  X-Forwarded-For hop TRUSTED_PROXY_COUNT from the right) -> 429
+- SCAN_MAX_CONCURRENT running + SCAN_MAX_PENDING waiting scans overall -> 503
+
+Rejections carry a Retry-After computed from the queue depth and the
+average duration of recent scans. A limit of 0 disables that check.
+
+Rows pending or scanning for longer than SCAN_INFLIGHT_TIMEOUT_SECONDS
+are not counted: they were orphaned by a restart of the process running
+them, and would otherwise hold their slots until someone scans the same
+URL again (services/single_flight.py expires them then).
+
+With inline dispatch an admitted scan stays "pending" until claim_slot
+finds one of the SCAN_MAX_CONCURRENT running slots free and it is first
+in line, so pending scans run in creation order and queue_position is
+their real place in that line. Both scan engines wait in wait_for_slot,
+on the event loop, so waiting scans hold no threadpool thread.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session, aliased
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+from models import ScanResult
+
+logger = logging.getLogger(__name__)
+
+IN_FLIGHT_STATUSES = ("pending", "scanning")
+DEFAULT_SCAN_SECONDS = 30.0
+RECENT_SCANS = 20
+DURATION_CACHE_SECONDS = 10
+MAX_RETRY_AFTER = 600
+# How often an inline scan waiting for a running slot checks again
+SLOT_POLL_SECONDS = 1.0
+
+
+class AdmissionRejected(Exception):
+    """Raised when a new scan would exceed a limit"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def client_identity(request) -> Optional[str]:
+    """
+    Client address as seen by the outermost trusted proxy. Each proxy
+    appends the address it received the request from to X-Forwarded-For,
+    so only the last TRUSTED_PROXY_COUNT hops are trustworthy; anything
+    left of them was written by the client and would let it pick a new
+    identity per request.
+    """
+    forwarded = request.headers.get("x-forwarded-for")
+    trusted = settings.trusted_proxy_count
+    if forwarded and trusted > 0:
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if hops:
+            return hops[max(0, len(hops) - trusted)]
+    return request.client.host if request.client else None
+
+
+_duration_cache = {'value': DEFAULT_SCAN_SECONDS, 'at': 0.0}
+_duration_lock = threading.Lock()
+
+
+def recent_scan_seconds(db: Session) -> float:
+    """Average run time of the last completed scans (cached briefly)"""
+    with _duration_lock:
+        if time.monotonic() - _duration_cache['at'] < DURATION_CACHE_SECONDS:
+            return _duration_cache['value']
+    rows = db.query(ScanResult.started_at, ScanResult.completed_at).filter(
+        ScanResult.status == "completed",
+        ScanResult.started_at.isnot(None),
+        ScanResult.completed_at.isnot(None)
+    ).order_by(ScanResult.completed_at.desc()).limit(RECENT_SCANS).all()
+    durations = [
+        (completed - started).total_seconds()
+        for started, completed in rows
+        if completed >= started
+    ]
+    value = sum(durations) / len(durations) if durations else DEFAULT_SCAN_SECONDS
+    with _duration_lock:
+        _duration_cache.update(value=value, at=time.monotonic())
+    return value
+
+
+def _live(model, *statuses: str):
+    """Rows of model in the given statuses, leaving out those orphaned for longer than the in-flight timeout"""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.scan_inflight_timeout_seconds)
+    return (
+        model.status.in_(statuses or IN_FLIGHT_STATUSES),
+        func.coalesce(model.started_at, model.created_at) >= cutoff
+    )
+
+
+def _inflight_counts(db: Session) -> Dict[str, int]:
+    counts = dict(db.query(ScanResult.status, func.count(ScanResult.id)).filter(
+        *_live(ScanResult)
+    ).group_by(ScanResult.status).all())
+    return {'pending': counts.get("pending", 0), 'scanning': counts.get("scanning", 0)}
+
+
+def estimate_wait_seconds(ahead: int, average: float) -> int:
+    """Time until `ahead` queued scans have drained through the running slots"""
+    slots = max(1, settings.scan_max_concurrent or settings.async_scan_concurrency)
+    return min(MAX_RETRY_AFTER, max(1, math.ceil(math.ceil(ahead / slots) * average)))
+
+
+def admit(db: Session, client_id: Optional[str]):
+    """Raise AdmissionRejected if one more scan would exceed a limit"""
+    if settings.scan_max_per_client > 0 and client_id:
+        client_inflight = db.query(func.count(ScanResult.id)).filter(
+            ScanResult.client_id == client_id,
+            *_live(ScanResult)
+        ).scalar()
+        if client_inflight >= settings.scan_max_per_client:
+            retry_after = estimate_wait_seconds(1, recent_scan_seconds(db))
+            logger.warning(f"🚦 Client {client_id} has {client_inflight} scans in flight, rejecting")
+            raise AdmissionRejected(
+                429, f"Too many scans in progress for this client (limit {settings.scan_max_per_client})", retry_after
+            )
+
+    if settings.scan_max_concurrent > 0:
+        counts = _inflight_counts(db)
+        inflight = counts['pending'] + counts['scanning']
+        capacity = settings.scan_max_concurrent + settings.scan_max_pending
+        if inflight >= capacity:
+            retry_after = estimate_wait_seconds(inflight - capacity + 1, recent_scan_seconds(db))
+            logger.warning(f"🚦 Scan queue full ({inflight}/{capacity}), rejecting")
+            raise AdmissionRejected(503, "Scan queue is full, please retry later", retry_after)
+
+
+def claim_slot(db: Session, scan_id: int) -> Optional[str]:
+    """
+    Move a pending scan to "scanning" if it may run now: fewer than
+    SCAN_MAX_CONCURRENT scans are scanning and no older pending scan is
+    waiting for the free slots. Returns "pending" if it must keep waiting,
+    the status that stops it from running (cancelled, failed, ...), or
+    None once it may run.
+    """
+    conditions = [ScanResult.id == scan_id, ScanResult.status == "pending"]
+    if settings.scan_max_concurrent > 0:
+        # Aliased so the counts are not correlated with the updated row
+        other = aliased(ScanResult)
+        scanning = select(func.count(other.id)).where(*_live(other, "scanning")).scalar_subquery()
+        ahead = select(func.count(other.id)).where(*_live(other, "pending"), other.id < scan_id).scalar_subquery()
+        conditions.append(scanning + ahead < settings.scan_max_concurrent)
+    claimed = db.execute(
+        update(ScanResult).where(*conditions).values(status="scanning", started_at=datetime.now(timezone.utc)),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+    db.commit()
+    if claimed:
+        return None
+    status = db.query(ScanResult.status).filter(ScanResult.id == scan_id).scalar()
+    return None if status in (None, "scanning") else status
+
+
+def _claim_slot(scan_id: int) -> Optional[str]:
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        return claim_slot(db, scan_id)
+    finally:
+        db.close()
+
+
+async def wait_for_slot(scan_id: int) -> Optional[str]:
+    """
+    Keep a scan pending until it gets a running slot; returns the status
+    that stops it from running, if any. Waits on the event loop, so
+    queued scans hold no threadpool thread between claims.
+    """
+    status = await run_in_threadpool(_claim_slot, scan_id)
+    if status == "pending":
+        logger.info(f"⏳ Scan {scan_id} waiting for one of {settings.scan_max_concurrent} running slots")
+    while status == "pending":
+        await asyncio.sleep(SLOT_POLL_SECONDS)
+        status = await run_in_threadpool(_claim_slot, scan_id)
+    return status
+
+
+def queue_position(db: Session, scan: ScanResult) -> Optional[int]:
+    """1-based position of a pending scan among all pending scans"""
+    if scan.status != "pending":
+        return None
+    return db.query(func.count(ScanResult.id)).filter(
+        *_live(ScanResult, "pending"),
+        ScanResult.id <= scan.id
+    ).scalar()
+
+
+def admission_status(db: Session) -> Dict[str, Any]:
+    counts = _inflight_counts(db)
+    average = recent_scan_seconds(db)
+    return {
+        'pending': counts['pending'],
+        'scanning': counts['scanning'],
+        'max_concurrent': settings.scan_max_concurrent,
+        'max_pending': settings.scan_max_pending,
+        'max_per_client': settings.scan_max_per_client,
+        'accepting': (
+            settings.scan_max_concurrent <= 0
+            or counts['pending'] + counts['scanning'] < settings.scan_max_concurrent + settings.scan_max_pending
+        ),
+        'avg_scan_seconds': round(average, 1),
+        'estimated_drain_seconds': estimate_wait_seconds(counts['pending'], average) if counts['pending'] else 0
+    }
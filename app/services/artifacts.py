@@ -0,0 +1,261 @@
+# services/artifacts.py
+"""
+Store for rendered report artifacts (PDFs).
+
+A completed scan never changes, so its PDF is rendered once and kept
+under a key that includes the report template version; bumping the
+version makes every old artifact a miss that is re-rendered on demand
+and eventually evicted.
+
+The default backend keeps files on local disk under REPORT_ARTIFACT_DIR.
+Writes go to a temp file that is renamed into place, so a reader never
+sees half a PDF and the web and worker processes can share a directory.
+Size (REPORT_ARTIFACT_MAX_BYTES) and age (REPORT_ARTIFACT_MAX_AGE_SECONDS)
+limits are enforced after each write by evicting least recently used
+files; reads bump a file's access time to mark it used.
+
+Other backends implement ArtifactStore and are selected with
+REPORT_ARTIFACT_BACKEND="package.module:factory"; "local" is the disk
+store and "none" disables storing artifacts.
+"""
+import errno
+import importlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class StoredArtifact:
+    key: str
+    size: int
+    etag: str
+    modified: float
+
+
+class ArtifactStore:
+    """Interface of artifact backends"""
+
+    def get(self, key: str) -> Optional[StoredArtifact]:
+        raise NotImplementedError
+
+    def put(self, key: str, data: bytes) -> StoredArtifact:
+        raise NotImplementedError
+
+    def temp_path(self) -> str:
+        """A new empty file to render into before put_file()"""
+        fd, path = tempfile.mkstemp(prefix='artifact-')
+        os.close(fd)
+        return path
+
+    def put_file(self, key: str, path: str) -> StoredArtifact:
+        """Store the rendered file at path under key; the file is consumed"""
+        try:
+            with open(path, 'rb') as f:
+                return self.put(key, f.read())
+        finally:
+            os.unlink(path)
+
+    def iter_range(self, artifact: StoredArtifact, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Bytes start..end (inclusive) of a stored artifact, in chunks"""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {'backend': type(self).__name__}
+
+
+class LocalArtifactStore(ArtifactStore):
+    """Artifacts as files in one directory, bounded by total size and age"""
+
+    def __init__(self, root: str, max_bytes: int = 0, max_age: float = 0):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        if not key or os.sep in key or key.startswith('.'):
+            raise ValueError(f"Invalid artifact key: {key!r}")
+        return os.path.join(self.root, key)
+
+    @staticmethod
+    def _artifact(key: str, st: os.stat_result) -> StoredArtifact:
+        # Like static file servers: changes whenever the file is rewritten
+        return StoredArtifact(key=key, size=st.st_size, etag=f'"{st.st_mtime_ns:x}-{st.st_size:x}"', modified=st.st_mtime)
+
+    def get(self, key: str) -> Optional[StoredArtifact]:
+        path = self._path(key)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        if self.max_age and time.time() - st.st_atime > self.max_age:
+            self.delete(key)
+            with self._lock:
+                self.misses += 1
+                self.evictions += 1
+            return None
+        # atime records use (for LRU eviction); mtime stays the version, so ETags are stable
+        try:
+            os.utime(path, ns=(time.time_ns(), st.st_mtime_ns))
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return self._artifact(key, st)
+
+    def temp_path(self) -> str:
+        # Same directory, so put_file() is an atomic rename
+        fd, path = tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+        os.close(fd)
+        return path
+
+    def put(self, key: str, data: bytes) -> StoredArtifact:
+        tmp_path = self.temp_path()
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return self.put_file(key, tmp_path)
+
+    def put_file(self, key: str, path: str) -> StoredArtifact:
+        target = self._path(key)
+        try:
+            os.replace(path, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Rendered on another filesystem: copy next to the target first
+            tmp_path = self.temp_path()
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, target)
+            os.unlink(path)
+        with self._lock:
+            self.writes += 1
+        self.evict(keep=key)
+        return self._artifact(key, os.stat(target))
+
+    def iter_range(self, artifact: StoredArtifact, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        end = artifact.size - 1 if end is None else end
+        with open(self._path(artifact.key), 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, key: str):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _files(self):
+        files = []
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.startswith('.'):
+                    try:
+                        files.append((entry.name, entry.stat()))
+                    except FileNotFoundError:
+                        continue
+        return files
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Drop expired files, then least recently used ones until under max_bytes"""
+        if not self.max_bytes and not self.max_age:
+            return 0
+        now = time.time()
+        files = sorted(self._files(), key=lambda item: item[1].st_atime)
+        total = sum(st.st_size for _, st in files)
+        evicted = 0
+        for name, st in files:
+            expired = self.max_age and now - st.st_atime > self.max_age
+            oversize = self.max_bytes and total > self.max_bytes
+            if not expired and not oversize:
+                break
+            if name == keep:
+                continue
+            self.delete(name)
+            total -= st.st_size
+            evicted += 1
+        if evicted:
+            with self._lock:
+                self.evictions += evicted
+            logger.info(f"🧹 Evicted {evicted} report artifacts ({total // 1024} KB kept)")
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        files = self._files()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'local',
+                'root': self.root,
+                'files': len(files),
+                'bytes': sum(st.st_size for _, st in files),
+                'max_bytes': self.max_bytes,
+                'max_age': self.max_age,
+                'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+def _create_store() -> Optional[ArtifactStore]:
+    backend = settings.report_artifact_backend.strip()
+    if backend in ("", "none"):
+        return None
+    if backend == "local":
+        return LocalArtifactStore(
+            settings.report_artifact_dir,
+            max_bytes=settings.report_artifact_max_bytes,
+            max_age=settings.report_artifact_max_age_seconds
+        )
+    module_name, _, factory = backend.partition(":")
+    return getattr(importlib.import_module(module_name), factory or "create_store")()
+
+
+_store: Optional[ArtifactStore] = None
+_store_created = False
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> Optional[ArtifactStore]:
+    """Process-wide artifact store, or None when REPORT_ARTIFACT_BACKEND is "none" """
+    global _store, _store_created
+    with _store_lock:
+        if not _store_created:
+            _store = _create_store()
+            _store_created = True
+            if _store is not None:
+                logger.info(f"🗄️ Report artifact store: {settings.report_artifact_backend}")
+        return _store
@@ -0,0 +1,328 @@
+# services/async_scanner.py
+"""
+Async Playwright scan engine.
+
+Runs browser scans on the API event loop instead of blocking a
+BackgroundTasks thread per scan. A single warm browser hands out one
+context per scan and an asyncio.Semaphore bounds how many pages are open
+at once. Results have the same shape as AIAccessibilityScanner._parse_axe_results.
+
+A browser scan runs as its own task: the scan deadline bounds it with
+wait_for, and cancelling the scan cancels the task from whichever thread
+noticed, which closes the page's context on the way out.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+from services.admission import wait_for_slot
+from services.axe_core import AXE_LOADED_CHECK, AXE_RUN_SCRIPT, AXE_RUN_TIMEOUT_MS, AXE_SOURCE
+from services.browser_pool import CHROMIUM_ARGS, CONTEXT_OPTIONS
+from services.deadline import (
+    DeadlineExceeded, ScanAborted, ScanCancelled, ScanDeadline, finish_deadline, remaining_or, start_deadline
+)
+from services.progress import get_broadcaster
+from services.result_cache import content_hash, get_result_cache
+from services.scanner import AXE_ENGINE, NAVIGATION_TIMEOUT, get_scanner, report_stage, save_scan_results
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncScanEngine:
+    """Bounded-concurrency Playwright engine living on the running event loop"""
+
+    def __init__(self, max_concurrency: int = 10, max_pages: int = 50):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_pages = max(1, max_pages)
+        self.active = 0
+        self.completed = 0
+        self.launches = 0
+        self._pages_since_launch = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._playwright = None
+        self._browser = None
+
+    def _ensure_primitives(self):
+        # Created lazily so they bind to the loop that actually serves requests
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._lock = asyncio.Lock()
+
+    async def _ensure_browser(self):
+        async with self._lock:
+            if self._browser is not None and self._browser.is_connected():
+                # Recycle only when idle so open pages are never torn down
+                if self._pages_since_launch < self.max_pages or self.active > 1:
+                    return self._browser
+                logger.info(f"♻️ Recycling async browser after {self._pages_since_launch} pages")
+                await self._close_browser()
+
+            if self._playwright is None:
+                from playwright.async_api import async_playwright
+                self._playwright = await async_playwright().start()
+
+            logger.info("🚀 Launching Chromium for async scan engine...")
+            self._browser = await self._playwright.chromium.launch(
+                args=CHROMIUM_ARGS,
+                headless=True,
+                timeout=30000
+            )
+            self.launches += 1
+            self._pages_since_launch = 0
+            return self._browser
+
+    async def _close_browser(self):
+        if self._browser is None:
+            return
+        try:
+            await self._browser.close()
+        except Exception:
+            pass
+        self._browser = None
+
+    async def scan(self, url: str, deadline: Optional[ScanDeadline] = None) -> Dict[str, Any]:
+        """Scan a single URL; waits for a free page slot first"""
+        self._ensure_primitives()
+        async with self._semaphore:
+            self.active += 1
+            try:
+                browser = await self._ensure_browser()
+                self._pages_since_launch += 1
+                context = await browser.new_context(**CONTEXT_OPTIONS)
+                try:
+                    return await self._scan_in_context(context, url, deadline)
+                finally:
+                    try:
+                        await context.close()
+                    except Exception as e:
+                        logger.warning(f"⚠️ Failed to close async browser context: {e}")
+            finally:
+                self.active -= 1
+                self.completed += 1
+
+    async def _scan_in_context(self, context, url: str, deadline: Optional[ScanDeadline] = None) -> Dict[str, Any]:
+        scanner = get_scanner()
+        await context.add_init_script(script=AXE_SOURCE)
+        page = await context.new_page()
+        nav_timeout_ms = remaining_or(deadline, NAVIGATION_TIMEOUT, share=0.5) * 1000
+        page.set_default_timeout(nav_timeout_ms)
+        page.set_default_navigation_timeout(nav_timeout_ms)
+
+        logger.info(f"🌐 [async] Navigating to: {url}")
+        report_stage(deadline, 'navigate', message=f"Loading {url} in the browser")
+        try:
+            response = await page.goto(url, wait_until='domcontentloaded', timeout=nav_timeout_ms)
+            if not response or response.status >= 400:
+                status = getattr(response, 'status', 'Unknown')
+                logger.error(f"❌ Failed to load URL: {url}, Status: {status}")
+                return scanner._create_error_result(url, f"Failed to load URL - Status: {status}")
+        except Exception as nav_error:
+            if deadline is not None:
+                deadline.check()
+            logger.error(f"❌ Navigation failed: {nav_error}")
+            return scanner._create_error_result(url, f"Navigation failed: {str(nav_error)}")
+
+        await page.wait_for_timeout(1000)
+
+        cache = get_result_cache()
+        page_hash = None
+        if cache:
+            page_hash = content_hash((await page.content()).encode('utf-8'))
+            # May read a previous scan's issues from the database
+            cached = await run_in_threadpool(cache.get, url, AXE_ENGINE, page_hash)
+            if cached:
+                logger.info(f"♻️ [async] Rendered page unchanged, reusing cached results for {url}")
+                return cached
+
+        try:
+            if not await page.evaluate(AXE_LOADED_CHECK):
+                await page.add_script_tag(content=AXE_SOURCE)
+        except Exception as axe_error:
+            logger.error(f"❌ axe-core failed to load: {axe_error}")
+            return scanner._create_error_result(url, f"axe-core failed to load: {str(axe_error)}")
+
+        report_stage(deadline, 'axe', message="Running WCAG 2.1 AA checks (axe-core)")
+        axe_timeout = remaining_or(deadline, AXE_RUN_TIMEOUT_MS / 1000)
+        try:
+            results = await page.evaluate(AXE_RUN_SCRIPT, axe_timeout * 1000)
+        except Exception as eval_error:
+            if deadline is not None:
+                deadline.check()
+            logger.error(f"❌ axe-core evaluation failed: {eval_error}")
+            return scanner._create_error_result(url, f"Accessibility test failed: {str(eval_error)}")
+
+        if results.get('timedOut'):
+            if axe_timeout < AXE_RUN_TIMEOUT_MS / 1000:
+                raise DeadlineExceeded(f"axe-core run on {url} cut off by the scan deadline")
+            results = {'error': f"axe-core did not finish within {AXE_RUN_TIMEOUT_MS // 1000}s"}
+
+        if 'error' in results:
+            logger.error(f"❌ axe-core error: {results['error']}")
+            return scanner._create_error_result(url, results['error'])
+
+        violation_count = len(results.get('violations', []))
+        incomplete_count = len(results.get('incomplete', []))
+        logger.info(f"✅ [async] WCAG scan completed: {violation_count} violations, {incomplete_count} incomplete")
+        report_stage(deadline, 'axe', 75, f"{violation_count} violations, {incomplete_count} to review",
+                     violations=violation_count, incomplete=incomplete_count)
+        scan_results = scanner._parse_axe_results(results, url)
+        scan_results['metadata'].update({'engine': AXE_ENGINE, 'content_hash': page_hash})
+        return scan_results
+
+    async def close(self):
+        await self._close_browser()
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'max_concurrency': self.max_concurrency,
+            'active': self.active,
+            'completed': self.completed,
+            'launches': self.launches,
+            'pages_since_launch': self._pages_since_launch
+        }
+
+
+_engine: Optional[AsyncScanEngine] = None
+
+
+def get_async_engine() -> AsyncScanEngine:
+    global _engine
+    if _engine is None:
+        _engine = AsyncScanEngine(
+            max_concurrency=settings.async_scan_concurrency,
+            max_pages=settings.browser_max_pages
+        )
+    return _engine
+
+
+async def shutdown_async_engine():
+    global _engine
+    if _engine is not None:
+        await _engine.close()
+        _engine = None
+
+
+async def _browser_scan_within(url: str, deadline: Optional[ScanDeadline]) -> Dict[str, Any]:
+    """Engine scan bounded by the deadline and cancellable from any thread"""
+    if deadline is None:
+        return await get_async_engine().scan(url)
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(get_async_engine().scan(url, deadline))
+    unregister = deadline.on_cancel(lambda: loop.call_soon_threadsafe(task.cancel))
+    try:
+        return await asyncio.wait_for(task, timeout=deadline.budget())
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"Browser scan of {url} hit the scan deadline")
+    except asyncio.CancelledError:
+        if deadline.cancelled:
+            raise ScanCancelled(f"Browser scan of {url} was cancelled")
+        raise
+    finally:
+        unregister()
+
+
+async def scan_website_async(url: str, deadline: Optional[ScanDeadline] = None) -> Dict[str, Any]:
+    """Async counterpart of AIAccessibilityScanner.scan_website"""
+    scanner = get_scanner()
+    logger.info(f"🔍 Starting async accessibility scan for: {url}")
+    scan_results = None
+
+    try:
+        if scanner.playwright_available and not scanner.on_heroku:
+            try:
+                scan_results = await _browser_scan_within(url, deadline)
+                if not scan_results or scan_results.get('issues') is None:
+                    raise Exception("Playwright scan returned no results")
+            except ScanAborted:
+                raise
+            except Exception as playwright_error:
+                logger.warning(f"⚠️ Async Playwright scan failed, using fallback: {playwright_error}")
+                scan_results = None
+
+        if scan_results is None:
+            scan_results = await run_in_threadpool(scanner._run_fallback_scan, url, deadline)
+
+        if scan_results.get('from_cache'):
+            return scan_results
+
+        if scanner.ai_enabled and scan_results.get('issues'):
+            logger.info(f"🤖 Enhancing {len(scan_results['issues'])} issues with AI")
+            scan_results = await run_in_threadpool(scanner._enhance_with_ai, scan_results, url, deadline)
+
+        scanner._cache_results(url, scan_results)
+        return scan_results
+
+    except ScanAborted as e:
+        logger.warning(f"⏱️ Scan of {url} stopped ({e.reason}): {e}")
+        return scanner._partial_result(url, scan_results, e.reason)
+    except Exception as e:
+        logger.error(f"❌ Scan failed: {e}")
+        return {
+            'issues': [],
+            'issue_count': 0,
+            'scan_type': 'fallback',
+            'metadata': {'url': url},
+            'error': str(e)
+        }
+
+
+def _set_status(scan_id: int, status: str):
+    from database import SessionLocal
+    from models import ScanResult
+    db = SessionLocal()
+    try:
+        scan = db.get(ScanResult, scan_id)
+        if scan:
+            scan.status = status
+            if status == "failed":
+                scan.phase = "done"
+            db.commit()
+    finally:
+        db.close()
+
+
+def _persist_results(scan_id: int, results: Dict[str, Any]):
+    from database import SessionLocal
+    from models import ScanResult
+    db = SessionLocal()
+    try:
+        scan = db.get(ScanResult, scan_id)
+        if scan:
+            save_scan_results(db, scan, results)
+    finally:
+        db.close()
+
+
+async def scan_website_with_recommendations_async(scan_id: int, url: str) -> Dict[str, Any]:
+    """Async pipeline used by the API: scan on the loop, persist in the threadpool"""
+    stopped = await wait_for_slot(scan_id)
+    if stopped:
+        logger.info(f"⏭️ Not running scan {scan_id}: it is {stopped}")
+        return get_scanner()._partial_result(url, None, stopped)
+    try:
+        get_broadcaster().publish(scan_id, 'starting', message=f"Starting scan of {url}")
+        deadline = start_deadline(scan_id)
+        try:
+            results = await scan_website_async(url, deadline)
+        finally:
+            finish_deadline(scan_id)
+        await run_in_threadpool(_persist_results, scan_id, results)
+        return results
+    except Exception as e:
+        logger.error(f"❌ Scan {scan_id} failed: {e}")
+        try:
+            await run_in_threadpool(_set_status, scan_id, "failed")
+            get_broadcaster().finish(scan_id, "failed")
+        except Exception as db_error:
+            logger.error(f"❌ Failed to update scan status: {db_error}")
+        raise
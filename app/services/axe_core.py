@@ -0,0 +1,51 @@
+# services/axe_core.py
+"""
+Vendored axe-core.
+
+The minified bundle ships in services/vendor/ and is read into memory once
+when the module is imported, so browser scans never fetch it from a CDN.
+Bump AXE_CORE_VERSION together with the vendored file.
+"""
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+AXE_CORE_VERSION = "4.10.3"
+AXE_SOURCE_PATH = os.path.join(os.path.dirname(__file__), "vendor", "axe.min.js")
+
+# axe.run() invocation shared by the sync pool and the async engine.
+# Called with a time limit in ms; axe.run has no timeout of its own, so it
+# races a timer and reports { timedOut: true } when the limit is hit.
+AXE_RUN_SCRIPT = """
+async (timeoutMs) => {
+    try {
+        const run = axe.run({
+            runOnly: {
+                type: 'tag',
+                values: ['wcag2a', 'wcag2aa', 'wcag21aa']
+            },
+            resultTypes: ['violations', 'incomplete']
+        });
+        const timer = new Promise((resolve) => setTimeout(() => resolve({ timedOut: true }), timeoutMs));
+        return await Promise.race([run, timer]);
+    } catch (error) {
+        return { error: error.message };
+    }
+}
+"""
+AXE_RUN_TIMEOUT_MS = 15000
+
+AXE_LOADED_CHECK = 'typeof axe !== "undefined"'
+
+
+def _load_axe_source() -> str:
+    with open(AXE_SOURCE_PATH, encoding="utf-8") as fh:
+        source = fh.read()
+    if f"axe v{AXE_CORE_VERSION}" not in source[:200]:
+        logger.warning(f"⚠️ Vendored axe-core does not match pinned version {AXE_CORE_VERSION}")
+    logger.info(f"✅ Loaded vendored axe-core {AXE_CORE_VERSION} ({len(source) // 1024} KB)")
+    return source
+
+
+AXE_SOURCE = _load_axe_source()
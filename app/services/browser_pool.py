@@ -0,0 +1,304 @@
+# services/browser_pool.py
+"""
+Long-lived Chromium pool for Playwright scans.
+
+The sync Playwright API is bound to the thread that started it, so every
+browser slot owns a dedicated thread with its own driver and a warm browser.
+Scans are submitted as callables that receive a fresh BrowserContext; the
+slot closes the context afterwards and recycles the browser after N pages,
+when its own browser processes grow past the RSS ceiling (per slot), or
+after a crash.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# --single-process is intentionally absent: it is unstable once a browser
+# serves more than one context over its lifetime.
+CHROMIUM_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-web-security',
+    '--disable-features=VizDisplayCompositor',
+    '--disable-background-timer-throttling',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+    '--headless=new',
+    '--memory-pressure-off',
+    '--max_old_space_size=256',
+    '--javascript-harmony',
+    '--no-first-run',
+    '--no-zygote',
+    '--no-default-browser-check'
+]
+
+CONTEXT_OPTIONS = {
+    'viewport': {"width": 1280, "height": 720},
+    'java_script_enabled': True,
+    'ignore_https_errors': True
+}
+
+
+class BrowserPoolError(Exception):
+    """Raised when the pool cannot provide a browser"""
+
+
+def _process_tree_rss_mb(root_pid: int) -> float:
+    """Resident memory of all descendants of root_pid (Linux only, 0 elsewhere)"""
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return 0.0
+
+    children: Dict[int, List[int]] = {}
+    rss_pages: Dict[int, int] = {}
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as fh:
+                ppid = int(fh.read().rsplit(')', 1)[1].split()[1])
+            with open(f'/proc/{entry}/statm') as fh:
+                rss_pages[int(entry)] = int(fh.read().split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total = 0
+    stack = list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        total += rss_pages.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def _driver_pid(playwright) -> Optional[int]:
+    """pid of a Playwright instance's driver process; the browsers it launches are its children"""
+    try:
+        return playwright._impl_obj._connection._transport._proc.pid
+    except AttributeError:
+        return None
+
+
+class _BrowserSlot(threading.Thread):
+    """One warm browser driven from its own thread"""
+
+    def __init__(self, pool: "BrowserPool", index: int):
+        super().__init__(name=f"browser-slot-{index}", daemon=True)
+        self.pool = pool
+        self.index = index
+        self.browser = None
+        self.pages_since_launch = 0
+        self.pages_served = 0
+        self.launches = 0
+        self.crashes = 0
+        self.recycles = 0
+        self._playwright = None
+        self._driver_pid: Optional[int] = None
+
+    def run(self):
+        try:
+            from playwright.sync_api import sync_playwright
+            self._playwright = sync_playwright().start()
+        except Exception as e:
+            logger.error(f"❌ Browser slot {self.index} could not start Playwright: {e}")
+            self._drain(BrowserPoolError(f"Playwright unavailable: {e}"))
+            return
+        # Each slot has its own driver, so its tree holds this slot's browser and nothing else
+        self._driver_pid = _driver_pid(self._playwright)
+        if self.pool.max_rss_mb and self._driver_pid is None:
+            logger.warning(f"⚠️ Browser slot {self.index}: Playwright driver pid unknown, RSS ceiling disabled")
+
+        try:
+            while True:
+                job = self.pool._jobs.get()
+                if job is None:
+                    break
+                fn, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(self._run_job(fn))
+                except BaseException as e:
+                    future.set_exception(e)
+                self._maybe_recycle()
+        finally:
+            self._close_browser()
+            try:
+                self._playwright.stop()
+            except Exception:
+                pass
+
+    def _drain(self, error: Exception):
+        while True:
+            job = self.pool._jobs.get()
+            if job is None:
+                return
+            fn, future = job
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
+    def _ensure_browser(self):
+        if self.browser is not None and self.browser.is_connected():
+            return self.browser
+
+        if self.browser is not None:
+            self.crashes += 1
+            logger.warning(f"💥 Browser in slot {self.index} disconnected, relaunching")
+            self._close_browser()
+
+        logger.info(f"🚀 Launching pooled Chromium (slot {self.index})...")
+        self.browser = self._playwright.chromium.launch(
+            args=CHROMIUM_ARGS,
+            headless=True,
+            timeout=30000
+        )
+        self.launches += 1
+        self.pages_since_launch = 0
+        return self.browser
+
+    def _run_job(self, fn: Callable[[Any], Any]) -> Any:
+        browser = self._ensure_browser()
+        context = browser.new_context(**CONTEXT_OPTIONS)
+        try:
+            return fn(context)
+        finally:
+            self.pages_since_launch += 1
+            self.pages_served += 1
+            try:
+                context.close()
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to close browser context in slot {self.index}: {e}")
+
+    def _maybe_recycle(self):
+        if self.browser is None:
+            return
+        reason = None
+        if not self.browser.is_connected():
+            # Crash is counted and handled on the next _ensure_browser call
+            return
+        if self.pages_since_launch >= self.pool.max_pages:
+            reason = f"served {self.pages_since_launch} pages"
+        elif self.pool.max_rss_mb and self._driver_pid:
+            rss = _process_tree_rss_mb(self._driver_pid)
+            if rss >= self.pool.max_rss_mb:
+                reason = f"browser RSS {rss:.0f}MB over {self.pool.max_rss_mb}MB"
+        if reason:
+            logger.info(f"♻️ Recycling browser in slot {self.index}: {reason}")
+            self.recycles += 1
+            self._close_browser()
+
+    def _close_browser(self):
+        if self.browser is None:
+            return
+        try:
+            self.browser.close()
+        except Exception:
+            pass
+        self.browser = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'slot': self.index,
+            'connected': bool(self.browser and self.browser.is_connected()),
+            'pages_since_launch': self.pages_since_launch,
+            'pages_served': self.pages_served,
+            'launches': self.launches,
+            'crashes': self.crashes,
+            'recycles': self.recycles
+        }
+
+
+class BrowserPool:
+    """Per-process pool of warm Chromium browsers handing out fresh contexts"""
+
+    def __init__(self, size: int = 1, max_pages: int = 50, max_rss_mb: int = 0):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self.max_rss_mb = max_rss_mb
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._slots: List[_BrowserSlot] = []
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._slots = [_BrowserSlot(self, i) for i in range(self.size)]
+            for slot in self._slots:
+                slot.start()
+            self._started = True
+            logger.info(f"✅ Browser pool started with {self.size} slot(s)")
+
+    def submit(self, fn: Callable[[Any], Any]) -> Future:
+        """Queue fn(context) to run on the next free browser"""
+        if not self._started:
+            self.start()
+        future: Future = Future()
+        self._jobs.put((fn, future))
+        return future
+
+    def run(self, fn: Callable[[Any], Any], timeout: Optional[float] = None) -> Any:
+        """Run fn(context) on a pooled browser and wait for its result"""
+        return self.submit(fn).result(timeout=timeout)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if not self._started:
+                return
+            for _ in self._slots:
+                self._jobs.put(None)
+            if wait:
+                deadline = time.monotonic() + 10
+                for slot in self._slots:
+                    slot.join(timeout=max(0.0, deadline - time.monotonic()))
+            self._slots = []
+            self._started = False
+            logger.info("🛑 Browser pool shut down")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'size': self.size,
+            'max_pages': self.max_pages,
+            'max_rss_mb': self.max_rss_mb,
+            'queued': self._jobs.qsize(),
+            'slots': [slot.stats() for slot in self._slots]
+        }
+
+
+_pool: Optional[BrowserPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return this worker process's pool, creating it lazily (fork safe)"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = BrowserPool(
+                size=settings.browser_pool_size,
+                max_pages=settings.browser_max_pages,
+                max_rss_mb=settings.browser_max_rss_mb
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def shutdown_browser_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown()
+        _pool = None
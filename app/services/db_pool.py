@@ -0,0 +1,272 @@
+# services/db_pool.py
+"""
+Database connection pools: sizing, PgBouncer mode and metrics.
+
+Each process has up to two pools: the sync engine (worker, scanner and
+threadpool code) and the async engine (API routes). Each one holds up to
+DB_POOL_SIZE + DB_MAX_OVERFLOW connections. The web dyno runs 4 gunicorn
+workers (Procfile), so it alone can open 8 x (size + overflow)
+connections, and every `python -m worker` adds its sync pool on top.
+Size them so the total stays under the database's connection limit, and
+use /system/db-pool to see what each pool of a process actually needed.
+
+- DB_POOL_MODE "queue" keeps connections open between checkouts. "null"
+  opens a connection per checkout and closes it on checkin, for when an
+  external pooler (PgBouncer, Supabase's pooler on port 6543) pools.
+- DB_PGBOUNCER: in transaction mode PgBouncer hands each transaction any
+  server connection, so named prepared statements must not outlive one.
+  This turns off asyncpg's statement caches and names its statements
+  uniquely; psycopg2 does not prepare statements.
+- DB_PRE_PING "always" pings on every checkout, which costs a round trip
+  per checkout. "idle" only pings connections unused for more than
+  DB_PRE_PING_IDLE_SECONDS, the ones a server or pooler may have closed.
+  "never" relies on DB_POOL_RECYCLE and on errors invalidating the pool.
+
+Checkout wait is the time from asking the pool for a connection to
+getting one, including connecting when the pool opens a new connection.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+POOL_MODES = ("queue", "null")
+PRE_PING_MODES = ("always", "idle", "never")
+
+# Upper bounds (ms) of the cumulative checkout wait histogram
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+RECENT_WAITS = 1000
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 2)
+
+
+class PoolMetrics:
+    """Checkouts, connections in use and checkout wait of one engine's pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidated = 0
+        self.timeouts = 0
+        self.pre_pings = 0
+        self.pre_ping_failures = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.max_overflow = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._waits = deque(maxlen=RECENT_WAITS)
+        self._buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def waited(self, seconds: float):
+        ms = seconds * 1000
+        with self._lock:
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            self._waits.append(ms)
+            for i, bound in enumerate(WAIT_BUCKETS_MS):
+                if ms <= bound:
+                    self._buckets[i] += 1
+                    break
+            else:
+                self._buckets[-1] += 1
+
+    def timed_out(self, seconds: float):
+        with self._lock:
+            self.timeouts += 1
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def checked_out(self, pool):
+        overflow = pool.overflow() if isinstance(pool, QueuePool) else 0
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            self.max_overflow = max(self.max_overflow, overflow)
+
+    def checked_in(self):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        pool = self.engine.pool if self.engine is not None else None
+        queued = isinstance(pool, QueuePool)
+        with self._lock:
+            waits = sorted(self._waits)
+            counted = sum(self._buckets)
+            buckets, total = {}, 0
+            for bound, count in zip(WAIT_BUCKETS_MS, self._buckets):
+                total += count
+                buckets[f"le_{bound}"] = total
+            buckets["le_inf"] = counted
+            return {
+                'pool': type(pool).__bases__[-1].__name__ if pool is not None else None,
+                'size': pool.size() if queued else None,
+                'max_overflow': pool._max_overflow if queued else None,
+                'in_use': self.in_use,
+                'idle': pool.checkedin() if queued else 0,
+                'overflow': max(0, pool.overflow()) if queued else 0,
+                'max_in_use': self.max_in_use,
+                'max_overflow_used': self.max_overflow,
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'invalidated': self.invalidated,
+                'timeouts': self.timeouts,
+                'pre_pings': self.pre_pings,
+                'pre_ping_failures': self.pre_ping_failures,
+                'wait_ms_avg': round(self.wait_seconds * 1000 / counted, 2) if counted else 0.0,
+                'wait_ms_p50': _percentile(waits, 0.5),
+                'wait_ms_p95': _percentile(waits, 0.95),
+                'wait_ms_p99': _percentile(waits, 0.99),
+                'wait_ms_max': round(self.max_wait_seconds * 1000, 2),
+                'wait_histogram': buckets
+            }
+
+
+class _TimedCheckout:
+    """Pool mixin timing each checkout into the class's PoolMetrics"""
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timed_out(time.perf_counter() - started)
+            raise
+        self.metrics.waited(time.perf_counter() - started)
+        return connection
+
+
+# Set as a class attribute, so pools recreated by engine.dispose() keep their metrics
+def _timed(pool_class, metrics: PoolMetrics):
+    return type(f"Timed{pool_class.__name__}", (_TimedCheckout, pool_class), {'metrics': metrics})
+
+
+_metrics: Dict[str, PoolMetrics] = {}
+
+
+def pool_metrics(name: str) -> PoolMetrics:
+    if name not in _metrics:
+        _metrics[name] = PoolMetrics(name)
+    return _metrics[name]
+
+
+def _check_settings():
+    if settings.db_pool_mode not in POOL_MODES:
+        raise ValueError(f"Unknown DB_POOL_MODE {settings.db_pool_mode!r}; use one of {', '.join(POOL_MODES)}")
+    if settings.db_pre_ping not in PRE_PING_MODES:
+        raise ValueError(f"Unknown DB_PRE_PING {settings.db_pre_ping!r}; use one of {', '.join(PRE_PING_MODES)}")
+
+
+def engine_options(name: str, asynchronous: bool = False, pooled: bool = True) -> Dict[str, Any]:
+    """
+    create_engine / create_async_engine pool arguments from Settings, timed
+    into pool_metrics(name); pooled=False opens a connection per checkout
+    whatever DB_POOL_MODE says.
+    """
+    _check_settings()
+    metrics = pool_metrics(name)
+    if settings.db_pool_mode == "null" or not pooled:
+        options = {'poolclass': _timed(NullPool, metrics)}
+    else:
+        options = {
+            'poolclass': _timed(AsyncAdaptedQueuePool if asynchronous else QueuePool, metrics),
+            'pool_size': settings.db_pool_size,
+            'max_overflow': settings.db_max_overflow,
+            'pool_timeout': settings.db_pool_timeout
+        }
+    options['pool_recycle'] = settings.db_pool_recycle
+    options['pool_pre_ping'] = settings.db_pre_ping == "always"
+    return options
+
+
+def pgbouncer_connect_args(driver: str) -> Dict[str, Any]:
+    """connect_args that keep a PostgreSQL driver off prepared statements under transaction pooling"""
+    if not settings.db_pgbouncer or driver != 'asyncpg':
+        return {}
+    return {
+        'statement_cache_size': 0,
+        'prepared_statement_cache_size': 0,
+        'prepared_statement_name_func': lambda: f"__asyncpg_{uuid4()}__"
+    }
+
+
+def instrument(name: str, engine):
+    """Count checkouts, checkins, connects and invalidations of a sync engine's pool; ping idle connections"""
+    metrics = pool_metrics(name)
+    metrics.engine = engine
+    ping_idle = settings.db_pre_ping == "idle"
+    idle_seconds = settings.db_pre_ping_idle_seconds
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, record):
+        metrics.count('connects')
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, record, proxy):
+        checked_in_at = record.info.get('checked_in_at')
+        if ping_idle and checked_in_at is not None and time.monotonic() - checked_in_at > idle_seconds:
+            metrics.count('pre_pings')
+            try:
+                engine.dialect.do_ping(dbapi_connection)
+            except Exception as e:
+                metrics.count('pre_ping_failures')
+                logger.warning(f"🔌 Idle {name} database connection failed its ping, reconnecting: {e}")
+                # The pool invalidates the connection and retries the checkout
+                raise exc.DisconnectionError() from e
+        metrics.checked_out(engine.pool)
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, record):
+        record.info['checked_in_at'] = time.monotonic()
+        metrics.checked_in()
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, record, exception):
+        metrics.count('invalidated')
+
+
+def describe() -> str:
+    if settings.db_pool_mode == "null":
+        return "no pooling (DB_POOL_MODE=null)"
+    return (f"size {settings.db_pool_size} + overflow {settings.db_max_overflow}, "
+            f"timeout {settings.db_pool_timeout:g}s, pre-ping {settings.db_pre_ping}")
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Settings and live metrics of this process's database pools"""
+    per_engine: Optional[int] = None
+    if settings.db_pool_mode == "queue":
+        per_engine = settings.db_pool_size + settings.db_max_overflow
+    return {
+        'mode': settings.db_pool_mode,
+        'pgbouncer': settings.db_pgbouncer,
+        'pre_ping': settings.db_pre_ping,
+        'pre_ping_idle_seconds': settings.db_pre_ping_idle_seconds,
+        'recycle_seconds': settings.db_pool_recycle,
+        'timeout_seconds': settings.db_pool_timeout,
+        'max_connections_per_engine': per_engine,
+        'engines': {name: metrics.stats() for name, metrics in _metrics.items() if metrics.engine is not None}
+    }
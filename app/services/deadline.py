@@ -0,0 +1,174 @@
+# services/deadline.py
+"""
+Per-scan deadlines and cooperative cancellation.
+
+Every scan gets a ScanDeadline (SCAN_DEADLINE_SECONDS) that is passed
+down through fetch, browser, rules, AI and persistence. Each stage asks
+for budget(share, cap): its share of the time still left, never more than
+its usual limit. Stages call check() between steps and register
+on_cancel() callbacks that abort in-flight work (close an HTTP response,
+an OpenAI HTTP client, cancel the async browser task).
+
+POST /scan/{id}/cancel flips the scan row to "cancelled". The process
+running the scan may be another gunicorn worker or a queue worker, so a
+watcher thread in every process with active deadlines polls the rows of
+its scans and cancels the local deadline once a row leaves pending/scanning.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CANCEL_POLL_SECONDS = 2.0
+
+
+class ScanAborted(Exception):
+    """A scan stopped before finishing; whatever results exist are saved as partial"""
+    reason = "aborted"
+
+
+class DeadlineExceeded(ScanAborted):
+    reason = "deadline"
+
+
+class ScanCancelled(ScanAborted):
+    reason = "cancelled"
+
+
+class ScanDeadline:
+    """Time budget and cancellation flag of one scan"""
+
+    def __init__(self, seconds: float, scan_id: Optional[int] = None):
+        self.scan_id = scan_id
+        self.total = seconds
+        self.expires_at = time.monotonic() + seconds
+        self._cancelled = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self):
+        if self.cancelled:
+            raise ScanCancelled(f"Scan {self.scan_id} was cancelled")
+        if self.expired:
+            raise DeadlineExceeded(f"Scan {self.scan_id} exceeded its {self.total:.0f}s deadline")
+
+    def budget(self, share: float = 1.0, cap: Optional[float] = None) -> float:
+        """Seconds a stage may spend: its share of what is left, at most cap"""
+        self.check()
+        seconds = self.remaining() * share
+        if cap is not None:
+            seconds = min(cap, seconds)
+        return max(0.1, seconds)
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Run callback when the scan is cancelled; returns a function that unregisters it"""
+        with self._lock:
+            run_now = self.cancelled
+            if not run_now:
+                self._callbacks.append(callback)
+        if run_now:
+            self._run(callback)
+
+        def _unregister():
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+        return _unregister
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self._cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+        logger.info(f"🛑 Cancelling scan {self.scan_id}")
+        for callback in callbacks:
+            self._run(callback)
+
+    @staticmethod
+    def _run(callback: Callable[[], None]):
+        try:
+            callback()
+        except Exception as e:
+            logger.warning(f"⚠️ Cancel callback failed: {e}")
+
+
+def remaining_or(deadline: Optional[ScanDeadline], default: float, share: float = 1.0) -> float:
+    """Stage timeout: the usual limit, shortened by the deadline when there is one"""
+    return deadline.budget(share, cap=default) if deadline is not None else default
+
+
+_active: Dict[int, ScanDeadline] = {}
+_active_lock = threading.Lock()
+_watcher: Optional[threading.Thread] = None
+
+
+def start_deadline(scan_id: int, seconds: Optional[float] = None) -> ScanDeadline:
+    deadline = ScanDeadline(seconds or settings.scan_deadline_seconds, scan_id)
+    with _active_lock:
+        _active[scan_id] = deadline
+    _ensure_watcher()
+    return deadline
+
+
+def finish_deadline(scan_id: int):
+    with _active_lock:
+        _active.pop(scan_id, None)
+
+
+def cancel_local_scan(scan_id: int) -> bool:
+    """Cancel a scan running in this process; False if it runs elsewhere (the watcher will see it)"""
+    with _active_lock:
+        deadline = _active.get(scan_id)
+    if deadline is None:
+        return False
+    deadline.cancel()
+    return True
+
+
+def _ensure_watcher():
+    global _watcher
+    with _active_lock:
+        if _watcher is not None and _watcher.is_alive():
+            return
+        _watcher = threading.Thread(target=_watch_cancellations, name="scan-cancel-watcher", daemon=True)
+        _watcher.start()
+
+
+def _watch_cancellations():
+    from database import SessionLocal
+    from models import ScanResult
+    while True:
+        time.sleep(CANCEL_POLL_SECONDS)
+        with _active_lock:
+            scan_ids = [scan_id for scan_id, deadline in _active.items() if not deadline.cancelled]
+        if not scan_ids:
+            continue
+        db = SessionLocal()
+        try:
+            stopped = db.query(ScanResult.id).filter(
+                ScanResult.id.in_(scan_ids),
+                ScanResult.status.notin_(("pending", "scanning"))
+            ).all()
+        except Exception as e:
+            logger.warning(f"⚠️ Cancellation poll failed: {e}")
+            stopped = []
+        finally:
+            db.close()
+        for (scan_id,) in stopped:
+            cancel_local_scan(scan_id)
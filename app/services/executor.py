@@ -0,0 +1,216 @@
+# services/executor.py
+"""
+Process pool for CPU-bound stages: HTML parse + rules on large pages,
+report serialization and PDF rendering.
+
+Async handlers await run_cpu(); threads (BackgroundTasks, scan workers)
+call run_cpu_sync(). Functions and arguments cross the process boundary
+by pickle, so callers pass module-level functions and compact payloads
+(strings, dicts, tuples), never ORM objects or sessions.
+
+CPU_POOL_WORKERS=0 disables the pool: work runs inline, or in the
+threadpool for async callers. A crashed child (BrokenProcessPool) resets
+the pool and the call is retried inline. So is a call whose result
+cannot be pickled back: children pickle the result themselves and
+report UnpicklableResult instead of the pickle error, which would be
+indistinguishable from one raised by the function.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _init_child():
+    logging.basicConfig(level=logging.INFO)
+
+
+class UnpicklableResult(Exception):
+    """Raised in a pool child whose result cannot be sent back to the parent"""
+
+
+def _call_pickled(fn: Callable, *args) -> bytes:
+    result = fn(*args)
+    try:
+        return pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        # e.g. RecursionError for objects linked into a whole parse tree
+        raise UnpicklableResult(
+            f"{fn.__qualname__} returned an unpicklable {type(result).__name__} ({type(e).__name__}: {e})"
+        ) from None
+
+
+def _unpickled(future: Future) -> Future:
+    """Future of a _call_pickled result, decoded in the pool's result thread as a plain submit would be"""
+    decoded = Future()
+
+    def _done(done: Future):
+        if decoded.done():
+            return
+        if done.cancelled():
+            decoded.cancel()
+            return
+        try:
+            decoded.set_result(pickle.loads(done.result()))
+        except BaseException as e:
+            decoded.set_exception(e)
+
+    decoded.add_done_callback(lambda outer: outer.cancelled() and future.cancel())
+    future.add_done_callback(_done)
+    return decoded
+
+
+class CpuExecutor:
+    """Lazily started ProcessPoolExecutor with saturation metrics"""
+
+    def __init__(self, workers: int = 1, start_method: str = "spawn"):
+        self.workers = max(0, workers)
+        self.start_method = start_method
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+        self.inflight = 0
+        self.max_inflight = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_child
+            )
+            logger.info(f"🧮 CPU process pool started ({self.workers} workers, {self.start_method})")
+        return self._pool
+
+    def _reset_pool(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+                self.restarts += 1
+
+    def submit(self, fn: Callable, *args) -> Future:
+        started = time.monotonic()
+        with self._lock:
+            future = self._get_pool().submit(fn, *args)
+            self.submitted += 1
+            self.inflight += 1
+            self.max_inflight = max(self.max_inflight, self.inflight)
+
+        def _done(done: Future):
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.inflight -= 1
+                self.total_seconds += elapsed
+                self.max_seconds = max(self.max_seconds, elapsed)
+                if done.cancelled() or done.exception() is not None:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+
+        future.add_done_callback(_done)
+        return future
+
+    def run_sync(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) in the pool and wait (for use from worker threads)"""
+        if self.workers == 0:
+            return fn(*args)
+        try:
+            return _unpickled(self.submit(_call_pickled, fn, *args)).result()
+        except BrokenProcessPool:
+            logger.error("❌ CPU process pool broke; restarting it and running inline")
+            self._reset_pool()
+            return fn(*args)
+        except UnpicklableResult as e:
+            logger.error(f"❌ {e}; running inline")
+            return fn(*args)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Await fn(*args) in the pool without blocking the event loop"""
+        if self.workers == 0:
+            return await run_in_threadpool(fn, *args)
+        try:
+            return await asyncio.wrap_future(_unpickled(self.submit(_call_pickled, fn, *args)))
+        except BrokenProcessPool:
+            logger.error("❌ CPU process pool broke; restarting it and running in threadpool")
+            self._reset_pool()
+            return await run_in_threadpool(fn, *args)
+        except UnpicklableResult as e:
+            logger.error(f"❌ {e}; running in threadpool")
+            return await run_in_threadpool(fn, *args)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                'workers': self.workers,
+                'start_method': self.start_method,
+                'running': self._pool is not None,
+                'inflight': self.inflight,
+                'queued': max(0, self.inflight - self.workers),
+                'saturated': self.workers > 0 and self.inflight >= self.workers,
+                'max_inflight': self.max_inflight,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'restarts': self.restarts,
+                'avg_seconds': round(self.total_seconds / finished, 4) if finished else 0.0,
+                'max_seconds': round(self.max_seconds, 4)
+            }
+
+
+_executor: Optional[CpuExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+
+def get_cpu_executor() -> CpuExecutor:
+    """This process's CPU executor (created lazily, fork safe)"""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = CpuExecutor(
+                workers=settings.cpu_pool_workers,
+                start_method=settings.cpu_pool_start_method
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def run_cpu_sync(fn: Callable, *args) -> Any:
+    return get_cpu_executor().run_sync(fn, *args)
+
+
+async def run_cpu(fn: Callable, *args) -> Any:
+    return await get_cpu_executor().run(fn, *args)
+
+
+def shutdown_cpu_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown()
+        _executor = None
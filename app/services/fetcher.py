@@ -0,0 +1,258 @@
+# services/fetcher.py
+"""
+Bounded, streaming page fetch for the fallback scanner.
+
+The Content-Type is checked before any of the body is read, the body is
+streamed with a byte cap and a wall-clock cap, and it is decoded
+incrementally with the declared charset (HTTP header, then <meta charset>
+in the first bytes, then UTF-8) instead of buffering everything and running
+charset detection over the whole payload. Requests go through the shared
+pooled client in services/http_client.py. Callers may pass conditional
+headers; a 304 comes back as a FetchResult with not_modified set and no body.
+The SHA-256 of the raw bytes read is recorded for the result cache.
+With a scan deadline the time cap shrinks to the scan's remaining budget,
+and cancelling the scan closes the response; the bytes read so far are
+returned as a truncated result ('deadline' / 'cancelled').
+"""
+import codecs
+import hashlib
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from config import settings
+from services.deadline import ScanDeadline
+from services.http_client import FetchClient, get_fetch_client
+
+logger = logging.getLogger(__name__)
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRIES = 2
+BACKOFF_FACTOR = 0.5
+SNIFF_BYTES = 1024
+# Share of the remaining scan deadline the download may use; analysis and AI get the rest
+FETCH_DEADLINE_SHARE = 0.6
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_\-:.]+)', re.IGNORECASE)
+
+
+class FetchError(Exception):
+    """Raised when a page cannot be fetched for analysis"""
+
+
+class UnsupportedContentType(FetchError):
+    """Raised before downloading a body that is not HTML"""
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status_code: int
+    content_type: str
+    encoding: str
+    html: str
+    bytes_read: int
+    truncated: bool = False
+    truncated_reason: Optional[str] = None
+    elapsed: float = 0.0
+    headers: Dict[str, str] = field(default_factory=dict)
+    content_hash: Optional[str] = None
+    not_modified: bool = False
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get('etag')
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get('last-modified')
+
+    def metadata(self) -> Dict[str, Any]:
+        """Fetch details merged into the scan result metadata"""
+        return {
+            'final_url': self.url,
+            'content_type': self.content_type,
+            'encoding': self.encoding,
+            'bytes_read': self.bytes_read,
+            'truncated': self.truncated,
+            'truncated_reason': self.truncated_reason,
+            'fetch_seconds': round(self.elapsed, 3),
+            'content_hash': self.content_hash,
+            'etag': self.etag,
+            'last_modified': self.last_modified
+        }
+
+
+def _header_charset(content_type: str) -> Optional[str]:
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset' and value.strip():
+            return value.strip().strip('"\'')
+    return None
+
+
+def _valid_codec(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def fetch_page(
+    url: str,
+    client: Optional[FetchClient] = None,
+    max_bytes: Optional[int] = None,
+    max_seconds: Optional[float] = None,
+    connect_timeout: float = 10,
+    headers: Optional[Dict[str, str]] = None,
+    deadline: Optional[ScanDeadline] = None,
+    on_progress: Optional[Callable[[int, Optional[int]], None]] = None,
+) -> FetchResult:
+    """Stream an HTML page with size and time limits; on_progress(bytes_read, content_length) per chunk"""
+    max_bytes = max_bytes if max_bytes is not None else settings.fetch_max_bytes
+    max_seconds = max_seconds if max_seconds is not None else settings.fetch_max_seconds
+    time_reason = 'time'
+    if deadline is not None:
+        budget = deadline.budget(FETCH_DEADLINE_SHARE)
+        if budget < max_seconds:
+            max_seconds, time_reason = budget, 'deadline'
+        connect_timeout = min(connect_timeout, max_seconds)
+    client = client or get_fetch_client()
+    timeout = httpx.Timeout(min(connect_timeout, max_seconds), connect=connect_timeout)
+
+    start = time.monotonic()
+    for attempt in range(RETRIES + 1):
+        with client.stream('GET', url, timeout=timeout, headers=headers) as response:
+            if response.status_code in RETRY_STATUSES and attempt < RETRIES:
+                if deadline is not None:
+                    deadline.check()
+                time.sleep(BACKOFF_FACTOR * (2 ** attempt))
+                continue
+            if response.status_code == 304:
+                return FetchResult(
+                    url=str(response.url),
+                    status_code=304,
+                    content_type='',
+                    encoding='',
+                    html='',
+                    bytes_read=0,
+                    elapsed=time.monotonic() - start,
+                    headers={k.lower(): v for k, v in response.headers.items()},
+                    not_modified=True
+                )
+            response.raise_for_status()
+            if deadline is None:
+                return _read_body(response, start, max_bytes, max_seconds, time_reason, on_progress=on_progress)
+            # Cancelling the scan closes the stream, which unblocks a read in progress
+            unregister = deadline.on_cancel(response.close)
+            try:
+                return _read_body(response, start, max_bytes, max_seconds, time_reason, deadline, on_progress)
+            finally:
+                unregister()
+
+
+def _read_body(
+    response: httpx.Response,
+    start: float,
+    max_bytes: int,
+    max_seconds: float,
+    time_reason: str = 'time',
+    deadline: Optional[ScanDeadline] = None,
+    on_progress: Optional[Callable[[int, Optional[int]], None]] = None,
+) -> FetchResult:
+    url = str(response.url)
+    content_type = response.headers.get('Content-Type', '')
+    mime_type = content_type.split(';')[0].strip().lower()
+    # A missing Content-Type is sniffed as HTML, anything else must be HTML
+    if mime_type and mime_type not in HTML_CONTENT_TYPES:
+        raise UnsupportedContentType(f"Unsupported content type: {mime_type}")
+
+    encoding = _valid_codec(_header_charset(content_type))
+    content_length = response.headers.get('Content-Length')
+    content_length = int(content_length) if content_length and content_length.isdigit() else None
+    digest = hashlib.sha256()
+    decoder = None
+    pending = b''
+    parts: List[str] = []
+    bytes_read = 0
+    truncated_reason = None
+
+    # Chunks as they arrive, so the time cap also holds for slowly trickling servers
+    chunks = response.iter_bytes()
+    while True:
+        try:
+            chunk = next(chunks, None)
+        except Exception:
+            # A read interrupted by the cancel callback closing the stream
+            if deadline is None or not deadline.cancelled:
+                raise
+            chunk = None
+        if deadline is not None and deadline.cancelled:
+            truncated_reason = 'cancelled'
+            break
+        if chunk is None:
+            break
+        if not chunk:
+            continue
+        remaining = max_bytes - bytes_read
+        if len(chunk) > remaining:
+            chunk = chunk[:remaining]
+            truncated_reason = 'max_bytes'
+        bytes_read += len(chunk)
+        digest.update(chunk)
+        if on_progress is not None:
+            on_progress(bytes_read, content_length)
+
+        if decoder is None:
+            # Hold back the first bytes until a <meta charset> could be seen
+            pending += chunk
+            if len(pending) < SNIFF_BYTES and truncated_reason is None:
+                continue
+            encoding = encoding or _sniff_meta_charset(pending) or 'utf-8'
+            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+            chunk, pending = pending, b''
+        parts.append(decoder.decode(chunk))
+
+        if truncated_reason is None and bytes_read >= max_bytes:
+            truncated_reason = 'max_bytes'
+        if truncated_reason is None and time.monotonic() - start > max_seconds:
+            truncated_reason = time_reason
+        if truncated_reason:
+            break
+
+    if decoder is None:
+        encoding = encoding or _sniff_meta_charset(pending) or 'utf-8'
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        parts.append(decoder.decode(pending))
+    parts.append(decoder.decode(b'', final=True))
+
+    if truncated_reason:
+        logger.warning(f"✂️ Truncated {url} after {bytes_read} bytes ({truncated_reason})")
+
+    return FetchResult(
+        url=url,
+        status_code=response.status_code,
+        content_type=mime_type or 'text/html',
+        encoding=encoding,
+        html=''.join(parts),
+        bytes_read=bytes_read,
+        truncated=truncated_reason is not None,
+        truncated_reason=truncated_reason,
+        elapsed=time.monotonic() - start,
+        headers={k.lower(): v for k, v in response.headers.items()},
+        content_hash=digest.hexdigest()
+    )
+
+
+def _sniff_meta_charset(head: bytes) -> Optional[str]:
+    match = _META_CHARSET.search(head[:SNIFF_BYTES])
+    if match:
+        return _valid_codec(match.group(1).decode('ascii', 'ignore'))
+    return None
@@ -0,0 +1,169 @@
+# services/html_parser.py
+"""
+Pluggable HTML parser backends for the fallback scanner.
+
+Every backend returns a ParsedDocument whose elements expose the small
+BeautifulSoup-style API the rules rely on (name, attrs, get, get_text,
+find, find_parent, str()). BeautifulSoup backends hand out real Tags;
+the selectolax/lexbor backend wraps its nodes in SelectolaxElement.
+
+HTML_PARSER selects the backend: "auto" picks the fastest installed one
+(selectolax, then lxml), otherwise "selectolax", "lxml" or "html.parser".
+Unavailable backends fall back to the stdlib html.parser.
+"""
+import logging
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BACKEND_PREFERENCE = ("selectolax", "lxml", "html.parser")
+
+
+class ParsedDocument:
+    """A parsed page: iterate its elements once, in document order"""
+    backend: str = ""
+
+    def iter_elements(self) -> Iterator[Any]:
+        raise NotImplementedError
+
+    def page_title(self, default: Optional[str] = None) -> Optional[str]:
+        raise NotImplementedError
+
+
+class SoupDocument(ParsedDocument):
+    """BeautifulSoup tree built by html.parser or lxml"""
+
+    def __init__(self, html_content: str, backend: str):
+        from bs4 import BeautifulSoup
+        self.backend = backend
+        self.soup = BeautifulSoup(html_content, backend)
+
+    def iter_elements(self) -> Iterator[Any]:
+        from bs4 import Tag
+        for element in self.soup.descendants:
+            if isinstance(element, Tag):
+                yield element
+
+    def page_title(self, default: Optional[str] = None) -> Optional[str]:
+        if self.soup.title is None:
+            return default
+        # A plain str: NavigableString drags its whole tree into pickle (and the process pool)
+        return self.soup.title.get_text() or None
+
+
+class SelectolaxElement:
+    """Adapter giving a lexbor node the subset of the bs4 Tag API used by rules"""
+
+    # Attributes bs4 treats as whitespace-separated lists
+    list_attributes = ('class', 'rel', 'rev', 'headers', 'accesskey')
+
+    __slots__ = ('node', 'name', '_attrs')
+
+    def __init__(self, node):
+        self.node = node
+        self.name = node.tag
+        self._attrs = None
+
+    @property
+    def attrs(self) -> Dict[str, Any]:
+        if self._attrs is None:
+            attrs = {}
+            for key, value in self.node.attributes.items():
+                value = '' if value is None else value
+                if key in self.list_attributes:
+                    value = value.split()
+                attrs[key] = value
+            self._attrs = attrs
+        return self._attrs
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.attrs.get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        return self.attrs[key]
+
+    def get_text(self) -> str:
+        return self.node.text(deep=True)
+
+    def find(self, name: str) -> Optional["SelectolaxElement"]:
+        node = self.node.css_first(name)
+        return SelectolaxElement(node) if node is not None else None
+
+    def find_parent(self, name: str) -> Optional["SelectolaxElement"]:
+        node = self.node.parent
+        while node is not None:
+            if node.tag == name:
+                return SelectolaxElement(node)
+            node = node.parent
+        return None
+
+    def __str__(self) -> str:
+        return self.node.html or ''
+
+
+class SelectolaxDocument(ParsedDocument):
+    """lexbor tree from selectolax; much faster to build than a BeautifulSoup tree"""
+    backend = "selectolax"
+
+    def __init__(self, html_content: str):
+        from selectolax.lexbor import LexborHTMLParser
+        self.tree = LexborHTMLParser(html_content)
+
+    def iter_elements(self) -> Iterator[Any]:
+        root = self.tree.root
+        if root is None:
+            return
+        for node in root.traverse(include_text=False):
+            tag = node.tag
+            # Skip comment/doctype pseudo nodes
+            if tag and tag[0] not in '-_!':
+                yield SelectolaxElement(node)
+
+    def page_title(self, default: Optional[str] = None) -> Optional[str]:
+        title = self.tree.css_first('title')
+        if title is None:
+            return default
+        return title.text() or None
+
+
+def _backend_available(backend: str) -> bool:
+    try:
+        if backend == "selectolax":
+            import selectolax.lexbor  # noqa: F401
+        elif backend == "lxml":
+            import lxml  # noqa: F401
+        elif backend != "html.parser":
+            return False
+        return True
+    except ImportError:
+        return False
+
+
+def available_backends() -> List[str]:
+    return [backend for backend in BACKEND_PREFERENCE if _backend_available(backend)]
+
+
+_resolved: Dict[str, str] = {}
+
+
+def resolve_backend(requested: str = "auto") -> str:
+    """Map a configured parser name to an installed backend (cached)"""
+    requested = (requested or "auto").lower()
+    if requested not in _resolved:
+        if requested == "auto":
+            backend = available_backends()[0]
+        elif _backend_available(requested):
+            backend = requested
+        else:
+            logger.warning(f"⚠️ HTML parser '{requested}' not available, using html.parser")
+            backend = "html.parser"
+        logger.info(f"🧩 HTML parser backend: {backend}")
+        _resolved[requested] = backend
+    return _resolved[requested]
+
+
+def parse_html(html_content: str, backend: str = "auto") -> ParsedDocument:
+    backend = resolve_backend(backend)
+    if backend == "selectolax":
+        return SelectolaxDocument(html_content)
+    return SoupDocument(html_content, backend)
@@ -0,0 +1,606 @@
+# services/html_rules.py
+"""
+Single-pass rule engine for the static HTML analyzer.
+
+Rules register themselves with @register_rule and declare the tag names
+and/or attributes they care about. The engine walks the parsed document
+once (through whichever parser backend produced it, see
+services/html_parser.py) and dispatches every element to the matching rules; document-level
+checks are emitted from finish(). Each rule collects its own issues and
+the engine concatenates them in registration order, so the output matches
+the old rule-by-rule analyzer.
+
+The same traversal fills a DocumentIndex (ids, label[for] targets and ids
+referenced from ARIA relationship attributes) so rules never have to search
+the whole document for a single element.
+"""
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
+
+# Bump whenever a rule is added or its output changes
+RULESET_VERSION = "2"
+
+# Elements visited between checks of the analysis time budget
+DEADLINE_CHECK_EVERY = 256
+
+RULE_REGISTRY: List[Type["HtmlRule"]] = []
+
+
+def register_rule(cls: Type["HtmlRule"]) -> Type["HtmlRule"]:
+    RULE_REGISTRY.append(cls)
+    return cls
+
+
+def css_selector(element) -> str:
+    """Generate a simple CSS selector for an element"""
+    try:
+        if element.get('id'):
+            return f"#{element['id']}"
+        elif element.get('class'):
+            classes = ' '.join(element['class'])
+            return f".{classes}"
+        else:
+            return element.name
+    except:
+        return "element"
+
+
+class DocumentIndex:
+    """Lookups built once per document during the engine traversal"""
+
+    reference_attrs = ('aria-labelledby', 'aria-describedby')
+
+    def __init__(self):
+        self.ids: Dict[str, Any] = {}
+        self.id_counts: Dict[str, int] = {}
+        self.labels_for: Dict[str, Any] = {}
+        self.referenced_ids: Set[str] = set()
+
+    def add(self, element):
+        attrs = element.attrs
+        element_id = attrs.get('id')
+        if element_id:
+            if element_id in self.ids:
+                self.id_counts[element_id] += 1
+            else:
+                self.ids[element_id] = element
+                self.id_counts[element_id] = 1
+        if element.name == 'label':
+            target = attrs.get('for')
+            if target is not None and target not in self.labels_for:
+                self.labels_for[target] = element
+        for attr in self.reference_attrs:
+            value = attrs.get(attr)
+            if value:
+                self.referenced_ids.update(value.split())
+
+    def duplicate_ids(self) -> List[Tuple[str, int]]:
+        return [(element_id, count) for element_id, count in self.id_counts.items() if count > 1]
+
+
+class HtmlRule:
+    """Base rule: visit() gets every matching element, finish() runs once at the end"""
+    name: str = ""
+    tags: Tuple[str, ...] = ()
+    attrs: Tuple[str, ...] = ()
+    index: DocumentIndex = None
+
+    def __init__(self):
+        self.issues: List[Dict[str, Any]] = []
+
+    def visit(self, element):
+        pass
+
+    def finish(self):
+        pass
+
+
+class RuleEngine:
+    """Dispatches each element of one traversal to the rules registered for it"""
+
+    def __init__(self, rule_classes: Optional[List[Type[HtmlRule]]] = None):
+        self.rule_classes = list(rule_classes if rule_classes is not None else RULE_REGISTRY)
+        self._by_tag: Dict[str, Tuple[int, ...]] = {}
+        self._by_attr: Dict[str, Tuple[int, ...]] = {}
+        for position, cls in enumerate(self.rule_classes):
+            for tag in cls.tags:
+                self._by_tag[tag] = self._by_tag.get(tag, ()) + (position,)
+            for attr in cls.attrs:
+                self._by_attr[attr] = self._by_attr.get(attr, ()) + (position,)
+
+    def analyze(self, document) -> List[Dict[str, Any]]:
+        return self.analyze_within(document)[0]
+
+    def analyze_within(self, document, time_budget: Optional[float] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """(issues, complete). Out of time, the traversal stops and the
+        document-wide checks in finish() are skipped, since they would
+        misreport on a half-visited page."""
+        stop_at = time.monotonic() + time_budget if time_budget is not None else None
+        index = DocumentIndex()
+        rules = [cls() for cls in self.rule_classes]
+        for rule in rules:
+            rule.index = index
+        by_tag = self._by_tag
+        by_attr = self._by_attr
+
+        complete = True
+        for count, element in enumerate(document.iter_elements()):
+            if stop_at is not None and count % DEADLINE_CHECK_EVERY == 0 and time.monotonic() > stop_at:
+                complete = False
+                break
+            index.add(element)
+            targets = by_tag.get(element.name, ())
+            for attr in element.attrs:
+                extra = by_attr.get(attr)
+                if extra:
+                    targets = targets + tuple(i for i in extra if i not in targets)
+            for position in targets:
+                rules[position].visit(element)
+
+        issues: List[Dict[str, Any]] = []
+        for rule in rules:
+            if complete:
+                rule.finish()
+            issues.extend(rule.issues)
+        return issues, complete
+
+
+_default_engine: Optional[RuleEngine] = None
+
+
+def get_rule_engine() -> RuleEngine:
+    global _default_engine
+    if _default_engine is None or len(_default_engine.rule_classes) != len(RULE_REGISTRY):
+        _default_engine = RuleEngine()
+    return _default_engine
+
+
+# ----------------------------
+# Rules (registration order = report order)
+# ----------------------------
+@register_rule
+class DocumentTitleRule(HtmlRule):
+    name = "document-title"
+    tags = ('title',)
+
+    def __init__(self):
+        super().__init__()
+        self.title = None
+
+    def visit(self, element):
+        if self.title is None:
+            self.title = element
+
+    def finish(self):
+        if self.title is None:
+            self.issues.append({
+                'type': 'violation',
+                'code': 'document-title',
+                'message': 'Document does not have a title',
+                'description': 'Page must have a title that describes topic or purpose',
+                'context': 'Missing <title> tag in <head>',
+                'selector': 'head',
+                'impact': 'serious'
+            })
+        elif not self.title.get_text().strip():
+            self.issues.append({
+                'type': 'violation',
+                'code': 'empty-title',
+                'message': 'Document title is empty',
+                'description': 'Page title should contain descriptive text',
+                'context': '<title></title>',
+                'selector': 'head > title',
+                'impact': 'serious'
+            })
+
+
+@register_rule
+class HtmlLangRule(HtmlRule):
+    name = "html-has-lang"
+    tags = ('html',)
+
+    def __init__(self):
+        super().__init__()
+        self.html_tag = None
+
+    def visit(self, element):
+        if self.html_tag is None:
+            self.html_tag = element
+
+    def finish(self):
+        if self.html_tag is None or not self.html_tag.get('lang'):
+            self.issues.append({
+                'type': 'violation',
+                'code': 'html-has-lang',
+                'message': 'HTML element missing lang attribute',
+                'description': 'The html element must have a lang attribute',
+                'context': '<html> element',
+                'selector': 'html',
+                'impact': 'serious'
+            })
+
+
+@register_rule
+class MetaViewportRule(HtmlRule):
+    name = "meta-viewport"
+    tags = ('meta',)
+
+    def __init__(self):
+        super().__init__()
+        self.found = False
+
+    def visit(self, element):
+        if element.get('name') == 'viewport':
+            self.found = True
+
+    def finish(self):
+        if not self.found:
+            self.issues.append({
+                'type': 'violation',
+                'code': 'meta-viewport',
+                'message': 'Viewport meta tag is missing',
+                'description': 'Viewport tag should be present for mobile responsiveness',
+                'context': '<head> section',
+                'selector': 'head',
+                'impact': 'moderate'
+            })
+
+
+@register_rule
+class ImageAltRule(HtmlRule):
+    name = "image-alt"
+    tags = ('img',)
+
+    def visit(self, img):
+        alt = img.get('alt')
+        if alt is None:  # Missing alt entirely
+            self.issues.append({
+                'type': 'violation',
+                'code': 'image-alt',
+                'message': 'Image missing alt text',
+                'description': 'Images must have alt text or be marked as decorative',
+                'context': str(img)[:100],
+                'selector': css_selector(img),
+                'impact': 'critical'
+            })
+        elif alt == '' and not img.get('role') == 'presentation' and not img.get('aria-hidden') == 'true':
+            # Empty alt but not marked as decorative
+            self.issues.append({
+                'type': 'violation',
+                'code': 'image-alt-decorative',
+                'message': 'Image with empty alt should be marked as decorative',
+                'description': 'Images with empty alt text should have role="presentation" or aria-hidden="true"',
+                'context': str(img)[:100],
+                'selector': css_selector(img),
+                'impact': 'moderate'
+            })
+
+
+@register_rule
+class HeadingRule(HtmlRule):
+    name = "headings"
+    tags = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+    def __init__(self):
+        super().__init__()
+        self.levels: List[int] = []
+
+    def visit(self, heading):
+        self.levels.append(int(heading.name[1]))
+
+    def finish(self):
+        if 1 not in self.levels:
+            self.issues.append({
+                'type': 'violation',
+                'code': 'page-has-heading-one',
+                'message': 'Page missing H1 heading',
+                'description': 'Page should have a level-one heading',
+                'context': 'Page content',
+                'selector': 'body',
+                'impact': 'moderate'
+            })
+
+        # Check heading hierarchy
+        if self.levels:
+            current_level = self.levels[0]
+            for level in self.levels[1:]:
+                if level > current_level + 1:
+                    self.issues.append({
+                        'type': 'violation',
+                        'code': 'heading-order',
+                        'message': 'Heading levels should not be skipped',
+                        'description': 'Headings should be in sequential order (e.g., h1 then h2, not h1 then h3)',
+                        'context': f'Heading level jump from {current_level} to {level}',
+                        'selector': 'h1, h2, h3, h4, h5, h6',
+                        'impact': 'moderate'
+                    })
+                current_level = level
+
+
+@register_rule
+class FormLabelRule(HtmlRule):
+    name = "label"
+    tags = ('input',)
+    labelled_types = ('text', 'password', 'email', 'search', 'tel', 'url', 'number')
+
+    def __init__(self):
+        super().__init__()
+        # (input, has_ancestor_label) in document order; labels may follow their input
+        self.inputs: List[Tuple[Any, bool]] = []
+
+    def visit(self, element):
+        if element.get('type', 'text') in self.labelled_types:
+            self.inputs.append((element, element.find_parent('label') is not None))
+
+    def finish(self):
+        for input_elem, inside_label in self.inputs:
+            input_id = input_elem.get('id')
+            if input_id:
+                if input_id not in self.index.labels_for and not inside_label:
+                    self.issues.append({
+                        'type': 'violation',
+                        'code': 'label',
+                        'message': 'Form input missing associated label',
+                        'description': 'Form inputs must have associated labels',
+                        'context': str(input_elem)[:100],
+                        'selector': css_selector(input_elem),
+                        'impact': 'critical'
+                    })
+            elif not (input_elem.get('aria-label') or input_elem.get('aria-labelledby')):
+                # No id, check for aria-label or aria-labelledby
+                self.issues.append({
+                    'type': 'violation',
+                    'code': 'input-label',
+                    'message': 'Form input missing accessible name',
+                    'description': 'Form inputs must have an accessible name via label, aria-label, or aria-labelledby',
+                    'context': str(input_elem)[:100],
+                    'selector': css_selector(input_elem),
+                    'impact': 'critical'
+                })
+
+
+@register_rule
+class ButtonNameRule(HtmlRule):
+    name = "button-name"
+    tags = ('button',)
+
+    def visit(self, button):
+        if not button.get_text().strip() and not (button.get('aria-label') or button.get('aria-labelledby')):
+            self.issues.append({
+                'type': 'violation',
+                'code': 'button-name',
+                'message': 'Button missing accessible name',
+                'description': 'Buttons must have an accessible name',
+                'context': str(button)[:100],
+                'selector': css_selector(button),
+                'impact': 'critical'
+            })
+
+
+@register_rule
+class LinkRule(HtmlRule):
+    name = "link-name"
+    tags = ('a',)
+    generic_texts = ('click here', 'read more', 'here', 'link', 'more info')
+
+    def visit(self, link):
+        if link.get('href') is None:
+            return
+        link_text = link.get_text().strip()
+        if not link_text and not (link.get('aria-label') or link.get('aria-labelledby')):
+            # Check for image alt text if link contains only image
+            img_in_link = link.find('img')
+            if not img_in_link or not img_in_link.get('alt'):
+                self.issues.append({
+                    'type': 'violation',
+                    'code': 'link-name',
+                    'message': 'Link missing accessible name',
+                    'description': 'Links must have discernible text',
+                    'context': str(link)[:100],
+                    'selector': css_selector(link),
+                    'impact': 'serious'
+                })
+
+        # Check for generic link text
+        if link_text.lower() in self.generic_texts:
+            self.issues.append({
+                'type': 'violation',
+                'code': 'link-purpose',
+                'message': 'Link text is not descriptive',
+                'description': 'Link text should describe the purpose of the link',
+                'context': f'Link text: "{link_text}"',
+                'selector': css_selector(link),
+                'impact': 'moderate'
+            })
+
+
+@register_rule
+class ColorContrastRule(HtmlRule):
+    name = "color-contrast-potential"
+    attrs = ('style',)
+    limit = 20  # Only the first styled elements, for performance
+
+    def __init__(self):
+        super().__init__()
+        self.seen = 0
+
+    def visit(self, elem):
+        if self.seen >= self.limit:
+            return
+        self.seen += 1
+        style = elem.get('style', '').lower()
+        if 'color:' in style and 'background' not in style:
+            self.issues.append({
+                'type': 'violation',
+                'code': 'color-contrast-potential',
+                'message': 'Potential color contrast issue',
+                'description': 'Text color defined without background color may have contrast issues',
+                'context': str(elem)[:100],
+                'selector': css_selector(elem),
+                'impact': 'moderate'
+            })
+
+
+@register_rule
+class AriaLabelRule(HtmlRule):
+    name = "aria-label-empty"
+    attrs = ('aria-label',)
+
+    def visit(self, elem):
+        aria_label = elem.get('aria-label', '').strip()
+        if not aria_label:
+            self.issues.append({
+                'type': 'violation',
+                'code': 'aria-label-empty',
+                'message': 'ARIA label is empty',
+                'description': 'aria-label should not be empty',
+                'context': str(elem)[:100],
+                'selector': css_selector(elem),
+                'impact': 'moderate'
+            })
+
+
+@register_rule
+class TableHeadersRule(HtmlRule):
+    name = "table-headers"
+    tags = ('table',)
+
+    def visit(self, table):
+        if not table.find('th') and not table.get('role') == 'presentation':
+            self.issues.append({
+                'type': 'violation',
+                'code': 'table-headers',
+                'message': 'Data table missing headers',
+                'description': 'Data tables should have header cells',
+                'context': str(table)[:100],
+                'selector': css_selector(table),
+                'impact': 'serious'
+            })
+
+
+@register_rule
+class LandmarksRule(HtmlRule):
+    name = "landmarks"
+    tags = ('header', 'main', 'nav', 'footer')
+    attrs = ('role',)
+    landmark_roles = ('banner', 'main', 'navigation', 'contentinfo')
+
+    def __init__(self):
+        super().__init__()
+        self.found = False
+
+    def visit(self, elem):
+        if elem.name in self.tags or elem.get('role') in self.landmark_roles:
+            self.found = True
+
+    def finish(self):
+        if not self.found:
+            self.issues.append({
+                'type': 'violation',
+                'code': 'landmarks',
+                'message': 'Page missing semantic landmarks',
+                'description': 'Use semantic HTML5 elements or ARIA landmarks for page structure',
+                'context': 'Page structure',
+                'selector': 'body',
+                'impact': 'moderate'
+            })
+
+
+@register_rule
+class FocusVisibleRule(HtmlRule):
+    name = "focus-visible"
+    attrs = ('style',)
+    limit = 10
+
+    def __init__(self):
+        super().__init__()
+        self.seen = 0
+
+    def visit(self, elem):
+        if self.seen >= self.limit:
+            return
+        self.seen += 1
+        style = elem.get('style', '').lower()
+        if 'outline: none' in style or 'outline: 0' in style:
+            self.issues.append({
+                'type': 'violation',
+                'code': 'focus-visible',
+                'message': 'Focus indicator removed',
+                'description': 'Focus indicators should not be removed without providing custom focus styles',
+                'context': str(elem)[:100],
+                'selector': css_selector(elem),
+                'impact': 'serious'
+            })
+
+
+@register_rule
+class SkipLinkRule(HtmlRule):
+    name = "skip-link"
+    tags = ('a',)
+
+    def __init__(self):
+        super().__init__()
+        self.found = False
+
+    def visit(self, link):
+        href = link.get('href')
+        if href and ('#main' in href or '#content' in href):
+            self.found = True
+
+    def finish(self):
+        if not self.found:
+            self.issues.append({
+                'type': 'violation',
+                'code': 'skip-link',
+                'message': 'Skip to main content link missing',
+                'description': 'Provide a skip link to bypass repetitive content',
+                'context': 'Page navigation',
+                'selector': 'body',
+                'impact': 'moderate'
+            })
+
+
+@register_rule
+class AriaLabelledbyRule(HtmlRule):
+    name = "invalid-aria-labelledby"
+    attrs = ('aria-labelledby',)
+
+    def __init__(self):
+        super().__init__()
+        self.elements: List[Any] = []
+
+    def visit(self, elem):
+        self.elements.append(elem)
+
+    def finish(self):
+        for elem in self.elements:
+            missing = [ref for ref in elem.get('aria-labelledby', '').split() if ref not in self.index.ids]
+            if missing:
+                self.issues.append({
+                    'type': 'violation',
+                    'code': 'invalid-aria-labelledby',
+                    'message': 'aria-labelledby references missing elements',
+                    'description': 'Every id referenced by aria-labelledby must exist in the page',
+                    'context': str(elem)[:100],
+                    'selector': css_selector(elem),
+                    'impact': 'serious'
+                })
+
+
+@register_rule
+class DuplicateIdRule(HtmlRule):
+    name = "duplicate-id"
+
+    def finish(self):
+        for element_id, count in self.index.duplicate_ids():
+            # Duplicates break label/ARIA associations when the id is referenced
+            referenced = element_id in self.index.referenced_ids or element_id in self.index.labels_for
+            self.issues.append({
+                'type': 'violation',
+                'code': 'duplicate-id-aria' if referenced else 'duplicate-id',
+                'message': 'ID attribute value must be unique',
+                'description': 'Elements must have unique id attributes',
+                'context': f'id="{element_id}" used {count} times',
+                'selector': f'#{element_id}',
+                'impact': 'serious' if referenced else 'minor'
+            })
@@ -0,0 +1,201 @@
+# services/http_client.py
+"""
+Process-wide pooled HTTP client for outbound page fetches.
+
+One httpx.Client per worker process keeps per-host connection pools,
+keep-alive connections and TLS sessions warm across scans. HTTP/2 is
+negotiated when the h2 package is installed, gzip/deflate (and br when
+brotli is installed) are negotiated by httpx, and host lookups go through
+a small TTL cache in the network backend. Connection reuse is tracked with
+httpcore's trace extension.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpcore
+import httpx
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (compatible; AdaptiveTest/1.0)'
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class CachingDNSBackend(httpcore.SyncBackend):
+    """Sync network backend that caches getaddrinfo results per host"""
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._cache: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def _resolve(self, host: str, port: int) -> List[str]:
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] > now:
+                self.hits += 1
+                return cached[1]
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = (now + self.ttl, addresses)
+        return addresses
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        # TLS still uses the original hostname for SNI and certificate checks
+        try:
+            socket.inet_pton(socket.AF_INET6 if ':' in host else socket.AF_INET, host)
+            addresses = [host]
+        except OSError:
+            addresses = self._resolve(host, port)
+
+        last_error: Optional[Exception] = None
+        for address in addresses:
+            try:
+                return super().connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                last_error = e
+        with self._lock:
+            self._cache.pop((host, port), None)
+        raise last_error or httpcore.ConnectError(f"No addresses for {host}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'hosts': len(self._cache), 'hits': self.hits, 'misses': self.misses, 'ttl': self.ttl}
+
+
+class PooledTransport(httpx.HTTPTransport):
+    """httpx transport whose connection pool resolves hosts through the DNS cache"""
+
+    def __init__(self, limits: httpx.Limits, http2: bool, retries: int, network_backend: httpcore.SyncBackend):
+        super().__init__(http2=http2, limits=limits, retries=retries)
+        # Same pool httpx builds for direct connections, plus our network backend
+        self._pool = httpcore.ConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            retries=retries,
+            network_backend=network_backend,
+        )
+
+
+class FetchClient:
+    """Shared client used by the fallback scanner and any page crawler"""
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        dns_cache_ttl: float = 300,
+        retries: int = 2,
+    ):
+        self.http2 = http2 and _http2_available()
+        if http2 and not self.http2:
+            logger.info("ℹ️ h2 not installed - outbound fetches use HTTP/1.1")
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.dns = CachingDNSBackend(ttl=dns_cache_ttl)
+        self.client = httpx.Client(
+            transport=PooledTransport(self.limits, self.http2, retries, self.dns),
+            headers={'User-Agent': USER_AGENT},
+            follow_redirects=True,
+        )
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.http2_requests = 0
+
+    def _trace(self, event_name: str, info: Dict[str, Any]):
+        if event_name == 'connection.connect_tcp.complete':
+            with self._lock:
+                self.new_connections += 1
+        elif event_name == 'http2.send_request_headers.started':
+            with self._lock:
+                self.http2_requests += 1
+
+    @contextmanager
+    def stream(self, method: str, url: str, **kwargs) -> Iterator[httpx.Response]:
+        extensions = kwargs.pop('extensions', {})
+        extensions['trace'] = self._trace
+        with self._lock:
+            self.requests += 1
+        with self.client.stream(method, url, extensions=extensions, **kwargs) as response:
+            yield response
+
+    def close(self):
+        self.client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests_total = self.requests
+            new_connections = self.new_connections
+            http2_requests = self.http2_requests
+        reused = max(0, requests_total - new_connections)
+        return {
+            'requests': requests_total,
+            'new_connections': new_connections,
+            'reused_connections': reused,
+            'reuse_ratio': round(reused / requests_total, 3) if requests_total else 0.0,
+            'http2_enabled': self.http2,
+            'http2_requests': http2_requests,
+            'max_connections': self.limits.max_connections,
+            'max_keepalive_connections': self.limits.max_keepalive_connections,
+            'keepalive_expiry': self.limits.keepalive_expiry,
+            'dns_cache': self.dns.stats()
+        }
+
+
+_client: Optional[FetchClient] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def get_fetch_client() -> FetchClient:
+    """Return this worker process's shared client (created lazily, fork safe)"""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = FetchClient(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+                keepalive_expiry=settings.http_keepalive_expiry,
+                http2=settings.http2_enabled,
+                dns_cache_ttl=settings.dns_cache_ttl
+            )
+            _client_pid = os.getpid()
+        return _client
+
+
+def close_fetch_client():
+    global _client
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
@@ -0,0 +1,130 @@
+# services/issue_groups.py
+"""
+Grouped issues: one issue per rule with the elements it was found on.
+
+axe-core reports each failing rule once with a list of nodes; expanding
+that into one issue per node repeated the code, message, description,
+impact and recommendation on every row, so a page with 800 low-contrast
+elements stored 800 near-identical scan_issues rows. Issues are instead
+kept as groups: the rule's fields once, plus
+
+- occurrences: [{'selector': ..., 'context': ...}, ...], one per element
+- occurrence_count: len(occurrences)
+
+selector and context of a group are those of its first occurrence, so
+readers that ignore occurrences still show a real element. Counts that
+used to count issues (summary, score) count occurrences, so grouping
+does not change a scan's numbers.
+
+ISSUE_GROUPING picks the grouping key:
+
+- "rule": type, code, message and impact (the default)
+- "template": also the element's template fingerprint (tag, attribute
+  names and classes), so e.g. card links and footer links of the same
+  rule stay apart
+- "none": one issue per element, as before
+"""
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import settings
+
+GROUPINGS = ("rule", "template", "none")
+
+_OPENING_TAG = re.compile(r'\s*<([\w:-]+)([^>]*)')
+_ATTRIBUTE = re.compile(r'([\w:-]+)(?:\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]+))?')
+_DIGITS = re.compile(r'\d+')
+
+
+def template_fingerprint(context: Optional[str]) -> str:
+    """Tag, attribute names and classes of an element's HTML; elements rendered from one template share it"""
+    match = _OPENING_TAG.match(context or '')
+    if not match:
+        return ''
+    tag, attributes = match.groups()
+    names, classes = set(), ''
+    for name, value in _ATTRIBUTE.findall(attributes):
+        name = name.lower()
+        names.add(name)
+        if name == 'class':
+            # Generated class names (css-1x2y3z) differ per element; their shape does not
+            classes = ' '.join(sorted(_DIGITS.sub('#', value.strip('"\'')).split()))
+    return f"{tag.lower()}[{','.join(sorted(names))}].{classes}"
+
+
+def occurrence(issue: Dict[str, Any]) -> Dict[str, str]:
+    return {'selector': issue.get('selector', ''), 'context': issue.get('context', '')}
+
+
+def occurrences_of(issue: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Elements of an issue, grouped or not"""
+    return issue.get('occurrences') or [occurrence(issue)]
+
+
+def occurrence_count(issue: Dict[str, Any]) -> int:
+    return issue.get('occurrence_count') or len(issue.get('occurrences') or ()) or 1
+
+
+def occurrence_total(issues: Iterable[Dict[str, Any]]) -> int:
+    """Elements across issues: what "N issues" meant before grouping"""
+    return sum(occurrence_count(issue) for issue in issues)
+
+
+def make_group(issue: Dict[str, Any], occurrences: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Issue of one rule found on the given elements"""
+    group = {key: value for key, value in issue.items() if key not in ('occurrences', 'occurrence_count')}
+    if occurrences:
+        group.update(occurrences[0])
+    group['occurrences'] = occurrences
+    group['occurrence_count'] = len(occurrences)
+    return group
+
+
+def _group_key(issue: Dict[str, Any], grouping: str, element: Dict[str, str]):
+    key = (issue.get('type'), issue.get('code'), issue.get('message'), issue.get('impact'))
+    if grouping == "template":
+        key += (template_fingerprint(element.get('context')),)
+    return key
+
+
+def group_issues(issues: Iterable[Dict[str, Any]], grouping: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Issues regrouped per ISSUE_GROUPING, in order of first appearance.
+    Takes per-element issues, groups, or a mix; grouping groups again is a
+    no-op, and "none" expands groups back into one issue per element.
+    """
+    grouping = grouping or settings.issue_grouping
+    if grouping not in GROUPINGS:
+        raise ValueError(f"Unknown issue grouping {grouping!r}; use one of {', '.join(GROUPINGS)}")
+
+    if grouping == "none":
+        expanded = []
+        for issue in issues:
+            for element in occurrences_of(issue):
+                single = {key: value for key, value in issue.items() if key not in ('occurrences', 'occurrence_count')}
+                single.update(element)
+                expanded.append(single)
+        return expanded
+
+    groups: Dict[tuple, Dict[str, Any]] = {}
+    for issue in issues:
+        for element in occurrences_of(issue):
+            key = _group_key(issue, grouping, element)
+            group = groups.get(key)
+            if group is None:
+                groups[key] = make_group(issue, [element])
+            else:
+                group['occurrences'].append(element)
+                group['occurrence_count'] += 1
+    return list(groups.values())
+
+
+def stored_occurrences(selector: Optional[str], context: Optional[str], occurrences: Optional[str]) -> List[Dict[str, str]]:
+    """Elements of a scan_issues row; rows of a single element (or from before grouping) store none"""
+    if occurrences:
+        try:
+            return json.loads(occurrences)
+        except ValueError:
+            pass
+    return [{'selector': selector or '', 'context': context or ''}]
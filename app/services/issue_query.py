@@ -0,0 +1,156 @@
+# services/issue_query.py
+"""
+Filtered, sorted, keyset-paginated queries over one scan's issues.
+
+Backs GET /scan/{id}/report (one page per request) and its NDJSON export
+(every matching row from a server-side cursor). Filters on type, code
+and impact and the id and code sorts are served by the
+(scan_result_id, <column>, id) indexes on scan_issues, so a page costs
+the same no matter how many issues the scan has. The type and impact
+sorts order expressions (NULL-safe type, impact severity rank), which
+the database sorts within the scan's index range.
+
+Cursors are opaque: urlsafe base64 of [sort, last sort value, last id].
+The next page continues strictly after that row in (sort value, id)
+order, so inserts or deletes between requests never repeat or skip rows.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import Query, Session
+
+from models import ScanIssue
+from services.reports import ISSUE_FIELDS
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+IMPACT_RANK = {'critical': 4, 'serious': 3, 'moderate': 2, 'minor': 1}
+
+# Sort name -> column expression; "-name" sorts descending
+SORT_COLUMNS = {
+    'id': ScanIssue.id,
+    'code': ScanIssue.code,
+    'type': func.coalesce(ScanIssue.type, ''),
+    'impact': case(
+        *[(ScanIssue.impact == impact, rank) for impact, rank in IMPACT_RANK.items()],
+        else_=0
+    ),
+}
+SORTS = tuple(SORT_COLUMNS) + tuple(f"-{name}" for name in SORT_COLUMNS)
+
+ISSUE_COLUMNS = tuple(getattr(ScanIssue, name) for name in ISSUE_FIELDS)
+
+
+class InvalidIssueQuery(ValueError):
+    """Unknown sort or a cursor that does not belong to this query"""
+
+
+@dataclass
+class IssueFilters:
+    types: List[str] = field(default_factory=list)
+    codes: List[str] = field(default_factory=list)
+    impacts: List[str] = field(default_factory=list)
+
+    @classmethod
+    def parse(cls, type: Optional[str] = None, code: Optional[str] = None, impact: Optional[str] = None) -> "IssueFilters":
+        """Comma-separated query parameters, e.g. ?type=violation,error"""
+        def split(value):
+            return [item.strip() for item in (value or "").split(",") if item.strip()]
+        return cls(types=split(type), codes=split(code), impacts=split(impact))
+
+    def as_dict(self):
+        return {'type': self.types, 'code': self.codes, 'impact': self.impacts}
+
+
+def encode_cursor(sort: str, value: Any, last_id: int) -> str:
+    raw = json.dumps([sort, value, last_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, value, last_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidIssueQuery("Malformed cursor")
+    if cursor_sort != sort or not isinstance(last_id, int):
+        raise InvalidIssueQuery("Cursor was issued for a different sort")
+    return value, last_id
+
+
+def issue_query(
+    db: Session,
+    scan_id: int,
+    filters: Optional[IssueFilters] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    occurrences: bool = False
+) -> Query:
+    """Issue rows (ISSUE_FIELDS, the stored occurrences if asked for, then the sort value) in page order"""
+    if sort not in SORTS:
+        raise InvalidIssueQuery(f"Unknown sort {sort!r}; use one of {', '.join(SORTS)}")
+    descending = sort.startswith("-")
+    column = SORT_COLUMNS[sort.lstrip("-")]
+
+    columns = ISSUE_COLUMNS + (ScanIssue.occurrences,) if occurrences else ISSUE_COLUMNS
+    query = db.query(*columns, column.label('sort_value')).filter(ScanIssue.scan_result_id == scan_id)
+    filters = filters or IssueFilters()
+    if filters.types:
+        query = query.filter(ScanIssue.type.in_(filters.types))
+    if filters.codes:
+        query = query.filter(ScanIssue.code.in_(filters.codes))
+    if filters.impacts:
+        query = query.filter(ScanIssue.impact.in_(filters.impacts))
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort)
+        if column is ScanIssue.id:
+            query = query.filter(ScanIssue.id < last_id if descending else ScanIssue.id > last_id)
+        elif descending:
+            query = query.filter(or_(column < value, and_(column == value, ScanIssue.id < last_id)))
+        else:
+            query = query.filter(or_(column > value, and_(column == value, ScanIssue.id > last_id)))
+
+    if column is ScanIssue.id:
+        return query.order_by(ScanIssue.id.desc() if descending else ScanIssue.id)
+    if descending:
+        return query.order_by(column.desc(), ScanIssue.id.desc())
+    return query.order_by(column, ScanIssue.id)
+
+
+def issue_page(
+    db: Session,
+    scan_id: int,
+    filters: Optional[IssueFilters] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    occurrences: bool = False
+) -> Tuple[List[tuple], Optional[str]]:
+    """One page of issue tuples (see issue_query) and the cursor of the next, if any"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    rows = issue_query(db, scan_id, filters, sort, cursor, occurrences).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, last.sort_value, last.id)
+    return [tuple(row)[:-1] for row in rows], next_cursor
+
+
+def stream_issues(
+    db: Session,
+    scan_id: int,
+    filters: Optional[IssueFilters] = None,
+    sort: str = "id",
+    occurrences: bool = False
+):
+    """Every matching issue tuple, fetched STREAM_BATCH_SIZE rows at a time from a server-side cursor"""
+    for row in issue_query(db, scan_id, filters, sort, occurrences=occurrences).yield_per(STREAM_BATCH_SIZE):
+        yield tuple(row)[:-1]
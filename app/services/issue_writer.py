@@ -0,0 +1,132 @@
+# services/issue_writer.py
+"""
+Bulk persistence of scan issues.
+
+save_scan_results used to add one ORM ScanIssue per issue; with thousands
+of axe nodes the unit-of-work bookkeeping and, on a remote database, the
+round-trips made the write slower than the scan. write_issues() replaces
+a scan's issues with Core statements instead:
+
+- PostgreSQL: COPY scan_issues FROM STDIN (CSV), one COPY per batch
+- anything else: insert(scan_issues) executed with a list of rows
+  (executemany; SQLAlchemy turns it into multi-row INSERTs where the
+  driver supports it), one execute per batch
+
+ISSUE_WRITE_BATCH_SIZE bounds the rows held per statement. Everything
+runs on the session's connection and is not committed here, so the
+delete, the inserts and the caller's status update commit as one
+transaction.
+"""
+import io
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import ScanIssue
+from services.issue_groups import occurrence_count
+
+logger = logging.getLogger(__name__)
+
+ISSUE_COLUMNS = (
+    'scan_result_id', 'code', 'type', 'message', 'context', 'selector', 'recommendation_text', 'impact',
+    'occurrence_count', 'occurrences'
+)
+
+
+def issue_row(scan_id: int, issue_data: Dict[str, Any]) -> Dict[str, Any]:
+    """scan_issues row of one scanner issue or issue group (services/issue_groups.py)"""
+    occurrences = issue_data.get('occurrences') or ()
+    return {
+        'scan_result_id': scan_id,
+        'code': issue_data.get('code', ''),
+        'type': issue_data.get('type', 'violation'),
+        'message': issue_data.get('message', ''),
+        'context': issue_data.get('context', ''),
+        'selector': issue_data.get('selector', ''),
+        'recommendation_text': issue_data.get('ai_recommendation') or issue_data.get('description', ''),
+        'impact': issue_data.get('impact'),
+        'occurrence_count': occurrence_count(issue_data),
+        # selector and context already hold a lone element
+        'occurrences': json.dumps(occurrences, separators=(',', ':')) if len(occurrences) > 1 else None
+    }
+
+
+def _batches(rows: Iterable[Dict[str, Any]], size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_method(db: Session) -> str:
+    """"copy" or "executemany" for this session's database, per ISSUE_WRITE_METHOD"""
+    method = settings.issue_write_method
+    is_postgres = db.get_bind().dialect.name == "postgresql"
+    if method == "copy" and not is_postgres:
+        return "executemany"
+    if method == "auto":
+        return "copy" if is_postgres else "executemany"
+    return method
+
+
+def _csv_field(value: Any) -> str:
+    # COPY CSV reads only an unquoted empty field as NULL, so every value is quoted:
+    # no issue text (not even "" or \N) can be taken for one
+    if value is None:
+        return ''
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _copy_batch(cursor, batch: List[Dict[str, Any]]):
+    buffer = io.StringIO()
+    for row in batch:
+        buffer.write(','.join(_csv_field(row[column]) for column in ISSUE_COLUMNS))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {ScanIssue.__tablename__} ({', '.join(ISSUE_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '')",
+        buffer
+    )
+
+
+def write_issues(
+    db: Session,
+    scan_id: int,
+    issues: Iterable[Dict[str, Any]],
+    batch_size: Optional[int] = None,
+    method: Optional[str] = None
+) -> int:
+    """Replace the stored issues of a scan in the session's transaction; returns rows written"""
+    batch_size = max(1, batch_size or settings.issue_write_batch_size)
+    method = method or write_method(db)
+    started = time.perf_counter()
+
+    connection = db.connection()
+    connection.execute(delete(ScanIssue.__table__).where(ScanIssue.__table__.c.scan_result_id == scan_id))
+    rows = (issue_row(scan_id, issue_data) for issue_data in issues)
+    written = 0
+    if method == "copy":
+        cursor = connection.connection.dbapi_connection.cursor()
+        try:
+            for batch in _batches(rows, batch_size):
+                _copy_batch(cursor, batch)
+                written += len(batch)
+        finally:
+            cursor.close()
+    else:
+        statement = insert(ScanIssue.__table__)
+        for batch in _batches(rows, batch_size):
+            connection.execute(statement, batch)
+            written += len(batch)
+
+    logger.info(f"💾 Wrote {written} issues of scan {scan_id} via {method} in {time.perf_counter() - started:.3f}s")
+    return written
@@ -0,0 +1,233 @@
+# services/job_queue.py
+"""
+Durable, database-backed scan job queue.
+
+The API enqueues a ScanJob next to each new ScanResult, and worker
+processes (python -m worker) claim and run them. A claimed job holds a
+lease that the worker renews with heartbeats. When a worker dies, its
+leases expire and the jobs are requeued until max_attempts is reached.
+
+On PostgreSQL jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED so
+workers never wait on each other's rows. SQLite has no row locks; there a
+claim is a conditional UPDATE of a queued row (compare-and-set on state),
+which only one writer can win under SQLite's database write lock.
+Which queued job is tried first is decided by services/scheduler.py.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import ScanJob, ScanResult
+from services.scheduler import order_candidates, priority_rank
+
+logger = logging.getLogger(__name__)
+
+RETRY_BACKOFF_SECONDS = 30
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _supports_skip_locked(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def enqueue_scan(
+    db: Session,
+    scan_id: int,
+    url: str,
+    client_id: Optional[str] = None,
+    priority: str = "interactive",
+) -> ScanJob:
+    job = ScanJob(
+        scan_result_id=scan_id,
+        url=url,
+        state="queued",
+        priority=priority_rank(priority),
+        client_id=client_id,
+        host=(urlsplit(url).hostname or "").lower() or None,
+        max_attempts=settings.job_max_attempts,
+        available_at=_utcnow()
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    logger.info(f"📥 Queued scan {scan_id} as job {job.id}")
+    return job
+
+
+def reap_expired_leases(db: Session) -> int:
+    """Requeue running jobs whose lease expired; fail those out of attempts"""
+    now = _utcnow()
+    expired = db.query(ScanJob).filter(
+        ScanJob.state == "running",
+        ScanJob.lease_expires_at < now
+    )
+    exhausted_ids = [job_id for (job_id,) in expired.filter(
+        ScanJob.attempts >= ScanJob.max_attempts
+    ).with_entities(ScanJob.id)]
+
+    requeued = expired.filter(ScanJob.attempts < ScanJob.max_attempts).update({
+        ScanJob.state: "queued",
+        ScanJob.worker_id: None,
+        ScanJob.available_at: now,
+        ScanJob.last_error: "lease expired"
+    }, synchronize_session=False)
+
+    failed = 0
+    if exhausted_ids:
+        failed = db.query(ScanJob).filter(
+            ScanJob.id.in_(exhausted_ids),
+            ScanJob.state == "running",
+            ScanJob.lease_expires_at < now
+        ).update({
+            ScanJob.state: "failed",
+            ScanJob.last_error: "lease expired, no attempts left"
+        }, synchronize_session=False)
+        _mark_scans_failed(db, exhausted_ids)
+    db.commit()
+
+    if requeued or failed:
+        logger.warning(f"⏱️ Expired leases: {requeued} requeued, {failed} failed")
+    return requeued + failed
+
+
+def _mark_scans_failed(db: Session, job_ids):
+    scan_ids = db.query(ScanJob.scan_result_id).filter(ScanJob.id.in_(job_ids))
+    db.query(ScanResult).filter(
+        ScanResult.id.in_(scan_ids.scalar_subquery()),
+        ScanResult.status.in_(("pending", "scanning"))
+    ).update({ScanResult.status: "failed", ScanResult.phase: "done"}, synchronize_session=False)
+
+
+def claim_job(db: Session, worker_id: str, lease_seconds: Optional[int] = None) -> Optional[ScanJob]:
+    """Claim the best available job for this worker per the scheduler, or return None"""
+    lease_seconds = lease_seconds or settings.job_lease_seconds
+    now = _utcnow()
+    candidates = order_candidates(db, now)
+    claimed = {
+        ScanJob.state: "running",
+        ScanJob.worker_id: worker_id,
+        ScanJob.attempts: ScanJob.attempts + 1,
+        ScanJob.lease_expires_at: now + timedelta(seconds=lease_seconds),
+        ScanJob.heartbeat_at: now,
+        ScanJob.claimed_at: now
+    }
+
+    if _supports_skip_locked(db):
+        for job_id in candidates:
+            # A row another worker is claiming right now is skipped, not waited on
+            job = db.query(ScanJob).filter(
+                ScanJob.id == job_id,
+                ScanJob.state == "queued"
+            ).with_for_update(skip_locked=True).first()
+            if job is None:
+                db.rollback()
+                continue
+            db.query(ScanJob).filter(ScanJob.id == job.id).update(claimed, synchronize_session=False)
+            db.commit()
+            db.refresh(job)
+            return job
+        db.rollback()
+        return None
+
+    # SQLite: compare-and-set on state; a lost race just tries the next candidate
+    for job_id in candidates:
+        won = db.query(ScanJob).filter(
+            ScanJob.id == job_id,
+            ScanJob.state == "queued"
+        ).update(claimed, synchronize_session=False)
+        db.commit()
+        if won:
+            return db.get(ScanJob, job_id)
+    return None
+
+
+def heartbeat(db: Session, job_id: int, worker_id: str, lease_seconds: Optional[int] = None) -> bool:
+    """Extend the lease; False means the job was reaped and belongs to someone else now"""
+    lease_seconds = lease_seconds or settings.job_lease_seconds
+    now = _utcnow()
+    renewed = db.query(ScanJob).filter(
+        ScanJob.id == job_id,
+        ScanJob.worker_id == worker_id,
+        ScanJob.state == "running"
+    ).update({
+        ScanJob.heartbeat_at: now,
+        ScanJob.lease_expires_at: now + timedelta(seconds=lease_seconds)
+    }, synchronize_session=False)
+    db.commit()
+    return bool(renewed)
+
+
+def complete_job(db: Session, job_id: int, worker_id: str):
+    db.query(ScanJob).filter(
+        ScanJob.id == job_id,
+        ScanJob.worker_id == worker_id
+    ).update({ScanJob.state: "done", ScanJob.lease_expires_at: None}, synchronize_session=False)
+    db.commit()
+
+
+def fail_job(db: Session, job_id: int, worker_id: str, error: str):
+    """Retry with backoff while attempts remain, otherwise fail the job and its scan"""
+    job = db.get(ScanJob, job_id)
+    if job is None or job.worker_id != worker_id:
+        return
+    job.last_error = error[:2000]
+    job.lease_expires_at = None
+    if job.attempts < job.max_attempts:
+        job.state = "queued"
+        job.worker_id = None
+        job.available_at = _utcnow() + timedelta(seconds=RETRY_BACKOFF_SECONDS * job.attempts)
+        scan = db.get(ScanResult, job.scan_result_id)
+        if scan and scan.status in ("scanning", "failed"):
+            try:
+                with db.begin_nested():
+                    scan.status = "pending"
+                    scan.phase = "queued"
+                    scan.progress = 0
+            except IntegrityError:
+                # A failed scan's URL may have got a new in-flight scan since (uq_scan_results_inflight_url)
+                _drop_superseded_retry(db, job, scan, error)
+                db.commit()
+                return
+        logger.warning(f"🔁 Job {job_id} failed (attempt {job.attempts}/{job.max_attempts}), retrying: {error}")
+    else:
+        job.state = "failed"
+        _mark_scans_failed(db, [job_id])
+        logger.error(f"❌ Job {job_id} failed after {job.attempts} attempts: {error}")
+    db.commit()
+
+
+def _drop_superseded_retry(db: Session, job: ScanJob, scan: ScanResult, error: str):
+    """Retire a job whose retry would duplicate a newer in-flight scan of the same URL"""
+    current = db.query(ScanResult.id).filter(
+        ScanResult.url == scan.url,
+        ScanResult.id != scan.id,
+        ScanResult.status.in_(("pending", "scanning"))
+    ).scalar()
+    job.state = "done"
+    job.last_error = f"{error[:1900]} (not retried: scan {current} of the URL is in flight)"
+    logger.warning(
+        f"🔁 Job {job.id} failed (attempt {job.attempts}/{job.max_attempts}); not retrying scan {scan.id}, "
+        f"scan {current} of {scan.url} is already in flight: {error}"
+    )
+
+
+def queue_stats(db: Session) -> Dict[str, Any]:
+    counts = dict(db.query(ScanJob.state, func.count(ScanJob.id)).group_by(ScanJob.state).all())
+    oldest = db.query(func.min(ScanJob.created_at)).filter(ScanJob.state == "queued").scalar()
+    return {
+        'dispatch': settings.scan_dispatch,
+        'queued': counts.get("queued", 0),
+        'running': counts.get("running", 0),
+        'done': counts.get("done", 0),
+        'failed': counts.get("failed", 0),
+        'oldest_queued_at': oldest.isoformat() if oldest else None
+    }
@@ -0,0 +1,404 @@
+# services/progress.py
+"""
+Scan progress events.
+
+The scan pipeline reports each stage (fetch, parse, rules, axe, ai,
+persist) with a real percentage to the process-wide ProgressBroadcaster,
+which keeps per-stage timings and fans every event out to the SSE
+subscribers of that scan in this process (GET /scan/{id}/events).
+
+Scans often run in another process (a queue worker, another gunicorn
+worker), so progress is also written to scan_results (phase, progress,
+progress_detail) by a writer thread that coalesces updates to at most one
+write per scan every PROGRESS_FLUSH_SECONDS. A process with subscribers
+for a scan it is not running polls that row once per PROGRESS_POLL_SECONDS
+and fans the change out, so a thousand watchers cost one query a second,
+not a thousand.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+IN_FLIGHT_STATUSES = ("pending", "scanning")
+DONE_STAGE = "done"
+SUBSCRIBER_QUEUE_SIZE = 16
+PERCENT_ONLY_INTERVAL = 0.25
+
+# Where each stage starts on the 0-100 progress bar
+STAGE_PERCENT = {
+    'queued': 0,
+    'starting': 5,
+    'fetch': 10,
+    'navigate': 10,
+    'parse': 35,
+    'axe': 40,
+    'rules': 45,
+    'ai': 80,
+    'persist': 95,
+    DONE_STAGE: 100,
+}
+
+# Stage -> phase names the scanning page already understands
+FRONTEND_PHASES = {
+    'queued': "crawling",
+    'starting': "crawling",
+    'fetch': "crawling",
+    'navigate': "crawling",
+    'parse': "analyzing",
+    'axe': "analyzing",
+    'rules': "analyzing",
+    'ai': "analyzing",
+    'persist': "reporting",
+    DONE_STAGE: "reporting",
+}
+
+
+def frontend_phase(status: str, stage: Optional[str]) -> str:
+    if status in ("failed", "cancelled"):
+        return "failed"
+    if status in ("completed", "partial"):
+        return "reporting"
+    return FRONTEND_PHASES.get(stage or "queued", "crawling")
+
+
+def is_terminal(status: str, stage: Optional[str]) -> bool:
+    """Finished for good. A scan cancelled while running keeps its last stage until it stops and saves."""
+    return status not in IN_FLIGHT_STATUSES and stage in (None, DONE_STAGE)
+
+
+class ScanProgress:
+    """Progress state of one scan running in this process"""
+
+    def __init__(self, scan_id: int):
+        self.scan_id = scan_id
+        self.status = "scanning"
+        self.stage = "starting"
+        self.percent = STAGE_PERCENT['starting']
+        self.message: Optional[str] = None
+        self.detail: Dict[str, Any] = {}
+        self.timings: Dict[str, float] = {}
+        self.started = time.monotonic()
+        self.stage_started = self.started
+        self.last_event = 0.0
+
+    def enter(self, stage: str, now: float):
+        if stage == self.stage:
+            return
+        self.timings[self.stage] = round(self.timings.get(self.stage, 0.0) + now - self.stage_started, 3)
+        self.stage = stage
+        self.stage_started = now
+
+    def event(self) -> Dict[str, Any]:
+        return {
+            'scan_id': self.scan_id,
+            'status': self.status,
+            'stage': self.stage,
+            'phase': frontend_phase(self.status, self.stage),
+            'progress': self.percent,
+            'message': self.message,
+            'elapsed': round(time.monotonic() - self.started, 3),
+            'timings': dict(self.timings),
+            'detail': dict(self.detail),
+            'done': is_terminal(self.status, self.stage)
+        }
+
+    def stored_detail(self) -> str:
+        return json.dumps({
+            'message': self.message,
+            'elapsed': round(time.monotonic() - self.started, 3),
+            'timings': self.timings,
+            'detail': self.detail
+        }, default=str)
+
+
+def event_from_row(scan) -> Dict[str, Any]:
+    """Progress event rebuilt from a scan_results row (scans running elsewhere)"""
+    stored = {}
+    if scan.progress_detail:
+        try:
+            stored = json.loads(scan.progress_detail)
+        except ValueError:
+            stored = {}
+    stage = scan.phase or ("queued" if scan.status == "pending" else None)
+    terminal = is_terminal(scan.status, stage)
+    return {
+        'scan_id': scan.id,
+        'status': scan.status,
+        'stage': stage or DONE_STAGE,
+        'phase': frontend_phase(scan.status, stage),
+        'progress': 100 if terminal else (scan.progress or STAGE_PERCENT.get(stage or "queued", 0)),
+        'message': stored.get('message'),
+        'elapsed': stored.get('elapsed'),
+        'timings': stored.get('timings') or {},
+        'detail': stored.get('detail') or {},
+        'done': terminal
+    }
+
+
+class ProgressBroadcaster:
+    """In-process fan-out of progress events plus the coalescing DB writer and pollers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scans: Dict[int, ScanProgress] = {}
+        self._subscribers: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = defaultdict(set)
+        self._pollers: Dict[int, asyncio.Task] = {}
+        self._dirty: Dict[int, ScanProgress] = {}
+        self._writer: Optional[threading.Thread] = None
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.db_writes = 0
+        self.db_polls = 0
+
+    # Publishing (any thread) -------------------------------------------------
+
+    def publish(
+        self,
+        scan_id: int,
+        stage: str,
+        percent: Optional[float] = None,
+        message: Optional[str] = None,
+        timings: Optional[Dict[str, float]] = None,
+        **detail: Any,
+    ):
+        """Report that a scan entered (or advanced within) a stage.
+
+        timings overrides measured stage durations, for stages timed
+        elsewhere (parse and rules run inside the CPU process pool).
+        """
+        now = time.monotonic()
+        with self._lock:
+            progress = self._scans.get(scan_id)
+            if progress is None:
+                progress = self._scans[scan_id] = ScanProgress(scan_id)
+            stage_changed = stage != progress.stage
+            progress.enter(stage, now)
+            if timings:
+                progress.timings.update({name: round(value, 3) for name, value in timings.items()})
+            target = STAGE_PERCENT.get(stage, progress.percent) if percent is None else percent
+            progress.percent = int(max(progress.percent, min(99, target)))
+            if message is not None or stage_changed:
+                progress.message = message
+            progress.detail.update(detail)
+            # Byte-by-byte advances within a stage are throttled, stage changes never are
+            if not stage_changed and not detail and not timings and now - progress.last_event < PERCENT_ONLY_INTERVAL:
+                return
+            progress.last_event = now
+            event = progress.event()
+            self._dirty[scan_id] = progress
+        self.published += 1
+        self._fan_out(scan_id, event)
+        self._ensure_writer()
+
+    def finish(self, scan_id: int, status: str, **detail: Any):
+        """Final event of a scan run here; its row is already committed by the caller"""
+        now = time.monotonic()
+        with self._lock:
+            progress = self._scans.pop(scan_id, None) or ScanProgress(scan_id)
+            self._dirty.pop(scan_id, None)
+            progress.enter(DONE_STAGE, now)
+            progress.status = status
+            progress.percent = 100
+            progress.message = None
+            progress.detail.update(detail)
+            event = progress.event()
+        self.published += 1
+        self._fan_out(scan_id, event)
+
+    def final_row_values(self, scan_id: int) -> Dict[str, Any]:
+        """Columns save_scan_results writes together with the final status"""
+        with self._lock:
+            progress = self._scans.get(scan_id)
+            if progress is not None:
+                progress.enter(DONE_STAGE, time.monotonic())
+                progress.message = None
+                stored = progress.stored_detail()
+            else:
+                stored = None
+        values = {'phase': DONE_STAGE, 'progress': 100}
+        if stored is not None:
+            values['progress_detail'] = stored
+        return values
+
+    def is_local(self, scan_id: int) -> bool:
+        with self._lock:
+            return scan_id in self._scans
+
+    def snapshot(self, scan_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            progress = self._scans.get(scan_id)
+            return progress.event() if progress is not None else None
+
+    # Subscribing (event loop) ------------------------------------------------
+
+    def subscribe(self, scan_id: int) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[scan_id].add((loop, queue))
+        return queue
+
+    def unsubscribe(self, scan_id: int, queue: asyncio.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(scan_id)
+            if subscribers is None:
+                return
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+            if not subscribers:
+                del self._subscribers[scan_id]
+
+    def _fan_out(self, scan_id: int, event: Dict[str, Any]):
+        with self._lock:
+            subscribers = list(self._subscribers.get(scan_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:
+                # Loop already closed; the subscriber is gone
+                self.dropped += 1
+
+    def _offer(self, queue: asyncio.Queue, event: Dict[str, Any]):
+        # Progress is state, not a log: a slow reader just skips to the newest event
+        if queue.full():
+            queue.get_nowait()
+            self.dropped += 1
+        queue.put_nowait(event)
+        self.delivered += 1
+
+    # DB fallback ------------------------------------------------------------
+
+    def watch_remote(self, scan_id: int):
+        """Poll the row of a scan running in another process while anyone here is watching it"""
+        with self._lock:
+            poller = self._pollers.get(scan_id)
+            if poller is not None and not poller.done():
+                return
+            self._pollers[scan_id] = asyncio.get_running_loop().create_task(self._poll_row(scan_id))
+
+    async def _poll_row(self, scan_id: int):
+        from starlette.concurrency import run_in_threadpool
+        last = None
+        try:
+            while True:
+                await asyncio.sleep(settings.progress_poll_seconds)
+                with self._lock:
+                    watched = bool(self._subscribers.get(scan_id))
+                if not watched:
+                    return
+                if self.is_local(scan_id):
+                    continue
+                event = await run_in_threadpool(load_row_event, scan_id)
+                self.db_polls += 1
+                if event is None:
+                    return
+                key = (event['status'], event['stage'], event['progress'])
+                if key != last:
+                    last = key
+                    self._fan_out(scan_id, event)
+                if event['done']:
+                    return
+        except Exception as e:
+            logger.warning(f"⚠️ Progress poll for scan {scan_id} stopped: {e}")
+        finally:
+            with self._lock:
+                if self._pollers.get(scan_id) is asyncio.current_task():
+                    del self._pollers[scan_id]
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._writer is not None and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._write_loop, name="progress-writer", daemon=True)
+            self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            time.sleep(settings.progress_flush_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"⚠️ Progress flush failed: {e}")
+
+    def flush(self):
+        """Write the latest progress of every changed scan, one UPDATE per scan"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            rows = {
+                scan_id: (progress.stage, progress.percent, progress.stored_detail())
+                for scan_id, progress in dirty.items()
+            }
+        if not rows:
+            return
+        from database import SessionLocal
+        from models import ScanResult
+        db = SessionLocal()
+        try:
+            for scan_id, (stage, percent, stored) in rows.items():
+                # Never overwrite the final row written by save_scan_results
+                db.query(ScanResult).filter(
+                    ScanResult.id == scan_id,
+                    ScanResult.status.in_(IN_FLIGHT_STATUSES + ("cancelled",)),
+                    ScanResult.phase.is_distinct_from(DONE_STAGE)
+                ).update({
+                    ScanResult.phase: stage,
+                    ScanResult.progress: percent,
+                    ScanResult.progress_detail: stored
+                }, synchronize_session=False)
+            db.commit()
+            self.db_writes += len(rows)
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'running_here': len(self._scans),
+                'watched_scans': len(self._subscribers),
+                'subscribers': sum(len(s) for s in self._subscribers.values()),
+                'db_pollers': sum(1 for p in self._pollers.values() if not p.done()),
+                'published': self.published,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+                'db_writes': self.db_writes,
+                'db_polls': self.db_polls,
+                'flush_seconds': settings.progress_flush_seconds,
+                'poll_seconds': settings.progress_poll_seconds
+            }
+
+
+def load_row_event(scan_id: int) -> Optional[Dict[str, Any]]:
+    from database import SessionLocal
+    from models import ScanResult
+    db = SessionLocal()
+    try:
+        scan = db.get(ScanResult, scan_id)
+        return event_from_row(scan) if scan is not None else None
+    finally:
+        db.close()
+
+
+_broadcaster: Optional[ProgressBroadcaster] = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster() -> ProgressBroadcaster:
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is None:
+            _broadcaster = ProgressBroadcaster()
+        return _broadcaster
+
+
+def report(scan_id: Optional[int], stage: str, percent: Optional[float] = None, message: Optional[str] = None, **kwargs: Any):
+    """publish() for pipeline code that may run without a scan id (ad-hoc scans)"""
+    if scan_id is not None:
+        get_broadcaster().publish(scan_id, stage, percent, message, **kwargs)
@@ -40,15 +40,17 @@ def get_or_create_recommendation(
         return persist_recommendation(db, issue_id, predefined_rec)
     
     # 2) Check database cache
-    existing = (
-        db.query(ScanIssue)
+    # Only the text: served by the partial index ix_scan_issues_recommended_code
+    cached = (
+        db.query(ScanIssue.recommendation_text)
         .filter(ScanIssue.code == rule_code)
         .filter(ScanIssue.recommendation_text.isnot(None))
-        .first()
+        .limit(1)
+        .scalar()
     )
-    if existing and existing.recommendation_text:
+    if cached:
         logger.info(f"Using cached recommendation for: {rule_code}")
-        return persist_recommendation(db, issue_id, existing.recommendation_text)
+        return persist_recommendation(db, issue_id, cached)
     
     # 3) Generate with OpenAI or use fallback
     try:
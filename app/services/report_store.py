@@ -0,0 +1,190 @@
+# services/report_store.py
+"""
+Stored PDF reports of finished scans.
+
+A finished scan's PDF never changes until the report template does, so it
+is rendered once into the artifact store (services/artifacts.py) under
+report-<scan id>-v<REPORT_TEMPLATE_VERSION>.pdf and served from there.
+save_scan_results pre-renders it in the background right after the scan
+finishes; otherwise the first download renders it. Renders of the same
+key are single-flight within a process, so a burst of downloads of a
+shared link renders once.
+
+The render itself runs in the CPU pool: render_report_pdf_file() reads
+the issues in batches (yield_per) and reportlab consumes them one table
+chunk at a time, writing to a file rather than a buffer, so peak memory
+does not grow with the issue count. With ?group=code the report lists
+each rule once with its count instead of every occurrence.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import ScanIssue, ScanResult
+from services.artifacts import StoredArtifact, get_artifact_store
+from services.executor import run_cpu_sync
+from services.reports import ISSUE_FIELDS, REPORT_TEMPLATE_VERSION, write_report_pdf
+from services.issue_query import DEFAULT_PAGE_SIZE, IssueFilters, issue_page
+from services.summary import load_summary
+
+logger = logging.getLogger(__name__)
+
+REPORT_STATUSES = ("completed", "partial")
+ISSUE_BATCH_SIZE = 500
+
+
+def load_report_payload(
+    db: Session,
+    scan: ScanResult,
+    filters: Optional[IssueFilters] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    expand: Optional[str] = None
+) -> Dict[str, Any]:
+    """Compact, picklable snapshot of one report page for services/reports.py"""
+    rows, next_cursor = issue_page(db, scan.id, filters, sort, cursor, limit, occurrences=expand is not None)
+    return {
+        'id': scan.id,
+        'url': scan.url,
+        'status': scan.status,
+        'created_at': scan.created_at,
+        'summary': load_summary(db, scan),
+        'issues': rows,
+        'page': {
+            'limit': limit,
+            'returned': len(rows),
+            'sort': sort,
+            'filters': (filters or IssueFilters()).as_dict(),
+            'expand': expand,
+            'next_cursor': next_cursor
+        }
+    }
+
+
+def report_pdf_key(scan_id: int, grouped: bool = False) -> str:
+    return f"report-{scan_id}-v{REPORT_TEMPLATE_VERSION}{'-grouped' if grouped else ''}.pdf"
+
+
+def _issue_rows(db: Session, scan_id: int, grouped: bool):
+    """Issue tuples for write_report_pdf, fetched ISSUE_BATCH_SIZE rows at a time"""
+    if grouped:
+        count = func.sum(func.coalesce(ScanIssue.occurrence_count, 1))
+        query = db.query(
+            ScanIssue.code, ScanIssue.type, count,
+            func.min(ScanIssue.message), func.min(ScanIssue.recommendation_text)
+        ).filter(ScanIssue.scan_result_id == scan_id).group_by(
+            ScanIssue.code, ScanIssue.type
+        ).order_by(count.desc(), ScanIssue.code)
+    else:
+        query = db.query(*[getattr(ScanIssue, field) for field in ISSUE_FIELDS]).filter(
+            ScanIssue.scan_result_id == scan_id
+        ).order_by(ScanIssue.id)
+    return query.yield_per(ISSUE_BATCH_SIZE)
+
+
+def render_report_pdf_file(scan_id: int, path: str, grouped: bool = False) -> int:
+    """Write a finished scan's PDF to path and return its size (runs in the CPU pool)"""
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        scan = db.get(ScanResult, scan_id)
+        if scan is None or scan.status not in REPORT_STATUSES:
+            raise LookupError(f"Scan {scan_id} has no finished report")
+        header = {
+            'id': scan.id,
+            'url': scan.url,
+            'created_at': scan.created_at,
+            'summary': load_summary(db, scan)
+        }
+        with open(path, 'wb') as out:
+            write_report_pdf(header, _issue_rows(db, scan_id, grouped), out, grouped)
+    finally:
+        db.close()
+    return os.path.getsize(path)
+
+
+class _Render:
+    """One in-progress render that concurrent callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.artifact: Optional[StoredArtifact] = None
+        self.error: Optional[BaseException] = None
+
+
+_renders: Dict[str, _Render] = {}
+_renders_lock = threading.Lock()
+
+
+def ensure_report_pdf(scan_id: int, grouped: bool = False) -> Optional[StoredArtifact]:
+    """
+    Stored PDF of a finished scan, rendered in the CPU pool on a miss.
+    None when no artifact store is configured. Blocking: call from threads.
+    """
+    store = get_artifact_store()
+    if store is None:
+        return None
+    key = report_pdf_key(scan_id, grouped)
+    artifact = store.get(key)
+    if artifact is not None:
+        return artifact
+
+    with _renders_lock:
+        render = _renders.get(key)
+        leader = render is None
+        if leader:
+            render = _renders[key] = _Render()
+    if not leader:
+        render.done.wait()
+        if render.error is not None:
+            raise render.error
+        return render.artifact
+
+    try:
+        path = store.temp_path()
+        try:
+            run_cpu_sync(render_report_pdf_file, scan_id, path, grouped)
+        except BaseException:
+            os.unlink(path)
+            raise
+        render.artifact = store.put_file(key, path)
+        logger.info(f"📄 Stored PDF report of scan {scan_id} ({render.artifact.size // 1024} KB)")
+        return render.artifact
+    except BaseException as e:
+        render.error = e
+        raise
+    finally:
+        with _renders_lock:
+            _renders.pop(key, None)
+        render.done.set()
+
+
+_prerender_pool: Optional[ThreadPoolExecutor] = None
+_prerender_lock = threading.Lock()
+
+
+def _prerender(scan_id: int):
+    try:
+        ensure_report_pdf(scan_id)
+    except ImportError:
+        logger.debug("reportlab not installed, not pre-rendering PDF reports")
+    except Exception as e:
+        logger.warning(f"⚠️ Pre-rendering PDF report of scan {scan_id} failed: {e}")
+
+
+def prerender_report_pdf(scan_id: int):
+    """Render a just-finished scan's PDF in the background so the first download is a hit"""
+    global _prerender_pool
+    if not settings.report_prerender or get_artifact_store() is None:
+        return
+    with _prerender_lock:
+        if _prerender_pool is None:
+            _prerender_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-prerender")
+        _prerender_pool.submit(_prerender, scan_id)
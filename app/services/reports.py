@@ -0,0 +1,342 @@
+# services/reports.py
+"""
+Report serialization and PDF rendering for completed scans.
+
+Both run in the CPU process pool (services/executor.py) so building a
+2,000-row report does not stall the event loop, and never touch the
+database themselves. build_report takes the compact, picklable payload
+of services/report_store.py: a dict of scan fields whose 'issues' are
+one page of plain tuples in ISSUE_FIELDS order. write_report_pdf takes
+the issues as an iterable instead, which report_store feeds from a
+batched query so PDFs of scans with thousands of issues render in flat
+memory. Both take the summary materialized when the scan finished
+(services/summary.py) from the payload.
+
+Issues are stored grouped per rule (services/issue_groups.py): each row
+carries its occurrence_count, and the element list only when a reader
+asks for it with ?expand=.
+"""
+import textwrap
+from collections import namedtuple
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+from services.issue_groups import stored_occurrences
+
+# Bump whenever write_report_pdf's output changes; stored PDFs are keyed on it
+REPORT_TEMPLATE_VERSION = 3
+
+ISSUE_FIELDS = ('id', 'code', 'type', 'message', 'context', 'selector', 'recommendation_text', 'impact', 'occurrence_count')
+IssueRow = namedtuple('IssueRow', ISSUE_FIELDS)
+
+
+def summarize(type_counts: Dict[str, int]) -> Dict[str, int]:
+    """
+    Report summary from issue counts by type. Everything that is not an
+    error has medium severity and counts as a warning; notices are also
+    counted on their own.
+    """
+    total = sum(type_counts.values())
+    errors = type_counts.get('error', 0)
+    warnings = total - errors
+    notices = type_counts.get('notice', 0)
+    return {
+        "total_issues": total,
+        "errors": errors,
+        "warnings": warnings,
+        "notices": notices,
+        "accessibility_score": max(0, 100 - (errors * 5 + warnings * 2 + notices))
+    }
+
+
+def issue_dict(row: tuple) -> Dict[str, Any]:
+    """
+    One issue of the JSON and NDJSON reports; rows queried with their
+    occurrences (one more column after ISSUE_FIELDS) list the elements
+    """
+    issue = IssueRow(*row[:len(ISSUE_FIELDS)])
+    result = {
+        "id": issue.id,
+        "code": issue.code,
+        "type": issue.type,
+        "impact": issue.impact,
+        "message": issue.message,
+        "context": issue.context,
+        "selector": issue.selector,
+        "recommendation": issue.recommendation_text,
+        "severity": "high" if issue.type == 'error' else "medium",
+        "occurrence_count": issue.occurrence_count or 1
+    }
+    if len(row) > len(ISSUE_FIELDS):
+        result["occurrences"] = stored_occurrences(issue.selector, issue.context, row[len(ISSUE_FIELDS)])
+    return result
+
+
+def issue_dicts(rows: Iterable[tuple], expand: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Report issues of rows; expand="nodes" turns each group back into one issue per element"""
+    for row in rows:
+        issue = issue_dict(row)
+        if expand != "nodes":
+            yield issue
+            continue
+        for element in issue.pop("occurrences"):
+            yield dict(issue, occurrence_count=1, **element)
+
+
+def build_report(scan: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    JSON report of a completed scan (GET /scan/{id}/report): one page of
+    issues, the whole scan's summary and the cursor of the next page
+    """
+    issues = list(issue_dicts(scan['issues'], scan['page'].get('expand')))
+    summary = scan['summary']
+
+    return {
+        "scan_id": scan['id'],
+        "url": scan['url'],
+        "status": scan['status'],
+        "issues": issues,
+        "summary": summary,
+        "created_at": scan['created_at'].isoformat() if scan['created_at'] else None,
+        "scan_duration": f"{summary['duration_seconds']:.1f}s" if summary.get('duration_seconds') is not None else "Completed",
+        "page": scan['page']
+    }
+
+
+# Issues per reportlab Table; one giant table makes layout quadratic in its row count
+PDF_TABLE_CHUNK_ROWS = 100
+GROUPED_FIELDS = ('code', 'type', 'count', 'message', 'recommendation_text')
+GroupedRow = namedtuple('GroupedRow', GROUPED_FIELDS)
+
+_END = object()
+
+
+class _LazyStory(list):
+    """
+    Flowable list for doc.build() that is refilled from a generator as
+    reportlab consumes it from the front, so only a few tables exist at once
+    """
+
+    def __init__(self, flowables: Iterator[Any], low_water: int = 4):
+        super().__init__()
+        self._source = flowables
+        self._low_water = low_water
+        self._refill()
+
+    def _refill(self):
+        while self._source is not None and len(self) < self._low_water:
+            flowable = next(self._source, _END)
+            if flowable is _END:
+                self._source = None
+            else:
+                self.append(flowable)
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._refill()
+
+
+def _chunks(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def format_wcag_code(code, limit=35):
+    """Simplify long WCAG codes"""
+    if not code:
+        return ""
+    simplified = code.replace('WCAG2AA.Principle', 'P')
+    simplified = simplified.replace('Guideline', 'G')
+    return simplified[:limit] + '...' if len(simplified) > limit else simplified
+
+
+def wrap_text(text, width=70):
+    """Wrap long text properly"""
+    if not text:
+        return ""
+    try:
+        clean_text = str(text).strip()
+        wrapped = textwrap.fill(clean_text, width=width)
+        return wrapped[:200] + '...' if len(wrapped) > 200 else wrapped
+    except:
+        return str(text)[:150] + '...' if len(str(text)) > 150 else str(text)
+
+
+def write_report_pdf(scan: Dict[str, Any], issues: Iterable[tuple], out: BinaryIO, grouped: bool = False):
+    """
+    Render the PDF report of a finished scan into the file object out;
+    raises ImportError without reportlab. issues is an iterable of
+    ISSUE_FIELDS tuples (GROUPED_FIELDS tuples when grouped) that is read
+    one table chunk at a time, so a batched DB cursor keeps memory flat.
+    scan needs 'url', 'created_at' and 'summary'.
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+    from reportlab.lib.units import inch
+
+    # Use A4 for better international compatibility
+    doc = SimpleDocTemplate(
+        out, 
+        pagesize=A4,
+        rightMargin=0.5*inch,
+        leftMargin=0.5*inch,
+        topMargin=0.5*inch,
+        bottomMargin=0.5*inch,
+        pageCompression=1
+    )
+
+    styles = getSampleStyleSheet()
+
+    # === CUSTOM STYLES ===
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=12,
+        alignment=1,  # Center
+        textColor=colors.HexColor('#2D3748')
+    )
+
+    header_style = ParagraphStyle(
+        'Header',
+        parent=styles['Heading2'],
+        fontSize=12,
+        spaceAfter=6,
+        textColor=colors.HexColor('#4A5568')
+    )
+
+    footer_style = ParagraphStyle(
+        'Footer',
+        parent=styles['Normal'],
+        fontSize=8,
+        textColor=colors.grey,
+        alignment=1  # Center
+    )
+
+    summary = scan['summary']
+
+    # Enhanced table styling
+    issues_table_style = TableStyle([
+        # Header row
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2D3748')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 7),
+        ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+
+        # Data rows
+        ('FONT', (0, 1), (-1, -1), 'Helvetica', 6),
+        ('VALIGN', (0, 1), (-1, -1), 'TOP'),
+        ('ALIGN', (0, 1), (0, -1), 'CENTER'),  # Type column centered
+        ('ALIGN', (1, 1), (-1, -1), 'LEFT'),   # Other columns left-aligned
+
+        # Grid and alternating colors
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f7fafc')]),
+
+        # Word wrap for text-heavy columns
+        ('WORDWRAP', (2, 1), (-1, -1), True),
+
+        # Type column styling based on severity
+        ('TEXTCOLOR', (0, 1), (0, -1), 
+         lambda r, c, data: 
+            colors.red if data and data[r][c] == 'ERROR' 
+            else colors.orange if data and data[r][c] == 'WARNING' 
+            else colors.blue),
+        ('FONT', (0, 1), (0, -1), 'Helvetica-Bold', 6),
+    ])
+
+    def issue_cells(row):
+        issue = IssueRow(*row)
+        recommendation = issue.recommendation_text
+        message = wrap_text(issue.message, 60)
+        if (issue.occurrence_count or 1) > 1:
+            message += f"\n({issue.occurrence_count} elements)"
+        return [
+            (issue.type or 'error').upper(),
+            format_wcag_code(issue.code),
+            message,
+            wrap_text(recommendation, 60) if recommendation else "No AI recommendation available"
+        ]
+
+    def grouped_cells(row):
+        group = GroupedRow(*row)
+        return [
+            (group.type or 'error').upper(),
+            format_wcag_code(group.code, 28),
+            str(group.count),
+            wrap_text(group.message, 55),
+            wrap_text(group.recommendation_text, 55) if group.recommendation_text else "No AI recommendation available"
+        ]
+
+    # Optimized column widths for A4 paper
+    if grouped:
+        table_header = ['Type', 'WCAG Code', 'Count', 'Issue Description', 'AI Recommendation']
+        col_widths = [0.6*inch, 1.1*inch, 0.5*inch, 2.35*inch, 2.35*inch]
+        cells = grouped_cells
+    else:
+        table_header = ['Type', 'WCAG Code', 'Issue Description', 'AI Recommendation']
+        col_widths = [0.6*inch, 1.3*inch, 2.5*inch, 2.5*inch]
+        cells = issue_cells
+
+    def story():
+        # === HEADER SECTION ===
+        yield Paragraph("Accessibility Scan Report", title_style)
+        yield Paragraph(f"<b>Scanned URL:</b> {scan['url']}", styles['Normal'])
+        yield Paragraph(f"<b>Scan Date:</b> {scan['created_at'].strftime('%Y-%m-%d %H:%M') if scan['created_at'] else 'Unknown'}", styles['Normal'])
+        yield Spacer(1, 0.3*inch)
+
+        # === EXECUTIVE SUMMARY ===
+        yield Paragraph("Executive Summary", header_style)
+
+        summary_data = [
+            ["Total Issues", "Errors", "Warnings", "Notices", "Score"],
+            [
+                str(summary['total_issues']),
+                str(summary['errors']),
+                str(summary['warnings']), 
+                str(summary['notices']),
+                f"{summary['accessibility_score']}/100"
+            ]
+        ]
+
+        summary_table = Table(summary_data, colWidths=[1.2*inch]*5)
+        summary_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4A5568')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 9),
+            ('FONT', (0, 1), (-1, 1), 'Helvetica', 10),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ]))
+
+        yield summary_table
+        yield Spacer(1, 0.3*inch)
+
+        # === DETAILED ISSUES SECTION ===
+        # Fixed-size tables, each built only when reportlab reaches it
+        if summary['total_issues']:
+            yield Paragraph("Issues by WCAG Code" if grouped else "Detailed Issues", header_style)
+            yield Spacer(1, 0.1*inch)
+            for chunk in _chunks(issues, PDF_TABLE_CHUNK_ROWS):
+                issues_table = Table([table_header] + [cells(row) for row in chunk], colWidths=col_widths, repeatRows=1)
+                issues_table.setStyle(issues_table_style)
+                yield issues_table
+        else:
+            yield Paragraph("✅ No accessibility issues found!", styles['Heading2'])
+
+        # === FOOTER ===
+        yield Spacer(1, 0.3*inch)
+        yield Paragraph("Generated by AdaptiveTest AI - Automated Accessibility Scanner", footer_style)
+
+    # === BUILD PDF ===
+    doc.build(_LazyStory(story()))
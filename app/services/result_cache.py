@@ -0,0 +1,278 @@
+# services/result_cache.py
+"""
+Content-hash result cache for repeat scans of unchanged pages.
+
+Entries are keyed by normalized URL and engine id (analyzer plus ruleset or
+axe-core version) and remember the SHA-256 of the page content they were
+computed from, the final (AI-enhanced) results, and the ETag/Last-Modified
+validators of the response. A later scan that gets a 304 for those
+validators, or fetches content with the same hash, reuses the stored
+results instead of re-parsing, re-analyzing and calling OpenAI again.
+
+The scans table is the cache: save_scan_results stores the normalized
+URL, content hash and validators of every reusable scan (completed, no
+error, no AI failure), and a lookup finds the latest one per (URL,
+engine) completed within RESULT_CACHE_TTL, so hits survive restarts and
+are shared by web and worker processes. Its issues are only loaded from
+scan_issues once the hash or a 304 matches. An in-process LRU bounded by
+entry count and age sits in front of the database.
+"""
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from config import settings
+from services.issue_groups import occurrence_total, stored_occurrences
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form used as cache key: lowercase scheme/host, no default port, sorted query, no fragment"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+@dataclass
+class CacheEntry:
+    content_hash: str
+    results: Optional[Dict[str, Any]]  # None until a stored scan's issues are loaded
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    stored_at: float = 0.0
+    scan_id: Optional[int] = None  # scan the entry was read from, if any
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; everything we store is UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _in_session(query, *args):
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        return query(db, *args)
+    finally:
+        db.close()
+
+
+def stored_entry(db, url: str, engine: str, max_age: float) -> Optional[CacheEntry]:
+    """Hash and validators of the latest reusable scan of a page, without its issues"""
+    from models import ScanResult
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age)
+    row = db.query(
+        ScanResult.id, ScanResult.content_hash, ScanResult.etag, ScanResult.last_modified, ScanResult.completed_at
+    ).filter(
+        ScanResult.normalized_url == normalize_url(url),
+        ScanResult.engine == engine,
+        ScanResult.status == "completed",
+        ScanResult.content_hash.isnot(None),
+        ScanResult.error_message.is_(None),
+        ScanResult.completed_at >= cutoff
+    ).order_by(ScanResult.completed_at.desc()).first()
+    if row is None:
+        return None
+    age = max(0.0, (datetime.now(timezone.utc) - _as_utc(row.completed_at)).total_seconds())
+    return CacheEntry(
+        content_hash=row.content_hash,
+        results=None,
+        etag=row.etag,
+        last_modified=row.last_modified,
+        stored_at=time.monotonic() - age,
+        scan_id=row.id
+    )
+
+
+def stored_results(db, entry: CacheEntry, engine: str) -> Dict[str, Any]:
+    """Results of the scan an entry was read from, rebuilt from its scan_issues rows"""
+    from models import ScanIssue
+    rows = db.query(
+        ScanIssue.code, ScanIssue.type, ScanIssue.message, ScanIssue.context, ScanIssue.selector,
+        ScanIssue.recommendation_text, ScanIssue.impact, ScanIssue.occurrence_count, ScanIssue.occurrences
+    ).filter(ScanIssue.scan_result_id == entry.scan_id).order_by(ScanIssue.id).all()
+    issues = [
+        {
+            'code': row.code,
+            'type': row.type,
+            'message': row.message,
+            'context': row.context,
+            'selector': row.selector,
+            'impact': row.impact,
+            'ai_recommendation': row.recommendation_text,
+            'occurrences': stored_occurrences(row.selector, row.context, row.occurrences),
+            'occurrence_count': row.occurrence_count or 1
+        }
+        for row in rows
+    ]
+    return {
+        'issues': issues,
+        'issue_count': occurrence_total(issues),
+        'metadata': {
+            'engine': engine,
+            'content_hash': entry.content_hash,
+            'etag': entry.etag,
+            'last_modified': entry.last_modified
+        }
+    }
+
+
+class ResultCache:
+    """Thread-safe LRU + TTL cache of final scan results, in front of the scans table"""
+
+    def __init__(self, max_entries: int = 500, ttl: float = 3600, use_database: bool = False):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.use_database = use_database
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evictions = 0
+        self.database_loads = 0
+        self._entries: "OrderedDict[Tuple[str, str], CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live_entry(self, key: Tuple[str, str]) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.stored_at > self.ttl:
+            del self._entries[key]
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: Tuple[str, str], entry: CacheEntry, replace: bool = True):
+        # Called with the lock held
+        if not replace and key in self._entries:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _entry(self, url: str, engine: str) -> Optional[CacheEntry]:
+        """Live entry from memory, else from the latest reusable scan in the database"""
+        key = (normalize_url(url), engine)
+        with self._lock:
+            entry = self._live_entry(key)
+        if entry is None and self.use_database:
+            entry = _in_session(stored_entry, url, engine, self.ttl)
+            if entry is not None:
+                with self._lock:
+                    self._store(key, entry, replace=False)
+        return entry
+
+    def validators(self, url: str, engine: str) -> Dict[str, str]:
+        """Conditional request headers for the last stored response of this URL"""
+        entry = self._entry(url, engine)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def get(self, url: str, engine: str, page_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Copy of the cached results if the page is unchanged.
+
+        page_hash=None means the server answered 304 Not Modified.
+        """
+        entry = self._entry(url, engine)
+        matches = entry is not None and (page_hash is None or page_hash == entry.content_hash)
+        if matches and entry.results is None:
+            # A stored scan's issues are only read once the page is known to be unchanged
+            loaded = _in_session(stored_results, entry, engine)
+            with self._lock:
+                if entry.results is None:
+                    entry.results = loaded
+                    self.database_loads += 1
+        with self._lock:
+            if not matches:
+                self.misses += 1
+                return None
+            if page_hash is None:
+                self.revalidated += 1
+            else:
+                self.hits += 1
+            results = copy.deepcopy(entry.results)
+
+        results.setdefault('metadata', {})
+        results['metadata']['cache'] = 'not-modified' if page_hash is None else 'content-hash'
+        results['metadata']['cache_age_seconds'] = round(time.monotonic() - entry.stored_at, 1)
+        if entry.scan_id is not None:
+            results['metadata']['cache_scan_id'] = entry.scan_id
+        results['from_cache'] = True
+        return results
+
+    def put(self, url: str, engine: str, page_hash: str, results: Dict[str, Any],
+            etag: Optional[str] = None, last_modified: Optional[str] = None):
+        key = (normalize_url(url), engine)
+        entry = CacheEntry(
+            content_hash=page_hash,
+            results=copy.deepcopy(results),
+            etag=etag,
+            last_modified=last_modified,
+            stored_at=time.monotonic()
+        )
+        with self._lock:
+            self._store(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.revalidated + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'not_modified_hits': self.revalidated,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'database_loads': self.database_loads,
+                'hit_ratio': round((self.hits + self.revalidated) / lookups, 3) if lookups else 0.0
+            }
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Process-wide cache, or None when RESULT_CACHE_ENABLED is off"""
+    global _cache
+    if not settings.result_cache_enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(
+                max_entries=settings.result_cache_max_entries,
+                ttl=settings.result_cache_ttl,
+                use_database=True
+            )
+        return _cache
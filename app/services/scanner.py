@@ -1,15 +1,42 @@
 # services/scanner.py
 import logging
-from typing import Dict, Any, List
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
 import json
 import os
-import requests
+import threading
+import time
+import httpx
 from openai import OpenAI
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+from config import settings
+from services.axe_core import AXE_CORE_VERSION, AXE_LOADED_CHECK, AXE_RUN_SCRIPT, AXE_RUN_TIMEOUT_MS, AXE_SOURCE
+from services.browser_pool import get_browser_pool
+from services.deadline import DeadlineExceeded, ScanAborted, ScanDeadline, finish_deadline, remaining_or, start_deadline
+from services.fetcher import FETCH_DEADLINE_SHARE, UnsupportedContentType, fetch_page
+from services.analysis import analyze_html, analyze_html_basic
+from services.executor import run_cpu_sync
+from services.progress import STAGE_PERCENT, get_broadcaster, report
+from services.html_rules import RULESET_VERSION, css_selector
+from services.issue_groups import group_issues, make_group, occurrence_total
+from services.result_cache import content_hash, get_result_cache, normalize_url
 
 logger = logging.getLogger(__name__)
 
+# Result cache engine ids; bump with the analyzer so stale results are never reused
+HTML_ENGINE = f"html-rules:{RULESET_VERSION}"
+AXE_ENGINE = f"axe-core:{AXE_CORE_VERSION}"
+
+NAVIGATION_TIMEOUT = 30.0
+AI_TIMEOUT = 30.0
+
+
+def report_stage(deadline: Optional[ScanDeadline], stage: str, percent: Optional[float] = None,
+                 message: Optional[str] = None, **kwargs):
+    """Progress event for the scan a deadline belongs to (no-op for ad-hoc scans)"""
+    report(deadline.scan_id if deadline is not None else None, stage, percent, message, **kwargs)
+
+
 class AIAccessibilityScanner:
     """AI-enhanced accessibility scanner with automatic fallback - HEROKU MEMORY OPTIMIZED"""
     
@@ -27,8 +54,9 @@ class AIAccessibilityScanner:
             self.ai_enabled = False
             logger.info("ℹ️ AI disabled - no OPENAI_API_KEY")
         
-        # Check if we're on Heroku - force fallback to save memory
-        self.on_heroku = os.getenv('DYNO') is not None
+        # Check if we're on Heroku - force fallback to save memory unless the
+        # pooled browser has been explicitly enabled there
+        self.on_heroku = os.getenv('DYNO') is not None and not settings.playwright_on_heroku
         self.playwright_available = False
         
         # Only use Playwright if NOT on Heroku (to avoid memory issues)
@@ -42,37 +70,52 @@ class AIAccessibilityScanner:
         else:
             logger.info("🚫 Playwright disabled on Heroku to conserve memory")
     
-    def scan_website(self, url: str) -> Dict[str, Any]:
-        """Main scan method with automatic fallback - HEROKU OPTIMIZED"""
+    def scan_website(self, url: str, deadline: Optional[ScanDeadline] = None) -> Dict[str, Any]:
+        """Main scan method with automatic fallback - HEROKU OPTIMIZED
+
+        With a deadline, a scan that runs out of time or is cancelled
+        returns the results gathered so far, flagged partial.
+        """
         logger.info(f"🔍 Starting accessibility scan for: {url}")
+        scan_results = None
         
         try:
             # On Heroku, always use fallback to avoid memory issues
             if self.on_heroku:
                 logger.info("🌐 Heroku environment detected - using memory-efficient fallback scanner")
-                scan_results = self._run_fallback_scan(url)
+                scan_results = self._run_fallback_scan(url, deadline)
             elif self.playwright_available:
                 logger.info("🚀 Attempting comprehensive Playwright scan...")
                 try:
-                    scan_results = self._run_playwright_scan(url)
+                    scan_results = self._run_playwright_scan(url, deadline)
                     if scan_results and scan_results.get('issues') is not None:
                         logger.info("✅ Playwright scan successful")
                     else:
                         raise Exception("Playwright scan returned no results")
+                except ScanAborted:
+                    raise
                 except Exception as playwright_error:
                     logger.warning(f"⚠️ Playwright scan failed, using fallback: {playwright_error}")
-                    scan_results = self._run_fallback_scan(url)
+                    scan_results = self._run_fallback_scan(url, deadline)
             else:
                 logger.info("🔄 Using fallback scanner (no Playwright)")
-                scan_results = self._run_fallback_scan(url)
+                scan_results = self._run_fallback_scan(url, deadline)
+            
+            # Unchanged page: cached results already carry their AI recommendations
+            if scan_results.get('from_cache'):
+                return scan_results
             
             # Step 2: Add AI recommendations if enabled and issues found
             if self.ai_enabled and scan_results.get('issues'):
                 logger.info(f"🤖 Enhancing {len(scan_results['issues'])} issues with AI")
-                return self._enhance_with_ai(scan_results, url)
+                scan_results = self._enhance_with_ai(scan_results, url, deadline)
             
+            self._cache_results(url, scan_results)
             return scan_results
             
+        except ScanAborted as e:
+            logger.warning(f"⏱️ Scan of {url} stopped ({e.reason}): {e}")
+            return self._partial_result(url, scan_results, e.reason)
         except Exception as e:
             logger.error(f"❌ Scan failed: {e}")
             return {
@@ -83,596 +126,251 @@ class AIAccessibilityScanner:
                 'error': str(e)
             }
     
-    def _run_playwright_scan(self, url: str) -> Dict[str, Any]:
-        """Run accessibility scan using Playwright + axe-core - MEMORY OPTIMIZED"""
+    def _run_playwright_scan(self, url: str, deadline: Optional[ScanDeadline] = None) -> Dict[str, Any]:
+        """Run accessibility scan using a pooled Playwright browser + axe-core"""
         try:
-            from playwright.sync_api import sync_playwright
-            
-            with sync_playwright() as p:
-                logger.info("🚀 Launching memory-optimized Chromium...")
-                
-                # EXTREME memory optimization for Heroku-like environments
-                browser = p.chromium.launch(
-                    args=[
-                        '--no-sandbox',
-                        '--disable-dev-shm-usage',
-                        '--disable-gpu',
-                        '--single-process',
-                        '--disable-web-security',
-                        '--disable-features=VizDisplayCompositor',
-                        '--disable-background-timer-throttling',
-                        '--disable-backgrounding-occluded-windows',
-                        '--disable-renderer-backgrounding',
-                        '--headless=new',
-                        '--memory-pressure-off',  # Disable memory pressure
-                        '--max_old_space_size=256',  # Limit memory
-                        '--javascript-harmony',  # Optimize JS
-                        '--no-first-run',
-                        '--no-zygote',
-                        '--no-default-browser-check'
-                    ],
-                    headless=True,
-                    timeout=30000  # Shorter timeout
-                )
-                
-                # Create context with memory limits
-                context = browser.new_context(
-                    viewport={"width": 1280, "height": 720},
-                    java_script_enabled=True,
-                    ignore_https_errors=True
-                )
-                
-                page = context.new_page()
-                
-                # Set aggressive timeouts
-                page.set_default_timeout(30000)
-                page.set_default_navigation_timeout(30000)
-                
-                # Navigate to URL
-                logger.info(f"🌐 Navigating to: {url}")
-                try:
-                    response = page.goto(url, wait_until='domcontentloaded', timeout=30000)  # Faster than 'networkidle'
-                    if not response or response.status >= 400:
-                        logger.error(f"❌ Failed to load URL: {url}, Status: {getattr(response, 'status', 'Unknown')}")
-                        context.close()
-                        browser.close()
-                        return self._create_error_result(url, f"Failed to load URL - Status: {getattr(response, 'status', 'Unknown')}")
-                except Exception as nav_error:
-                    logger.error(f"❌ Navigation failed: {nav_error}")
-                    context.close()
-                    browser.close()
-                    return self._create_error_result(url, f"Navigation failed: {str(nav_error)}")
-                
-                # Wait minimally for page to stabilize
-                page.wait_for_timeout(1000)
-                
-                # Inject axe-core
-                logger.info("📥 Injecting axe-core for comprehensive WCAG testing...")
-                try:
-                    page.add_script_tag({
-                        'url': 'https://cdnjs.cloudflare.com/ajax/libs/axe-core/4.8.5/axe.min.js'
-                    })
-                    
-                    # Wait for axe-core to load
-                    page.wait_for_function('typeof axe !== "undefined"', timeout=5000)
-                    logger.info("✅ axe-core loaded successfully")
-                except Exception as axe_error:
-                    logger.error(f"❌ axe-core failed to load: {axe_error}")
-                    context.close()
-                    browser.close()
-                    return self._create_error_result(url, f"axe-core failed to load: {str(axe_error)}")
-                
-                # Run accessibility analysis with timeout
-                logger.info("🔧 Running WCAG 2.1 AA compliance tests...")
-                try:
-                    results = page.evaluate("""
-                    async () => {
-                        try {
-                            return await axe.run({
-                                runOnly: {
-                                    type: 'tag',
-                                    values: ['wcag2a', 'wcag2aa', 'wcag21aa']
-                                },
-                                timeout: 15000,  // Shorter timeout
-                                resultTypes: ['violations', 'incomplete']
-                            });
-                        } catch (error) {
-                            return { error: error.message };
-                        }
-                    }
-                    """)
-                except Exception as eval_error:
-                    logger.error(f"❌ axe-core evaluation failed: {eval_error}")
-                    context.close()
-                    browser.close()
-                    return self._create_error_result(url, f"Accessibility test failed: {str(eval_error)}")
-                
-                # Clean up resources immediately
-                context.close()
-                browser.close()
-                
-                if 'error' in results:
-                    logger.error(f"❌ axe-core error: {results['error']}")
-                    return self._create_error_result(url, results['error'])
-                
-                # Log results
-                violation_count = len(results.get('violations', []))
-                incomplete_count = len(results.get('incomplete', []))
-                
-                logger.info(f"✅ WCAG scan completed: {violation_count} violations, {incomplete_count} incomplete")
-                return self._parse_axe_results(results, url)
-                    
+            return get_browser_pool().run(lambda context: self._scan_in_context(context, url, deadline))
+        except ScanAborted:
+            raise
         except Exception as e:
             logger.error(f"❌ Playwright scan execution failed: {e}")
-            return self._run_fallback_scan(url)
+            return self._run_fallback_scan(url, deadline)
     
-    def _run_fallback_scan(self, url: str) -> Dict[str, Any]:
-        """Fallback scanner using requests + HTML analysis - MEMORY EFFICIENT"""
+    def _scan_in_context(self, context, url: str, deadline: Optional[ScanDeadline] = None) -> Dict[str, Any]:
+        """Scan one URL inside a fresh BrowserContext handed out by the pool.
+
+        The sync pages belong to the pool's slot thread and cannot be closed
+        from a cancelling thread, so the deadline is enforced through
+        Playwright timeouts and checks between steps.
+        """
+        # axe-core is evaluated from memory in every document before page scripts run
+        context.add_init_script(script=AXE_SOURCE)
+        page = context.new_page()
+        
+        # Set aggressive timeouts, shortened to the scan's remaining budget
+        nav_timeout_ms = remaining_or(deadline, NAVIGATION_TIMEOUT, share=0.5) * 1000
+        page.set_default_timeout(nav_timeout_ms)
+        page.set_default_navigation_timeout(nav_timeout_ms)
+        
+        # Navigate to URL
+        logger.info(f"🌐 Navigating to: {url}")
+        report_stage(deadline, 'navigate', message=f"Loading {url} in the browser")
+        try:
+            response = page.goto(url, wait_until='domcontentloaded', timeout=nav_timeout_ms)  # Faster than 'networkidle'
+            if not response or response.status >= 400:
+                logger.error(f"❌ Failed to load URL: {url}, Status: {getattr(response, 'status', 'Unknown')}")
+                return self._create_error_result(url, f"Failed to load URL - Status: {getattr(response, 'status', 'Unknown')}")
+        except Exception as nav_error:
+            if deadline is not None:
+                deadline.check()
+            logger.error(f"❌ Navigation failed: {nav_error}")
+            return self._create_error_result(url, f"Navigation failed: {str(nav_error)}")
+        
+        # Wait minimally for page to stabilize
+        page.wait_for_timeout(1000)
+        
+        # Same rendered DOM as a previous scan: reuse its results
+        cache = get_result_cache()
+        page_hash = None
+        if cache:
+            page_hash = content_hash(page.content().encode('utf-8'))
+            cached = cache.get(url, AXE_ENGINE, page_hash)
+            if cached:
+                logger.info(f"♻️ Rendered page unchanged, reusing cached results for {url}")
+                return cached
+        
+        # Verify axe-core from the init script, falling back to an inline script tag
+        try:
+            if not page.evaluate(AXE_LOADED_CHECK):
+                logger.info("📥 Injecting vendored axe-core inline...")
+                page.add_script_tag(content=AXE_SOURCE)
+        except Exception as axe_error:
+            logger.error(f"❌ axe-core failed to load: {axe_error}")
+            return self._create_error_result(url, f"axe-core failed to load: {str(axe_error)}")
+        
+        # Run accessibility analysis with timeout
+        logger.info("🔧 Running WCAG 2.1 AA compliance tests...")
+        report_stage(deadline, 'axe', message="Running WCAG 2.1 AA checks (axe-core)")
+        axe_timeout = remaining_or(deadline, AXE_RUN_TIMEOUT_MS / 1000)
+        try:
+            results = page.evaluate(AXE_RUN_SCRIPT, axe_timeout * 1000)
+        except Exception as eval_error:
+            if deadline is not None:
+                deadline.check()
+            logger.error(f"❌ axe-core evaluation failed: {eval_error}")
+            return self._create_error_result(url, f"Accessibility test failed: {str(eval_error)}")
+        
+        if results.get('timedOut'):
+            if axe_timeout < AXE_RUN_TIMEOUT_MS / 1000:
+                raise DeadlineExceeded(f"axe-core run on {url} cut off by the scan deadline")
+            results = {'error': f"axe-core did not finish within {AXE_RUN_TIMEOUT_MS // 1000}s"}
+        
+        if 'error' in results:
+            logger.error(f"❌ axe-core error: {results['error']}")
+            return self._create_error_result(url, results['error'])
+        
+        # Log results
+        violation_count = len(results.get('violations', []))
+        incomplete_count = len(results.get('incomplete', []))
+        
+        logger.info(f"✅ WCAG scan completed: {violation_count} violations, {incomplete_count} incomplete")
+        report_stage(deadline, 'axe', 75, f"{violation_count} violations, {incomplete_count} to review",
+                     violations=violation_count, incomplete=incomplete_count)
+        scan_results = self._parse_axe_results(results, url)
+        scan_results['metadata'].update({'engine': AXE_ENGINE, 'content_hash': page_hash})
+        return scan_results
+    
+    def _run_fallback_scan(self, url: str, deadline: Optional[ScanDeadline] = None) -> Dict[str, Any]:
+        """Fallback scanner using the pooled HTTP client + HTML analysis - MEMORY EFFICIENT"""
         try:
             logger.info("🔄 Running memory-efficient HTML accessibility scan...")
             
-            # Fetch webpage with timeout and retry strategy
-            session = requests.Session()
-            retry_strategy = Retry(
-                total=2,
-                backoff_factor=0.5,
-                status_forcelist=[429, 500, 502, 503, 504],
+            # Shared pooled client; byte/time caps, non-HTML refused before download.
+            # Validators of the cached response let the server answer 304.
+            cache = get_result_cache()
+            report_stage(deadline, 'fetch', message=f"Downloading {url}")
+            on_progress = self._fetch_progress(deadline)
+            page = fetch_page(
+                url,
+                headers=cache.validators(url, HTML_ENGINE) if cache else None,
+                deadline=deadline,
+                on_progress=on_progress
             )
-            session.mount('http://', HTTPAdapter(max_retries=retry_strategy))
-            session.mount('https://', HTTPAdapter(max_retries=retry_strategy))
+            if page.not_modified:
+                cached = cache.get(url, HTML_ENGINE) if cache else None
+                if cached:
+                    logger.info(f"♻️ {url} not modified, reusing cached results")
+                    return cached
+                # Entry expired between the request and the 304
+                page = fetch_page(url, deadline=deadline, on_progress=on_progress)
+            
+            # A cancelled download is not worth analyzing; one cut by the deadline is
+            if page.truncated_reason == 'cancelled':
+                deadline.check()
             
-            response = session.get(url, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (compatible; AdaptiveTest/1.0)'
-            })
-            response.raise_for_status()
-            html_content = response.text
+            if cache:
+                cached = cache.get(url, HTML_ENGINE, page.content_hash)
+                if cached:
+                    logger.info(f"♻️ {url} content unchanged, reusing cached results")
+                    return cached
             
-            logger.info(f"✅ Successfully fetched {url}, analyzing HTML...")
+            logger.info(f"✅ Successfully fetched {url} ({page.bytes_read} bytes), analyzing HTML...")
             
             # Analyze HTML for accessibility issues
-            return self._analyze_html_accessibility(html_content, url)
+            report_stage(deadline, 'parse', message=f"Analyzing {page.bytes_read // 1024} KB of HTML")
+            results = self._analyze_html_accessibility(page.html, url, deadline)
+            metadata = results['metadata']
+            report_stage(
+                deadline, 'rules', 78,
+                f"{results['issue_count']} issues found",
+                timings={'parse': metadata.get('parse_seconds', 0.0), 'rules': metadata.get('rules_seconds', 0.0)},
+                issues=results['issue_count']
+            )
+            results['metadata'].update(page.metadata())
+            results['metadata']['engine'] = HTML_ENGINE
+            if page.truncated_reason == 'deadline':
+                results.update(partial=True, aborted='deadline')
+            return results
                 
+        except ScanAborted:
+            raise
+        except UnsupportedContentType as e:
+            logger.warning(f"⚠️ Skipping non-HTML page {url}: {e}")
+            return self._create_error_result(url, str(e))
         except Exception as e:
             logger.error(f"❌ Fallback scan failed: {e}")
             return self._create_error_result(url, f"Fallback scan failed: {str(e)}")
     
-    def _analyze_html_accessibility(self, html_content: str, url: str) -> Dict[str, Any]:
-        """Enhanced HTML content analysis for comprehensive accessibility issues"""
-        issues = []
-        
-        try:
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # 1. Document structure checks
-            if not soup.find('title'):
-                issues.append({
-                    'type': 'violation',
-                    'code': 'document-title',
-                    'message': 'Document does not have a title',
-                    'description': 'Page must have a title that describes topic or purpose',
-                    'context': 'Missing <title> tag in <head>',
-                    'selector': 'head',
-                    'impact': 'serious'
-                })
-            else:
-                title = soup.find('title')
-                if not title.get_text().strip():
-                    issues.append({
-                        'type': 'violation',
-                        'code': 'empty-title',
-                        'message': 'Document title is empty',
-                        'description': 'Page title should contain descriptive text',
-                        'context': '<title></title>',
-                        'selector': 'head > title',
-                        'impact': 'serious'
-                    })
-
-            # 2. Language attribute
-            html_tag = soup.find('html')
-            if not html_tag or not html_tag.get('lang'):
-                issues.append({
-                    'type': 'violation',
-                    'code': 'html-has-lang',
-                    'message': 'HTML element missing lang attribute',
-                    'description': 'The html element must have a lang attribute',
-                    'context': '<html> element',
-                    'selector': 'html',
-                    'impact': 'serious'
-                })
-
-            # 3. Viewport for mobile
-            if not soup.find('meta', attrs={'name': 'viewport'}):
-                issues.append({
-                    'type': 'violation',
-                    'code': 'meta-viewport',
-                    'message': 'Viewport meta tag is missing',
-                    'description': 'Viewport tag should be present for mobile responsiveness',
-                    'context': '<head> section',
-                    'selector': 'head',
-                    'impact': 'moderate'
-                })
-
-            # 4. Image analysis
-            images = soup.find_all('img')
-            for img in images:
-                alt = img.get('alt')
-                if alt is None:  # Missing alt entirely
-                    issues.append({
-                        'type': 'violation',
-                        'code': 'image-alt',
-                        'message': 'Image missing alt text',
-                        'description': 'Images must have alt text or be marked as decorative',
-                        'context': str(img)[:100],
-                        'selector': self._get_css_selector(img),
-                        'impact': 'critical'
-                    })
-                elif alt == '' and not img.get('role') == 'presentation' and not img.get('aria-hidden') == 'true':
-                    # Empty alt but not marked as decorative
-                    issues.append({
-                        'type': 'violation',
-                        'code': 'image-alt-decorative',
-                        'message': 'Image with empty alt should be marked as decorative',
-                        'description': 'Images with empty alt text should have role="presentation" or aria-hidden="true"',
-                        'context': str(img)[:100],
-                        'selector': self._get_css_selector(img),
-                        'impact': 'moderate'
-                    })
-
-            # 5. Heading structure
-            headings = soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-            if not any(h.name == 'h1' for h in headings):
-                issues.append({
-                    'type': 'violation',
-                    'code': 'page-has-heading-one',
-                    'message': 'Page missing H1 heading',
-                    'description': 'Page should have a level-one heading',
-                    'context': 'Page content',
-                    'selector': 'body',
-                    'impact': 'moderate'
-                })
-            
-            # Check heading hierarchy
-            heading_levels = [int(h.name[1]) for h in headings if h.name and h.name.startswith('h')]
-            if heading_levels:
-                current_level = heading_levels[0]
-                for level in heading_levels[1:]:
-                    if level > current_level + 1:
-                        issues.append({
-                            'type': 'violation',
-                            'code': 'heading-order',
-                            'message': 'Heading levels should not be skipped',
-                            'description': 'Headings should be in sequential order (e.g., h1 then h2, not h1 then h3)',
-                            'context': f'Heading level jump from {current_level} to {level}',
-                            'selector': 'h1, h2, h3, h4, h5, h6',
-                            'impact': 'moderate'
-                        })
-                    current_level = level
-
-            # 6. Form controls
-            inputs = soup.find_all('input')
-            for input_elem in inputs:
-                input_type = input_elem.get('type', 'text')
-                if input_type in ['text', 'password', 'email', 'search', 'tel', 'url', 'number']:
-                    input_id = input_elem.get('id')
-                    if input_id:
-                        label = soup.find('label', attrs={'for': input_id})
-                        if not label:
-                            # Check if input is inside label
-                            parent_label = input_elem.find_parent('label')
-                            if not parent_label:
-                                issues.append({
-                                    'type': 'violation',
-                                    'code': 'label',
-                                    'message': 'Form input missing associated label',
-                                    'description': 'Form inputs must have associated labels',
-                                    'context': str(input_elem)[:100],
-                                    'selector': self._get_css_selector(input_elem),
-                                    'impact': 'critical'
-                                })
-                    else:
-                        # No id, check for aria-label or aria-labelledby
-                        if not (input_elem.get('aria-label') or input_elem.get('aria-labelledby')):
-                            issues.append({
-                                'type': 'violation',
-                                'code': 'input-label',
-                                'message': 'Form input missing accessible name',
-                                'description': 'Form inputs must have an accessible name via label, aria-label, or aria-labelledby',
-                                'context': str(input_elem)[:100],
-                                'selector': self._get_css_selector(input_elem),
-                                'impact': 'critical'
-                            })
-
-            # 7. Buttons
-            buttons = soup.find_all('button')
-            for button in buttons:
-                if not button.get_text().strip() and not (button.get('aria-label') or button.get('aria-labelledby')):
-                    issues.append({
-                        'type': 'violation',
-                        'code': 'button-name',
-                        'message': 'Button missing accessible name',
-                        'description': 'Buttons must have an accessible name',
-                        'context': str(button)[:100],
-                        'selector': self._get_css_selector(button),
-                        'impact': 'critical'
-                    })
-
-            # 8. Links
-            links = soup.find_all('a', href=True)
-            for link in links:
-                link_text = link.get_text().strip()
-                if not link_text and not (link.get('aria-label') or link.get('aria-labelledby')):
-                    # Check for image alt text if link contains only image
-                    img_in_link = link.find('img')
-                    if not img_in_link or not img_in_link.get('alt'):
-                        issues.append({
-                            'type': 'violation',
-                            'code': 'link-name',
-                            'message': 'Link missing accessible name',
-                            'description': 'Links must have discernible text',
-                            'context': str(link)[:100],
-                            'selector': self._get_css_selector(link),
-                            'impact': 'serious'
-                        })
-                
-                # Check for generic link text
-                generic_texts = ['click here', 'read more', 'here', 'link', 'more info']
-                if link_text.lower() in generic_texts:
-                    issues.append({
-                        'type': 'violation', 
-                        'code': 'link-purpose',
-                        'message': 'Link text is not descriptive',
-                        'description': 'Link text should describe the purpose of the link',
-                        'context': f'Link text: "{link_text}"',
-                        'selector': self._get_css_selector(link),
-                        'impact': 'moderate'
-                    })
-
-            # 9. Color contrast (basic check)
-            elements_with_color = soup.find_all(style=True)
-            for elem in elements_with_color[:20]:  # Limit to first 20 for performance
-                style = elem.get('style', '').lower()
-                if 'color:' in style and 'background' not in style:
-                    issues.append({
-                        'type': 'violation',
-                        'code': 'color-contrast-potential',
-                        'message': 'Potential color contrast issue',
-                        'description': 'Text color defined without background color may have contrast issues',
-                        'context': str(elem)[:100],
-                        'selector': self._get_css_selector(elem),
-                        'impact': 'moderate'
-                    })
-
-            # 10. ARIA attributes
-            aria_elements = soup.find_all(attrs={"aria-label": True})
-            for elem in aria_elements:
-                aria_label = elem.get('aria-label', '').strip()
-                if not aria_label:
-                    issues.append({
-                        'type': 'violation',
-                        'code': 'aria-label-empty',
-                        'message': 'ARIA label is empty',
-                        'description': 'aria-label should not be empty',
-                        'context': str(elem)[:100],
-                        'selector': self._get_css_selector(elem),
-                        'impact': 'moderate'
-                    })
-
-            # 11. Tables
-            tables = soup.find_all('table')
-            for table in tables:
-                if not table.find('th') and not table.get('role') == 'presentation':
-                    issues.append({
-                        'type': 'violation',
-                        'code': 'table-headers',
-                        'message': 'Data table missing headers',
-                        'description': 'Data tables should have header cells',
-                        'context': str(table)[:100],
-                        'selector': self._get_css_selector(table),
-                        'impact': 'serious'
-                    })
-
-            # 12. Landmarks and structure
-            landmarks = soup.find_all(['header', 'main', 'nav', 'footer'])
-            aria_landmarks = soup.find_all(attrs={
-                'role': ['banner', 'main', 'navigation', 'contentinfo']
-            })
-            if not landmarks and not aria_landmarks:
-                issues.append({
-                    'type': 'violation',
-                    'code': 'landmarks',
-                    'message': 'Page missing semantic landmarks',
-                    'description': 'Use semantic HTML5 elements or ARIA landmarks for page structure',
-                    'context': 'Page structure',
-                    'selector': 'body',
-                    'impact': 'moderate'
-                })
-
-            # 13. Focus indicators
-            elements_with_outline = soup.find_all(style=True)
-            for elem in elements_with_outline[:10]:
-                style = elem.get('style', '').lower()
-                if 'outline: none' in style or 'outline: 0' in style:
-                    issues.append({
-                        'type': 'violation',
-                        'code': 'focus-visible',
-                        'message': 'Focus indicator removed',
-                        'description': 'Focus indicators should not be removed without providing custom focus styles',
-                        'context': str(elem)[:100],
-                        'selector': self._get_css_selector(elem),
-                        'impact': 'serious'
-                    })
-
-            # 14. Skip links
-            skip_links = soup.find_all('a', href=lambda x: x and '#main' in x or '#content' in x)
-            if not skip_links:
-                issues.append({
-                    'type': 'violation',
-                    'code': 'skip-link',
-                    'message': 'Skip to main content link missing',
-                    'description': 'Provide a skip link to bypass repetitive content',
-                    'context': 'Page navigation',
-                    'selector': 'body',
-                    'impact': 'moderate'
-                })
-
-        except Exception as e:
-            logger.error(f"❌ HTML analysis failed: {e}")
-            # Fall back to basic analysis if BeautifulSoup fails
-            return self._analyze_html_accessibility_basic(html_content, url)
-        
-        violation_count = len([i for i in issues if i['type'] == 'violation'])
+    def _fetch_progress(self, deadline: Optional[ScanDeadline]):
+        """fetch_page callback moving the bar through the fetch stage as bytes arrive"""
+        if deadline is None or deadline.scan_id is None:
+            return None
+        start, end = STAGE_PERCENT['fetch'], STAGE_PERCENT['parse']
+        began = time.monotonic()
+        allowance = min(settings.fetch_max_seconds, deadline.remaining() * FETCH_DEADLINE_SHARE)
         
-        return {
-            'issues': issues,
-            'issue_count': len(issues),
-            'violation_count': violation_count,
-            'incomplete_count': 0,
-            'scan_type': 'enhanced-html-analysis',
-            'metadata': {
-                'url': url,
-                'timestamp': 'enhanced-scan',
-                'page_title': soup.title.string if soup.title else url.split('/')[-1] or 'Unknown'
-            },
-            'ai_enhanced': False,
-            'fallback_used': True,
-            'memory_optimized': True
-        }
+        def on_progress(bytes_read: int, content_length: Optional[int]):
+            # Share of the body when its length is known, else of the byte or time allowance
+            done = bytes_read / max(1, content_length or settings.fetch_max_bytes)
+            if not content_length:
+                done = max(done, (time.monotonic() - began) / max(0.1, allowance))
+            percent = start + (end - start) * min(1.0, done)
+            report_stage(deadline, 'fetch', percent, f"Downloaded {bytes_read // 1024} KB")
+        return on_progress
+    
+    def _analyze_html_accessibility(
+        self, html_content: str, url: str, deadline: Optional[ScanDeadline] = None
+    ) -> Dict[str, Any]:
+        """Enhanced HTML content analysis; large pages run in the CPU process pool"""
+        time_budget = deadline.budget() if deadline is not None else None
+        if len(html_content) >= settings.cpu_offload_min_bytes:
+            return run_cpu_sync(analyze_html, html_content, url, settings.html_parser, time_budget)
+        return analyze_html(html_content, url, settings.html_parser, time_budget)
     
     def _analyze_html_accessibility_basic(self, html_content: str, url: str) -> Dict[str, Any]:
         """Basic HTML analysis fallback if BeautifulSoup fails"""
-        issues = []
-        html_lower = html_content.lower()
-        
-        # Basic checks without BeautifulSoup
-        if '<title>' not in html_lower:
-            issues.append({
-                'type': 'violation',
-                'code': 'document-title',
-                'message': 'Document does not have a title',
-                'description': 'The page should have a title that describes its content',
-                'context': '<head> section',
-                'selector': 'head',
-                'impact': 'serious'
-            })
-        
-        if 'lang=' not in html_lower and 'xml:lang=' not in html_lower:
-            issues.append({
-                'type': 'violation',
-                'code': 'html-has-lang',
-                'message': 'HTML element should have a lang attribute',
-                'description': 'The html element should have a lang attribute',
-                'context': '<html>',
-                'selector': 'html',
-                'impact': 'serious'
-            })
-        
-        if 'viewport' not in html_lower:
-            issues.append({
-                'type': 'violation', 
-                'code': 'meta-viewport',
-                'message': 'Viewport meta tag is missing',
-                'description': 'Viewport meta tag should be present for mobile responsiveness',
-                'context': '<head>',
-                'selector': 'head',
-                'impact': 'moderate'
-            })
-        
-        # Basic image check
-        if '<img' in html_lower:
-            img_tags = html_lower.count('<img')
-            alt_attrs = html_lower.count('alt=')
-            if alt_attrs < img_tags:
-                issues.append({
-                    'type': 'violation',
-                    'code': 'image-alt',
-                    'message': 'Images must have alternate text',
-                    'description': f'Found {img_tags} images but only {alt_attrs} alt attributes',
-                    'context': 'Image elements',
-                    'selector': 'img',
-                    'impact': 'critical'
-                })
-        
-        violation_count = len([i for i in issues if i['type'] == 'violation'])
-        
-        return {
-            'issues': issues,
-            'issue_count': len(issues),
-            'violation_count': violation_count,
-            'incomplete_count': 0,
-            'scan_type': 'html-analysis',
-            'metadata': {
-                'url': url,
-                'timestamp': 'fallback-scan',
-                'page_title': url.split('/')[-1] or 'Unknown'
-            },
-            'ai_enhanced': False,
-            'fallback_used': True,
-            'memory_optimized': True
-        }
+        return analyze_html_basic(html_content, url)
     
     def _get_css_selector(self, element):
         """Generate a simple CSS selector for an element"""
-        try:
-            if element.get('id'):
-                return f"#{element['id']}"
-            elif element.get('class'):
-                classes = ' '.join(element['class'])
-                return f".{classes}"
-            else:
-                return element.name
-        except:
-            return "element"
+        return css_selector(element)
 
     def _parse_axe_results(self, results: Dict, url: str) -> Dict[str, Any]:
-        """Parse axe-core results"""
+        """Parse axe-core results: one issue per rule with the nodes it failed on (services/issue_groups.py)"""
         issues = []
         
         # Process violations
         for violation in results.get('violations', []):
-            for node in violation.get('nodes', []):
-                issues.append({
-                    'type': 'violation',
-                    'code': violation.get('id', ''),
-                    'message': violation.get('help', ''),
-                    'description': violation.get('description', ''),
-                    'context': node.get('html', '')[:200],
-                    'selector': ', '.join(node.get('target', [])),
-                    'impact': violation.get('impact', 'moderate')
-                })
+            issues.append(make_group({
+                'type': 'violation',
+                'code': violation.get('id', ''),
+                'message': violation.get('help', ''),
+                'description': violation.get('description', ''),
+                'impact': violation.get('impact', 'moderate')
+            }, self._axe_occurrences(violation)))
         
         # Process incomplete results
         for incomplete in results.get('incomplete', []):
-            for node in incomplete.get('nodes', []):
-                issues.append({
-                    'type': 'incomplete',
-                    'code': incomplete.get('id', ''),
-                    'message': f"Needs review: {incomplete.get('help', '')}",
-                    'description': incomplete.get('description', ''),
-                    'context': node.get('html', '')[:200],
-                    'selector': ', '.join(node.get('target', [])),
-                    'impact': 'low'
-                })
+            issues.append(make_group({
+                'type': 'incomplete',
+                'code': incomplete.get('id', ''),
+                'message': f"Needs review: {incomplete.get('help', '')}",
+                'description': incomplete.get('description', ''),
+                'impact': 'low'
+            }, self._axe_occurrences(incomplete)))
         
-        violation_count = len([i for i in issues if i['type'] == 'violation'])
-        incomplete_count = len([i for i in issues if i['type'] == 'incomplete'])
+        # Rules without nodes have nothing to report; split by template or per node if configured
+        issues = group_issues([issue for issue in issues if issue['occurrences']])
+        violation_count = occurrence_total(i for i in issues if i['type'] == 'violation')
+        incomplete_count = occurrence_total(i for i in issues if i['type'] == 'incomplete')
         
         return {
             'issues': issues,
-            'issue_count': len(issues),
+            'issue_count': violation_count + incomplete_count,
+            'group_count': len(issues),
             'violation_count': violation_count,
             'incomplete_count': incomplete_count,
             'scan_type': 'axe-core',
             'metadata': {
                 'url': url,
                 'timestamp': results.get('timestamp', ''),
-                'page_title': results.get('url', '').split('/')[-1] or 'Unknown'
+                'page_title': results.get('url', '').split('/')[-1] or 'Unknown',
+                'axe_version': (results.get('testEngine') or {}).get('version') or AXE_CORE_VERSION
             },
             'ai_enhanced': False,
             'fallback_used': False
         }
     
-    def _enhance_with_ai(self, scan_results: Dict[str, Any], url: str) -> Dict[str, Any]:
+    @staticmethod
+    def _axe_occurrences(rule: Dict) -> List[Dict[str, str]]:
+        return [
+            {'context': node.get('html', '')[:200], 'selector': ', '.join(node.get('target', []))}
+            for node in rule.get('nodes', [])
+        ]
+    
+    def _enhance_with_ai(
+        self, scan_results: Dict[str, Any], url: str, deadline: Optional[ScanDeadline] = None
+    ) -> Dict[str, Any]:
         """Enhance results with AI recommendations"""
         try:
             # Get only violations for AI analysis
@@ -682,7 +380,8 @@ class AIAccessibilityScanner:
                 return scan_results
             
             logger.info(f"🧠 Generating AI recommendations for {len(violations)} violations...")
-            ai_recommendations = self._get_ai_recommendations(violations, url)
+            report_stage(deadline, 'ai', message=f"Generating recommendations for {len(violations)} violations")
+            ai_recommendations = self._get_ai_recommendations(violations, url, deadline)
             
             # Add AI recommendations to issues
             enhanced_issues = []
@@ -705,6 +404,8 @@ class AIAccessibilityScanner:
             logger.info("✅ AI enhancement completed")
             return scan_results
             
+        except ScanAborted:
+            raise
         except Exception as e:
             logger.error(f"❌ AI enhancement failed: {e}")
             # Return original results without AI enhancement
@@ -712,14 +413,29 @@ class AIAccessibilityScanner:
             scan_results['ai_error'] = str(e)
             return scan_results
     
-    def _get_ai_recommendations(self, violations: List[Dict], url: str) -> Dict[str, str]:
+    def _get_ai_recommendations(
+        self, violations: List[Dict], url: str, deadline: Optional[ScanDeadline] = None
+    ) -> Dict[str, str]:
         """Get AI recommendations from OpenAI"""
+        client = self.openai_client
+        timeout = remaining_or(deadline, AI_TIMEOUT)
+        http_client = None
+        unregister = None
+        if deadline is not None:
+            # Own connection per call so cancelling the scan, or running out
+            # of budget mid-response (httpx timeouts are per read), aborts it
+            http_client = httpx.Client(timeout=timeout)
+            client = client.with_options(http_client=http_client, max_retries=0)
+            unregister = deadline.on_cancel(http_client.close)
+            budget_timer = threading.Timer(timeout, http_client.close)
+            budget_timer.daemon = True
+            budget_timer.start()
         try:
             # Build prompt
             prompt = self._build_ai_prompt(violations, url)
             
             logger.info("📡 Calling OpenAI API...")
-            response = self.openai_client.chat.completions.create(
+            response = client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[
                     {
@@ -733,7 +449,7 @@ class AIAccessibilityScanner:
                 ],
                 max_tokens=600,
                 temperature=0.3,
-                timeout=30
+                timeout=timeout
             )
             
             ai_response = response.choices[0].message.content
@@ -742,8 +458,15 @@ class AIAccessibilityScanner:
             return self._parse_ai_response(ai_response)
             
         except Exception as e:
+            if deadline is not None:
+                deadline.check()
             logger.error(f"❌ OpenAI API call failed: {e}")
             return {}
+        finally:
+            if unregister is not None:
+                unregister()
+                budget_timer.cancel()
+                http_client.close()
     
     def _build_ai_prompt(self, violations: List[Dict], url: str) -> str:
         """Build AI prompt"""
@@ -788,6 +511,8 @@ class AIAccessibilityScanner:
             'empty-title': 'Add meaningful content to the page title.',
             'empty-aria-label': 'Provide meaningful text for aria-label attribute.',
             'invalid-aria-labelledby': 'Ensure aria-labelledby references existing elements.',
+            'duplicate-id': 'Give every element a unique id attribute value.',
+            'duplicate-id-aria': 'Make ids referenced by labels or ARIA attributes unique so the association is unambiguous.',
             'image-alt-decorative': 'Add role="presentation" or aria-hidden="true" to decorative images.',
             'heading-order': 'Ensure heading levels are sequential (h1, h2, h3, etc.).',
             'input-label': 'Add label, aria-label, or aria-labelledby to form inputs.',
@@ -801,6 +526,33 @@ class AIAccessibilityScanner:
         }
         return recommendations.get(rule_id, 'Review and fix this accessibility issue.')
     
+    def _cache_results(self, url: str, results: Dict[str, Any]):
+        """Remember final results of a fresh, successful scan for unchanged re-scans"""
+        cache = get_result_cache()
+        metadata = results.get('metadata') or {}
+        if cache is None or results.get('from_cache') or not reusable_results(results):
+            return
+        cache.put(
+            url,
+            metadata.get('engine', HTML_ENGINE),
+            metadata['content_hash'],
+            results,
+            etag=metadata.get('etag'),
+            last_modified=metadata.get('last_modified')
+        )
+    
+    def _partial_result(self, url: str, results: Optional[Dict[str, Any]], reason: str) -> Dict[str, Any]:
+        """Results gathered before a scan was stopped, flagged partial"""
+        if results is None:
+            results = {
+                'issues': [],
+                'issue_count': 0,
+                'scan_type': 'partial',
+                'metadata': {'url': url},
+                'ai_enhanced': False
+            }
+        return dict(results, partial=True, aborted=reason)
+    
     def _create_error_result(self, url: str, error: str) -> Dict[str, Any]:
         """Create error result"""
         return {
@@ -824,38 +576,28 @@ def scan_website_with_recommendations(db, url: str, scan_id: int):
     try:
         # Update scan status to scanning
         from models import ScanResult, ScanIssue
-        scan = db.get(ScanResult, scan_id)
+        scan = db.get(ScanResult, scan_id, populate_existing=True)
         if scan:
+            if scan.status not in ("pending", "scanning"):
+                # Cancelled (or reset) before it got to run
+                logger.info(f"⏭️ Not running scan {scan_id}: it is {scan.status}")
+                return _scanner_instance._partial_result(url, None, scan.status)
             scan.status = "scanning"
+            scan.started_at = datetime.now(timezone.utc)
             db.commit()
+        get_broadcaster().publish(scan_id, 'starting', message=f"Starting scan of {url}")
         
-        # Run the scan (will automatically use fallback on Heroku)
+        # Run the scan (will automatically use fallback on Heroku) within its deadline
         logger.info(f"🎯 Starting memory-optimized scan for {url} with ID {scan_id}")
-        results = _scanner_instance.scan_website(url)
+        deadline = start_deadline(scan_id)
+        try:
+            results = _scanner_instance.scan_website(url, deadline)
+        finally:
+            finish_deadline(scan_id)
         
         # Save results to database
-        if scan and 'issues' in results:
-            # Clear existing issues - FIXED: uses scan_result_id
-            db.query(ScanIssue).filter(ScanIssue.scan_result_id == scan_id).delete()
-            
-            # Add new issues - FIXED: uses scan_result_id and includes type field
-            for issue_data in results['issues']:
-                issue = ScanIssue(
-                    scan_result_id=scan_id,  # FIXED: correct column name
-                    code=issue_data.get('code', ''),
-                    type=issue_data.get('type', 'violation'),  # ADDED: type field
-                    message=issue_data.get('message', ''),
-                    context=issue_data.get('context', ''),
-                    selector=issue_data.get('selector', ''),
-                    recommendation_text=issue_data.get('ai_recommendation') or issue_data.get('description', '')
-                )
-                db.add(issue)
-            
-            # Update scan status
-            scan.status = "completed"
-            scan.scan_type = results.get('scan_type', 'unknown')
-            db.commit()
-            logger.info(f"✅ Scan {scan_id} completed successfully with {len(results['issues'])} issues")
+        if scan:
+            save_scan_results(db, scan, results)
         
         return results
         
@@ -866,11 +608,73 @@ def scan_website_with_recommendations(db, url: str, scan_id: int):
             scan = db.get(ScanResult, scan_id)
             if scan:
                 scan.status = "failed"
+                scan.phase = "done"
                 db.commit()
+            get_broadcaster().finish(scan_id, "failed")
         except Exception as db_error:
             logger.error(f"❌ Failed to update scan status: {db_error}")
         
         raise e
 
+def final_status(results: Dict[str, Any]) -> str:
+    """completed, or for a stopped scan: partial if it found anything, else cancelled/failed"""
+    if not results.get('partial'):
+        return "completed"
+    if results.get('issues'):
+        return "partial"
+    return "cancelled" if results.get('aborted') == "cancelled" else "failed"
+
+def reusable_results(results: Dict[str, Any]) -> bool:
+    """Whether later scans of an unchanged page may reuse these results (services/result_cache.py)"""
+    return bool(
+        (results.get('metadata') or {}).get('content_hash')
+        and not (results.get('error') or results.get('partial') or results.get('ai_error'))
+    )
+
+
+def save_scan_results(db, scan, results: Dict[str, Any]):
+    """Replace the stored issues of a scan with the given results and set its final status"""
+    from services.issue_writer import write_issues
+    from services.summary import summary_from_results
+    from services.report_store import REPORT_STATUSES, prerender_report_pdf
+    if 'issues' not in results:
+        return
+    
+    scan_id = scan.id
+    broadcaster = get_broadcaster()
+    # One row per rule (per ISSUE_GROUPING) whichever engine produced the issues
+    issues = group_issues(results['issues'])
+    found = occurrence_total(issues)
+    broadcaster.publish(scan_id, 'persist', message=f"Saving {found} issues in {len(issues)} groups")
+    # Replace the scan's issues in bulk (COPY / executemany); committed below with the status
+    write_issues(db, scan_id, issues)
+    
+    # Update scan status and its summary, so readers never count the issues again
+    scan.status = final_status(results)
+    scan.completed_at = datetime.now(timezone.utc)
+    # Failed fetches and axe-core errors still complete; the error keeps them from being reused
+    scan.error_message = results.get('error')
+    metadata = results.get('metadata') or {}
+    engine = metadata.get('engine') or results.get('scan_type', 'unknown')
+    # The page the results came from, so the result cache can find them from any process
+    reusable = reusable_results(results)
+    scan.normalized_url = normalize_url(scan.url)
+    scan.content_hash = metadata['content_hash'] if reusable else None
+    scan.etag = metadata.get('etag') if reusable else None
+    scan.last_modified = metadata.get('last_modified') if reusable else None
+    summary = summary_from_results(issues, engine, scan.started_at, scan.completed_at)
+    for column, value in summary.items():
+        setattr(scan, column, value)
+    for column, value in broadcaster.final_row_values(scan_id).items():
+        setattr(scan, column, value)
+    db.commit()
+    broadcaster.finish(scan_id, scan.status, issues=found)
+    if scan.status in REPORT_STATUSES:
+        prerender_report_pdf(scan_id)
+    if scan.status == "completed":
+        logger.info(f"✅ Scan {scan_id} completed successfully with {found} issues ({len(issues)} groups)")
+    else:
+        logger.warning(f"⏱️ Scan {scan_id} {scan.status} ({results.get('aborted')}) with {found} issues")
+
 def get_scanner():
     return _scanner_instance
\ No newline at end of file
@@ -0,0 +1,162 @@
+# services/scheduler.py
+"""
+Scan scheduler: decides which queued job a worker claims next.
+
+- Priority classes: interactive single scans run ahead of batch and
+  recurring scans. The class a client asks for is only a ceiling:
+  scan_priority demotes a client's scans to batch while it already has
+  jobs queued or running, so bulk submitters cannot label everything
+  interactive.
+- Aging: every SCHEDULER_AGING_SECONDS of waiting promotes a job one
+  class, so low-priority work is never starved.
+- Weighted fair queuing per client: within a class, the client with the
+  least recent service per unit of weight (running jobs plus jobs claimed
+  in the last SCHEDULER_FAIR_WINDOW_SECONDS, divided by its weight from
+  SCHEDULER_CLIENT_WEIGHTS) goes first, FIFO after that.
+- Per-host cap: jobs for a host already running SCAN_MAX_PER_HOST scans
+  are skipped.
+
+Candidates are the head job of each (client, class, host) group, so a
+tenant with 500 queued URLs contributes one candidate per host, not 500.
+All state lives in scan_jobs, so every worker process schedules from the
+same view; the caps are soft under concurrent claims.
+
+None of this applies with SCAN_DISPATCH=inline: web processes run their
+scans in arrival order, with only SCAN_MAX_CONCURRENT as a limit.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import ScanJob
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CLASSES = {"interactive": 0, "batch": 1, "recurring": 2}
+CLASS_NAMES = {rank: name for name, rank in PRIORITY_CLASSES.items()}
+WAIT_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes; everything we store is UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def priority_rank(name: Optional[str]) -> int:
+    return PRIORITY_CLASSES.get(name or "interactive", 0)
+
+
+def scan_priority(db: Session, client_id: Optional[str], requested: Optional[str] = None) -> str:
+    """
+    Priority class for a new job: interactive only for a client's single
+    scan in flight (and an identifiable client), batch otherwise; asking
+    for a lower class is always honoured.
+    """
+    rank = priority_rank(requested)
+    if rank == PRIORITY_CLASSES["interactive"]:
+        busy = client_id is None or db.query(func.count(ScanJob.id)).filter(
+            ScanJob.client_id == client_id,
+            ScanJob.state.in_(("queued", "running"))
+        ).scalar() > 0
+        if busy:
+            rank = PRIORITY_CLASSES["batch"]
+    return CLASS_NAMES[rank]
+
+
+def client_weight(client_id: Optional[str]) -> float:
+    return max(0.01, settings.scheduler_client_weights.get(client_id or "", 1.0))
+
+
+def order_candidates(db: Session, now: datetime) -> List[int]:
+    """Ids of claimable jobs, best first"""
+    heads = db.query(func.min(ScanJob.id)).filter(
+        ScanJob.state == "queued",
+        ScanJob.available_at <= now
+    ).group_by(ScanJob.client_id, ScanJob.priority, ScanJob.host).all()
+    if not heads:
+        return []
+    candidates = db.query(
+        ScanJob.id, ScanJob.client_id, ScanJob.priority, ScanJob.host, ScanJob.created_at
+    ).filter(ScanJob.id.in_([job_id for (job_id,) in heads])).all()
+
+    running_by_host = dict(db.query(ScanJob.host, func.count(ScanJob.id)).filter(
+        ScanJob.state == "running"
+    ).group_by(ScanJob.host).all())
+    service = defaultdict(int)
+    for client_id, count in db.query(ScanJob.client_id, func.count(ScanJob.id)).filter(
+        ScanJob.state == "running"
+    ).group_by(ScanJob.client_id):
+        service[client_id] += count
+    for client_id, count in db.query(ScanJob.client_id, func.count(ScanJob.id)).filter(
+        ScanJob.state != "running",
+        ScanJob.claimed_at >= now - timedelta(seconds=settings.scheduler_fair_window_seconds)
+    ).group_by(ScanJob.client_id):
+        service[client_id] += count
+
+    max_per_host = settings.scan_max_per_host
+    aging = max(1, settings.scheduler_aging_seconds)
+    ranked = []
+    for job_id, client_id, priority, host, created_at in candidates:
+        if max_per_host > 0 and host and running_by_host.get(host, 0) >= max_per_host:
+            continue
+        waited = (now - (_as_utc(created_at) or now)).total_seconds()
+        effective_class = max(0, priority - int(waited // aging))
+        share = service[client_id] / client_weight(client_id)
+        ranked.append((effective_class, share, job_id))
+    ranked.sort()
+    return [job_id for _, _, job_id in ranked]
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 2)
+
+
+def scheduler_stats(db: Session) -> Dict[str, Any]:
+    """Queue depth and claim wait-time histograms per priority class"""
+    now = datetime.now(timezone.utc)
+    since = now - timedelta(seconds=settings.scheduler_histogram_window_seconds)
+    waits = defaultdict(list)
+    for priority, created_at, claimed_at in db.query(
+        ScanJob.priority, ScanJob.created_at, ScanJob.claimed_at
+    ).filter(ScanJob.claimed_at >= since):
+        if created_at is not None:
+            waits[priority].append(max(0.0, (_as_utc(claimed_at) - _as_utc(created_at)).total_seconds()))
+    queued = dict(db.query(ScanJob.priority, func.count(ScanJob.id)).filter(
+        ScanJob.state == "queued"
+    ).group_by(ScanJob.priority).all())
+
+    classes = {}
+    for rank, name in CLASS_NAMES.items():
+        values = sorted(waits.get(rank, []))
+        buckets = {}
+        for bound in WAIT_BUCKETS:
+            buckets[f"le_{bound}"] = sum(1 for value in values if value <= bound)
+        buckets["le_inf"] = len(values)
+        classes[name] = {
+            'queued': queued.get(rank, 0),
+            'claimed': len(values),
+            'wait_seconds_p50': _percentile(values, 0.5),
+            'wait_seconds_p95': _percentile(values, 0.95),
+            'wait_histogram': buckets
+        }
+
+    running_by_host = dict(db.query(ScanJob.host, func.count(ScanJob.id)).filter(
+        ScanJob.state == "running"
+    ).group_by(ScanJob.host).all())
+    return {
+        'window_seconds': settings.scheduler_histogram_window_seconds,
+        'aging_seconds': settings.scheduler_aging_seconds,
+        'max_per_host': settings.scan_max_per_host,
+        'classes': classes,
+        'running_by_host': running_by_host
+    }
@@ -0,0 +1,128 @@
+# services/single_flight.py
+"""
+Single-flight scan creation.
+
+A start request for a URL that already has a pending/scanning scan, or one
+that completed within SCAN_REUSE_WINDOW_SECONDS, attaches to that scan
+instead of starting another. Scans that completed with an error (page
+failed to load, axe-core failed) are not reused: their empty result says
+nothing about the page. A client-supplied idempotency key always maps
+to the scan it first created.
+
+The database is the coordination point, so this holds across gunicorn
+workers: a partial unique index allows one in-flight scan per URL and
+idempotency keys are unique, so the losing insert of a race fails and
+re-reads the winner.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy import exists, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import ScanJob, ScanResult
+
+logger = logging.getLogger(__name__)
+
+IN_FLIGHT_STATUSES = ("pending", "scanning")
+LIVE_JOB_STATES = ("queued", "running")
+INSERT_ATTEMPTS = 3
+
+
+class IdempotencyKeyConflict(Exception):
+    """Raised when an idempotency key is reused for a different URL"""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _expire_stale_scans(db: Session, url: str):
+    """
+    Fail in-flight scans of the URL that nothing will finish, so a process
+    that died mid-scan does not block the URL forever. Scans with a queued
+    or running job are left to the job queue: queued ones may wait behind
+    higher-priority work for as long as the scheduler decides, and running
+    ones are requeued by the workers' lease reaper. What remains are
+    inline scans (and scans whose job never got enqueued), which are
+    stale once they started, or were created if they never started, more
+    than SCAN_INFLIGHT_TIMEOUT_SECONDS ago.
+    """
+    cutoff = _utcnow() - timedelta(seconds=settings.scan_inflight_timeout_seconds)
+    live_job = exists().where(
+        ScanJob.scan_result_id == ScanResult.id,
+        ScanJob.state.in_(LIVE_JOB_STATES)
+    )
+    expired = db.query(ScanResult).filter(
+        ScanResult.url == url,
+        ScanResult.status.in_(IN_FLIGHT_STATUSES),
+        func.coalesce(ScanResult.started_at, ScanResult.created_at) < cutoff,
+        ~live_job
+    ).update({ScanResult.status: "failed", ScanResult.phase: "done"}, synchronize_session=False)
+    if expired:
+        db.commit()
+        logger.warning(f"⏱️ Marked {expired} stale in-flight scan(s) of {url} as failed")
+
+
+def find_reusable_scan(db: Session, url: str, idempotency_key: Optional[str] = None) -> Optional[ScanResult]:
+    """Existing scan a new request for this URL should attach to, if any"""
+    if idempotency_key:
+        scan = db.query(ScanResult).filter(ScanResult.idempotency_key == idempotency_key).first()
+        if scan is not None:
+            if scan.url != url:
+                raise IdempotencyKeyConflict(f"Idempotency key already used for {scan.url}")
+            return scan
+
+    _expire_stale_scans(db, url)
+    scan = db.query(ScanResult).filter(
+        ScanResult.url == url,
+        ScanResult.status.in_(IN_FLIGHT_STATUSES)
+    ).order_by(ScanResult.id.desc()).first()
+    if scan is not None:
+        return scan
+
+    window = settings.scan_reuse_window_seconds
+    if window > 0:
+        return db.query(ScanResult).filter(
+            ScanResult.url == url,
+            ScanResult.status == "completed",
+            ScanResult.error_message.is_(None),
+            ScanResult.completed_at >= _utcnow() - timedelta(seconds=window)
+        ).order_by(ScanResult.completed_at.desc()).first()
+    return None
+
+
+def start_or_attach(
+    db: Session,
+    url: str,
+    idempotency_key: Optional[str] = None,
+    client_id: Optional[str] = None,
+    admit: Optional[Callable[[], None]] = None,
+) -> Tuple[ScanResult, bool]:
+    """Return (scan, created). Only the caller that gets created=True should run the scan.
+
+    admit() runs only before inserting, so attaching never counts against limits.
+    """
+    for _ in range(INSERT_ATTEMPTS):
+        existing = find_reusable_scan(db, url, idempotency_key)
+        if existing is not None:
+            logger.info(f"🔗 Attaching request for {url} to scan {existing.id} ({existing.status})")
+            return existing, False
+
+        if admit is not None:
+            admit()
+        scan = ScanResult(url=url, status="pending", idempotency_key=idempotency_key, client_id=client_id)
+        db.add(scan)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another worker inserted first; its row is visible on the next lookup
+            db.rollback()
+            continue
+        db.refresh(scan)
+        return scan, True
+
+    raise RuntimeError(f"Could not create or attach a scan for {url}")
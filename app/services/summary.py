@@ -0,0 +1,167 @@
+# services/summary.py
+"""
+Materialized scan summaries.
+
+Counts by type and impact, the accessibility score, the engine and the
+scan duration are written onto the scan_results row by save_scan_results
+in the same commit as the final status. Status polls, reports, the scan
+list and PDFs read those columns instead of loading or counting every
+issue. Rows from before the columns existed are filled in by
+`python -m backfill_summaries`; until then readers fall back to counting.
+"""
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import ScanIssue, ScanResult
+from services.issue_groups import occurrence_count
+from services.reports import summarize
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_STATUSES = ("completed", "partial")
+
+# Issues found: grouped rows count their elements, rows from before grouping count once
+FOUND = func.sum(func.coalesce(ScanIssue.occurrence_count, 1))
+
+
+def summary_columns(
+    type_counts: Dict[str, int],
+    impact_counts: Optional[Dict[str, int]] = None,
+    engine: Optional[str] = None,
+    duration_seconds: Optional[float] = None
+) -> Dict[str, Any]:
+    """scan_results column values for a summary"""
+    summary = summarize(type_counts)
+    return {
+        'issue_count': summary['total_issues'],
+        'error_count': summary['errors'],
+        'warning_count': summary['warnings'],
+        'notice_count': summary['notices'],
+        'accessibility_score': summary['accessibility_score'],
+        'type_counts': json.dumps(dict(type_counts), sort_keys=True),
+        'impact_counts': json.dumps(dict(impact_counts), sort_keys=True) if impact_counts is not None else None,
+        'engine': engine,
+        'duration_seconds': round(duration_seconds, 3) if duration_seconds is not None else None
+    }
+
+
+def summary_from_results(
+    issues: Iterable[Dict[str, Any]],
+    engine: Optional[str],
+    started_at: Optional[datetime],
+    completed_at: datetime
+) -> Dict[str, Any]:
+    """Summary columns of freshly scanned results, typed as save_scan_results stores them"""
+    types, impacts = Counter(), Counter()
+    for issue in issues:
+        found = occurrence_count(issue)
+        types[issue.get('type', 'violation')] += found
+        impacts[issue.get('impact') or 'unknown'] += found
+    return summary_columns(types, impacts, engine, _duration(started_at, completed_at))
+
+
+def _duration(started_at: Optional[datetime], completed_at: Optional[datetime]) -> Optional[float]:
+    if not started_at or not completed_at:
+        return None
+    # SQLite hands timestamps back without a zone; they are stored as UTC
+    if started_at.tzinfo is None:
+        started_at = started_at.replace(tzinfo=timezone.utc)
+    if completed_at.tzinfo is None:
+        completed_at = completed_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (completed_at - started_at).total_seconds())
+
+
+def stored_summary(scan: ScanResult) -> Optional[Dict[str, Any]]:
+    """Report summary read from the row, None if it was never materialized"""
+    if scan.issue_count is None:
+        return None
+    return {
+        "total_issues": scan.issue_count,
+        "errors": scan.error_count,
+        "warnings": scan.warning_count,
+        "notices": scan.notice_count,
+        "accessibility_score": scan.accessibility_score,
+        "by_type": _load(scan.type_counts),
+        "by_impact": _load(scan.impact_counts),
+        "engine": scan.engine,
+        "duration_seconds": scan.duration_seconds
+    }
+
+
+def _load(value: Optional[str]) -> Optional[Dict[str, int]]:
+    if not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
+
+
+def load_summary(db: Session, scan: ScanResult) -> Dict[str, Any]:
+    """Stored summary, or one GROUP BY over the issues for rows not yet backfilled"""
+    summary = stored_summary(scan)
+    if summary is not None:
+        return summary
+    counts = db.query(ScanIssue.type, FOUND).filter(
+        ScanIssue.scan_result_id == scan.id
+    ).group_by(ScanIssue.type).all()
+    return summarize({issue_type or 'unknown': count for issue_type, count in counts})
+
+
+def count_issues(db: Session, scan_id: int) -> int:
+    """Issue count of a row without a materialized summary"""
+    return db.query(FOUND).filter(ScanIssue.scan_result_id == scan_id).scalar() or 0
+
+
+def backfill_summaries(db: Session, batch_size: int = 500, force: bool = False) -> int:
+    """
+    Materialize summaries of finished scans that have none (all with force),
+    one GROUP BY per batch of scans. Issues saved before scan_issues.impact
+    existed have no impact, so scans made only of those get no impact
+    counts; engine and duration come from what the row has.
+    """
+    done = 0
+    last_id = 0
+    while True:
+        query = db.query(ScanResult).filter(
+            ScanResult.status.in_(SUMMARY_STATUSES),
+            ScanResult.id > last_id
+        )
+        if not force:
+            query = query.filter(ScanResult.issue_count.is_(None))
+        scans = query.order_by(ScanResult.id).limit(batch_size).all()
+        if not scans:
+            return done
+
+        counts: Dict[int, Dict[str, int]] = {scan.id: {} for scan in scans}
+        rows = db.query(ScanIssue.scan_result_id, ScanIssue.type, FOUND).filter(
+            ScanIssue.scan_result_id.in_(list(counts))
+        ).group_by(ScanIssue.scan_result_id, ScanIssue.type).all()
+        for scan_id, issue_type, count in rows:
+            counts[scan_id][issue_type or 'unknown'] = count
+
+        impacts: Dict[int, Dict[str, int]] = {}
+        rows = db.query(ScanIssue.scan_result_id, ScanIssue.impact, FOUND).filter(
+            ScanIssue.scan_result_id.in_(list(counts)),
+            ScanIssue.impact.isnot(None)
+        ).group_by(ScanIssue.scan_result_id, ScanIssue.impact).all()
+        for scan_id, impact, count in rows:
+            impacts.setdefault(scan_id, {})[impact] = count
+
+        for scan in scans:
+            duration = _duration(scan.started_at, scan.completed_at)
+            values = summary_columns(counts[scan.id], impacts.get(scan.id), scan.engine, duration)
+            if values['impact_counts'] is None and scan.impact_counts:
+                values['impact_counts'] = scan.impact_counts
+            for column, value in values.items():
+                setattr(scan, column, value)
+        db.commit()
+        done += len(scans)
+        last_id = scans[-1].id
+        logger.info(f"📊 Backfilled summaries of {done} scans (through id {last_id})")
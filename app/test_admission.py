@@ -0,0 +1,88 @@
+# app/test_admission.py
+"""
+Admission limits and inline running slots (services/admission.py) with
+scans orphaned by a restart still in the table.
+
+    cd app && python -m pytest test_admission.py
+"""
+import itertools
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import models  # noqa: F401 - registers the tables
+from config import settings
+from database import Base
+from models import ScanResult
+from services import admission
+
+_urls = itertools.count()
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "scan_max_concurrent", 10)
+    monkeypatch.setattr(settings, "scan_max_pending", 50)
+    monkeypatch.setattr(settings, "scan_max_per_client", 3)
+    monkeypatch.setattr(settings, "scan_inflight_timeout_seconds", 1800)
+    engine = create_engine(f"sqlite:///{tmp_path / 'admission.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _orphans(db, status: str, count: int, client_id: str = "client-a"):
+    # Left behind by a web worker that restarted three days ago
+    long_ago = datetime.now(timezone.utc) - timedelta(days=3)
+    db.add_all(
+        ScanResult(
+            url=f"https://example.com/{status}/{i}", status=status, client_id=client_id,
+            created_at=long_ago, started_at=long_ago if status == "scanning" else None
+        )
+        for i in range(count)
+    )
+    db.commit()
+
+
+def _new_scan(db, client_id: str = "client-a") -> ScanResult:
+    scan = ScanResult(url=f"https://example.com/new/{next(_urls)}", status="pending", client_id=client_id)
+    db.add(scan)
+    db.commit()
+    return scan
+
+
+def test_orphaned_scans_do_not_hold_running_slots(db):
+    _orphans(db, "scanning", 10)
+    _orphans(db, "pending", 5)
+    scan = _new_scan(db)
+
+    assert admission.queue_position(db, scan) == 1
+    assert admission.claim_slot(db, scan.id) is None
+    db.refresh(scan)
+    assert scan.status == "scanning"
+
+
+def test_orphaned_scans_do_not_fill_the_queue(db):
+    _orphans(db, "scanning", 10)
+    _orphans(db, "pending", 60)
+
+    admission.admit(db, "client-a")
+    assert admission.admission_status(db)['accepting']
+
+
+def test_live_scans_still_count(db):
+    for _ in range(10):
+        admission.claim_slot(db, _new_scan(db, client_id=None).id)
+    scan = _new_scan(db)
+
+    assert admission.claim_slot(db, scan.id) == "pending"
+    assert admission.queue_position(db, scan) == 1
+    for _ in range(2):
+        _new_scan(db)
+    with pytest.raises(admission.AdmissionRejected) as rejected:
+        admission.admit(db, "client-a")
+    assert rejected.value.status_code == 429
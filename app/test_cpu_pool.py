@@ -0,0 +1,59 @@
+# app/test_cpu_pool.py
+"""
+Round trips through the CPU process pool (services/executor.py).
+
+Whatever runs in the pool must come back by pickle: analyze_html output
+of every installed parser backend for a page large enough to be
+offloaded, and, for results that cannot be pickled, the inline fallback.
+
+    cd app && python -m pytest test_cpu_pool.py
+"""
+import threading
+
+import pytest
+
+from config import settings
+from services.analysis import analyze_html
+from services.executor import CpuExecutor
+from services.html_parser import available_backends
+
+ROW = '<div class="card"><img src="/a.png"><a href="#"></a><input type="text"></div>\n'
+
+
+def _large_page() -> str:
+    rows = ROW * (settings.cpu_offload_min_bytes // len(ROW) + 1)
+    return f"<html><head><title>Big page</title></head><body>{rows}</body></html>"
+
+
+def _unpicklable_result():
+    return {'lock': threading.Lock()}
+
+
+@pytest.fixture(scope="module")
+def executor():
+    executor = CpuExecutor(workers=1)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_analyze_html_result_survives_the_pool(executor, backend):
+    page = _large_page()
+    assert len(page) >= settings.cpu_offload_min_bytes
+
+    results = executor.run_sync(analyze_html, page, "https://example.com/big", backend)
+
+    assert results['metadata']['parser'] == backend
+    assert type(results['metadata']['page_title']) is str
+    assert results['metadata']['page_title'] == "Big page"
+    assert results['issue_count'] > 0
+    assert results['issues'] == analyze_html(page, "https://example.com/big", backend)['issues']
+
+
+def test_unpicklable_result_runs_inline(executor):
+    restarts = executor.restarts
+
+    results = executor.run_sync(_unpicklable_result)
+
+    assert isinstance(results['lock'], type(threading.Lock()))
+    assert executor.restarts == restarts
@@ -0,0 +1,147 @@
+# worker.py
+"""
+Scan worker process: `cd app && python -m worker`
+
+Claims jobs from the database scan queue (services/job_queue.py) and runs
+up to WORKER_CONCURRENCY scans at once, one thread per slot sharing this
+process's browser pool and HTTP client. A heartbeat thread renews the
+leases of running jobs and requeues jobs whose workers died. SIGTERM stops
+claiming new jobs and lets running scans finish.
+
+Used when SCAN_DISPATCH=queue; scale these processes independently of the
+web dynos.
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import uuid
+from typing import Dict
+
+from config import settings
+from database import SessionLocal, create_tables
+from models import ScanResult
+from services.job_queue import claim_job, complete_job, fail_job, heartbeat, reap_expired_leases
+from services.scanner import scan_website_with_recommendations
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ScanWorker:
+    """Runs queued scans in a fixed number of slots"""
+
+    def __init__(self, concurrency: int = 2, poll_interval: float = 2.0):
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stop = threading.Event()
+        self._finished = threading.Event()
+        self._active: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def stop(self, *args):
+        if not self._stop.is_set():
+            logger.info("🛑 Worker stopping: finishing running scans, claiming no new jobs")
+        self._stop.set()
+
+    def run(self):
+        create_tables()
+        logger.info(f"👷 Scan worker {self.worker_id} started with {self.concurrency} slots")
+
+        heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="scan-heartbeat", daemon=True)
+        heartbeat_thread.start()
+        slots = [
+            threading.Thread(target=self._slot_loop, args=(f"{self.worker_id}/{slot}",), name=f"scan-slot-{slot}")
+            for slot in range(self.concurrency)
+        ]
+        for thread in slots:
+            thread.start()
+        for thread in slots:
+            while thread.is_alive():
+                thread.join(timeout=1)
+
+        self._finished.set()
+        heartbeat_thread.join(timeout=5)
+        logger.info(f"👋 Scan worker {self.worker_id} stopped")
+
+    def _slot_loop(self, slot_id: str):
+        while not self._stop.is_set():
+            db = SessionLocal()
+            try:
+                job = claim_job(db, slot_id)
+                if job is not None:
+                    self._run_job(db, job.id, job.scan_result_id, job.url, slot_id)
+            except Exception as e:
+                logger.error(f"❌ Worker slot {slot_id} error: {e}")
+                job = None
+            finally:
+                db.close()
+            if job is None:
+                self._stop.wait(self.poll_interval)
+
+    def _run_job(self, db, job_id: int, scan_id: int, url: str, slot_id: str):
+        scan = db.get(ScanResult, scan_id)
+        if scan is None or scan.status not in ("pending", "scanning"):
+            # Reset or expired while queued; nothing left to do
+            logger.info(f"⏭️ Skipping job {job_id}: scan {scan_id} is {getattr(scan, 'status', 'missing')}")
+            complete_job(db, job_id, slot_id)
+            return
+
+        with self._lock:
+            self._active[job_id] = slot_id
+        try:
+            logger.info(f"🎯 Job {job_id}: scanning {url} (scan {scan_id})")
+            scan_website_with_recommendations(db, url, scan_id)
+            complete_job(db, job_id, slot_id)
+        except Exception as e:
+            db.rollback()
+            fail_job(db, job_id, slot_id, str(e))
+        finally:
+            with self._lock:
+                self._active.pop(job_id, None)
+
+    def _heartbeat_loop(self):
+        interval = max(1.0, settings.job_lease_seconds / 3)
+        while True:
+            db = SessionLocal()
+            try:
+                with self._lock:
+                    active = list(self._active.items())
+                for job_id, slot_id in active:
+                    if not heartbeat(db, job_id, slot_id):
+                        logger.warning(f"⚠️ Lost lease on job {job_id}; it may be retried elsewhere")
+                if not self._stop.is_set():
+                    reap_expired_leases(db)
+            except Exception as e:
+                logger.error(f"❌ Heartbeat failed: {e}")
+            finally:
+                db.close()
+            if self._finished.wait(interval):
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AdaptiveTest scan worker")
+    parser.add_argument("--concurrency", type=int, default=settings.worker_concurrency)
+    parser.add_argument("--poll-interval", type=float, default=settings.worker_poll_interval)
+    args = parser.parse_args()
+
+    worker = ScanWorker(concurrency=args.concurrency, poll_interval=args.poll_interval)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    try:
+        worker.run()
+    finally:
+        from services.browser_pool import shutdown_browser_pool
+        from services.executor import shutdown_cpu_executor
+        from services.http_client import close_fetch_client
+        shutdown_browser_pool()
+        close_fetch_client()
+        shutdown_cpu_executor()
+
+
+if __name__ == "__main__":
+    main()
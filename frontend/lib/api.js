@@ -3,6 +3,9 @@ import { useApi } from '../context/ApiContext';
 import { handleApiError } from './errorHandler';
 import toast from 'react-hot-toast';
 
+// Issue groups per report page; the result page loads further pages on demand
+export const REPORT_PAGE_SIZE = 100;
+
 export function useApiClient() {
   const { apiBaseUrl } = useApi();
   // UPDATED: Changed to new backend URL
@@ -88,11 +91,44 @@ export function useApiClient() {
     }
   }
 
-  // Get report
-  async function getReport(scanId) {
+  // Server-Sent Events stream of a scan's stage progress
+  function scanEventsUrl(scanId) {
+    return `${baseUrl}/scan/${scanId}/events`;
+  }
+
+  // Cancel a pending or running scan; issues found so far are kept
+  async function cancelScan(scanId) {
     if (!scanId) return { ok: false, data: null };
     try {
-      const res = await fetch(`${baseUrl}/scan/${scanId}/report`);
+      const res = await fetch(`${baseUrl}/scan/${scanId}/cancel`, { method: 'POST' });
+      
+      if (!res.ok) {
+        throw new Error(`HTTP error! status: ${res.status}`);
+      }
+      
+      const data = await res.json();
+      return { ok: res.ok, data };
+    } catch (err) {
+      handleApiError('Failed to cancel scan', err);
+      return { 
+        ok: false, 
+        data: { 
+          detail: err.message 
+        } 
+      };
+    }
+  }
+
+  // Get one page of a report. Filters (type, code, impact: comma-separated values)
+  // and sort are applied by the server; pass page.next_cursor as cursor for the next page
+  async function getReport(scanId, { type, code, impact, sort, cursor, limit = REPORT_PAGE_SIZE } = {}) {
+    if (!scanId) return { ok: false, data: null };
+    try {
+      const params = new URLSearchParams({ expand: 'occurrences' });
+      Object.entries({ type, code, impact, sort, cursor, limit }).forEach(([key, value]) => {
+        if (value) params.set(key, value);
+      });
+      const res = await fetch(`${baseUrl}/scan/${scanId}/report?${params}`);
       
       if (!res.ok) {
         throw new Error(`HTTP error! status: ${res.status}`);
@@ -249,6 +285,8 @@ export function useApiClient() {
   return { 
     startScan, 
     getScanStatus, 
+    scanEventsUrl,
+    cancelScan,
     getReport, 
     getScanResults, // NEW: Added this function
     downloadPdfReport, 
@@ -4,6 +4,14 @@ import { useEffect, useState } from "react";
 import { useRouter } from 'next/router';
 import Navbar from "../../components/Navbar";
 import Footer from "../../components/Footer";
+import { useApiClient } from "../../lib/api";
+
+// Sorts offered on the report; the server orders the issues
+const SORT_OPTIONS = [
+  { value: 'id', label: 'Page order' },
+  { value: '-impact', label: 'Most severe first' },
+  { value: 'code', label: 'Rule' }
+];
 
 // Helper to format HTML with proper indentation
 const formatHtml = (html) => {
@@ -474,6 +482,9 @@ export default function ResultPage() {
   const [expandedIssues, setExpandedIssues] = useState({});
   const [showEmailModal, setShowEmailModal] = useState(false);
   const [copySuccess, setCopySuccess] = useState('');
+  const [filters, setFilters] = useState({ type: '', impact: '', sort: 'id' });
+  const [pageLoading, setPageLoading] = useState(false);
+  const { getReport } = useApiClient();
 
   // Load report from localStorage
   useEffect(() => {
@@ -503,6 +514,30 @@ export default function ResultPage() {
     }
   }, [id]);
 
+  // Filters and sort run on the server: changing them refetches the first page
+  const applyFilters = async (changes) => {
+    const next = { ...filters, ...changes };
+    setFilters(next);
+    setPageLoading(true);
+    const { ok, data } = await getReport(id, next);
+    if (ok && data) {
+      setReport(prev => ({ ...prev, issues: data.issues, page: data.page }));
+    }
+    setPageLoading(false);
+  };
+
+  // Next page of the current filters, appended to the issues shown
+  const loadMoreIssues = async () => {
+    const cursor = report?.page?.next_cursor;
+    if (!cursor) return;
+    setPageLoading(true);
+    const { ok, data } = await getReport(id, { ...filters, cursor });
+    if (ok && data) {
+      setReport(prev => ({ ...prev, issues: prev.issues.concat(data.issues), page: data.page }));
+    }
+    setPageLoading(false);
+  };
+
   const toggleCategory = (category) => {
     setExpandedCategories(prev => ({
       ...prev,
@@ -566,12 +601,13 @@ export default function ResultPage() {
 
   // FIXED: Ultra-simple score calculation based on total issues
   const calculateOverallScore = () => {
-    if (!report?.issues) {
+    if (!report?.issues && !report?.summary) {
       console.log('No report issues found, score: 100');
       return 100;
     }
     
-    const totalIssues = report.issues.length;
+    // The whole scan's count; report.issues only holds the pages loaded so far
+    const totalIssues = report.summary?.total_issues ?? report.issues.length;
     console.log(`📊 Total issues found: ${totalIssues}`);
     
     if (totalIssues === 0) {
@@ -817,6 +853,43 @@ export default function ResultPage() {
             </div>
           </div>
 
+          {/* Issue filters, applied by the server */}
+          <div className="flex flex-wrap items-center gap-4 mb-8">
+            <select
+              value={filters.impact}
+              onChange={(e) => applyFilters({ impact: e.target.value })}
+              className="border border-gray-300 rounded-lg px-4 py-2"
+              aria-label="Filter by severity"
+            >
+              <option value="">All severities</option>
+              {Object.keys(report.summary?.by_impact || {}).filter(impact => impact !== 'unknown').map(impact => (
+                <option key={impact} value={impact}>{impact}</option>
+              ))}
+            </select>
+            <select
+              value={filters.type}
+              onChange={(e) => applyFilters({ type: e.target.value })}
+              className="border border-gray-300 rounded-lg px-4 py-2"
+              aria-label="Filter by type"
+            >
+              <option value="">All types</option>
+              {Object.keys(report.summary?.by_type || {}).filter(type => type !== 'unknown').map(type => (
+                <option key={type} value={type}>{type}</option>
+              ))}
+            </select>
+            <select
+              value={filters.sort}
+              onChange={(e) => applyFilters({ sort: e.target.value })}
+              className="border border-gray-300 rounded-lg px-4 py-2"
+              aria-label="Sort issues"
+            >
+              {SORT_OPTIONS.map(option => (
+                <option key={option.value} value={option.value}>{option.label}</option>
+              ))}
+            </select>
+            {pageLoading && <span className="text-gray-500">Loading issues…</span>}
+          </div>
+
           {/* Evaluation Categories - ALL CATEGORIES with Pass Marks */}
           <div className="space-y-6">
             {allCategories.map(category => {
@@ -972,6 +1045,20 @@ export default function ResultPage() {
                                           </div>
                                         )}
                                         
+                                        {/* Other elements the same rule failed on */}
+                                        {issue.occurrence_count > 1 && (
+                                          <div className="mb-3">
+                                            <p className="text-sm text-gray-600 mb-1 font-medium">
+                                              Found on {issue.occurrence_count} elements:
+                                            </p>
+                                            <ul className="bg-gray-800 text-yellow-300 p-2 rounded text-xs font-mono overflow-x-auto max-h-40 overflow-y-auto">
+                                              {(issue.occurrences || []).map((occurrence, i) => (
+                                                <li key={i}>{occurrence.selector}</li>
+                                              ))}
+                                            </ul>
+                                          </div>
+                                        )}
+                                        
                                         {/* XPath (if available) */}
                                         {issue.xpath && (
                                           <div className="mb-3">
@@ -1061,6 +1148,20 @@ export default function ResultPage() {
             })}
           </div>
 
+          {/* Further pages of issues, on demand */}
+          {report.page?.next_cursor && (
+            <div className="mt-8 text-center">
+              <button
+                onClick={loadMoreIssues}
+                disabled={pageLoading}
+                className="border-2 border-[#132A13] text-[#132A13] hover:bg-[#132A13]/10 px-8 py-3 rounded-lg font-semibold transition-colors disabled:opacity-50"
+              >
+                {pageLoading ? 'Loading…' : 'Load more issues'}
+              </button>
+              <p className="mt-2 text-sm text-gray-500">Showing {report.issues.length} issue groups</p>
+            </div>
+          )}
+
           {/* Download Report Button */}
           <div className="mt-12 text-center">
             <button
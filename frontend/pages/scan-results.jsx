@@ -78,9 +78,14 @@ export default function ScanResults() {
                 backgroundColor: "white",
               }}
             >
-              <h3 style={{ color: "gray" }}>{r.file_name || "Untitled Scan"}</h3>
+              <h3 style={{ color: "gray" }}>{r.url || r.file_name || "Untitled Scan"}</h3>
               <p>Status: {r.status}</p>
-              <p>Details: {r.details || "N/A"}</p>
+              <p>
+                Details:{" "}
+                {r.summary
+                  ? `${r.summary.total_issues} issues, score ${r.summary.accessibility_score}/100`
+                  : r.details || "N/A"}
+              </p>
               <p>Scanned At: {new Date(r.created_at).toLocaleString()}</p>
             </div>
           ))
@@ -1,6 +1,6 @@
 // pages/scanning/[id].jsx - FIXED with correct redirect to /result/[id]
 import Head from "next/head";
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useRouter } from "next/router";
 import { useApiClient } from "../../lib/api";
 import Navbar from "../../components/Navbar";
@@ -12,13 +12,26 @@ import toast from "react-hot-toast";
 export default function ScanningPage() {
   const router = useRouter();
   const { id } = router.query;
-  const { getScanStatus, getReport, startScan } = useApiClient();
+  const { getScanStatus, getReport, startScan, cancelScan, scanEventsUrl } = useApiClient();
 
   const [status, setStatus] = useState("pending");
   const [phase, setPhase] = useState("crawling");
   const [progress, setProgress] = useState(10);
   const [scanUrl, setScanUrl] = useState("");
   const [isAutoStarting, setIsAutoStarting] = useState(false);
+  const [queueInfo, setQueueInfo] = useState(null);
+  const [isCancelling, setIsCancelling] = useState(false);
+  const [stageMessage, setStageMessage] = useState("");
+
+  const handleCancel = async () => {
+    setIsCancelling(true);
+    const { ok } = await cancelScan(id);
+    if (ok) {
+      toast("🛑 Cancelling scan… issues found so far will be kept.");
+    } else {
+      setIsCancelling(false);
+    }
+  };
 
   // Real-time scanning categories with dynamic progress
   const [scanningCategories, setScanningCategories] = useState([
@@ -77,22 +90,34 @@ export default function ScanningPage() {
     checkForAutoScan();
   }, [id, router, startScan]);
 
-  // EXISTING SCAN STATUS POLLING
+  // LIVE SCAN PROGRESS - Server-Sent Events, status polling as the fallback
+  // (API client functions are recreated every render, so they are read through a ref)
+  const apiRef = useRef({ getScanStatus, getReport, scanEventsUrl });
+  apiRef.current = { getScanStatus, getReport, scanEventsUrl };
+
   useEffect(() => {
     if (!id) return;
 
-    let interval = setInterval(async () => {
-      try {
-        const { ok, data } = await getScanStatus(id);
-        if (!ok || !data) return;
+    let finished = false;
+    let interval = null;
+    let source = null;
 
-        setStatus(data.status || "pending");
-        if (data.phase) setPhase(data.phase);
-        if (data.url && !scanUrl) setScanUrl(data.url);
+    // Applies one status/progress update; true once the scan reached a final state
+    const applyUpdate = async (data) => {
+      if (finished) return true;
+      setStatus(data.status || "pending");
+      if (data.phase) setPhase(data.phase);
+      if (data.url) setScanUrl((prev) => prev || data.url);
+      setStageMessage(data.message || "");
+      setQueueInfo(
+        data.queue_position
+          ? { position: data.queue_position, wait: data.estimated_wait_seconds }
+          : null
+      );
 
-        // Update scanning categories based on phase
-        const updatedCategories = [...scanningCategories];
-        
+      // Update scanning categories based on phase
+      setScanningCategories((prev) => {
+        const updatedCategories = prev.map((cat) => ({ ...cat }));
         if (data.phase === "crawling") {
           updatedCategories[0].progress = 40; // Clickables
           updatedCategories[1].progress = 20; // Titles
@@ -104,52 +129,87 @@ export default function ScanningPage() {
           updatedCategories[4].progress = 70;  // Graphics
         } else if (data.phase === "reporting") {
           // All categories complete during reporting
-          updatedCategories.forEach((cat, index) => {
-            updatedCategories[index].progress = 100;
-            updatedCategories[index].completed = true;
+          updatedCategories.forEach((cat) => {
+            cat.progress = 100;
+            cat.completed = true;
           });
         }
+        return updatedCategories;
+      });
 
-        setScanningCategories(updatedCategories);
+      if (data.status === "completed" || data.status === "partial") {
+        finished = true;
+        setProgress(100);
 
-        // Map phases to overall progress
-        const progressMap = { crawling: 33, analyzing: 66, reporting: 90 };
-
-        if (data.status === "completed") {
-          setProgress(100);
-          clearInterval(interval);
-
-          // Fetch full report and save locally
-          const { ok: okReport, data: reportData } = await getReport(id);
-          if (okReport && reportData) {
-            localStorage.setItem(
-              "adaptivetest:lastReport",
-              JSON.stringify(reportData)
-            );
-          }
-          toast.success("✅ Scan completed! Redirecting to your report…");
-          
-          // FIXED: Redirect to dynamic route with the scan ID
-          setTimeout(() => router.push(`/result/${id}`), 1500);
-          
-        } else if (data.status === "failed") {
-          clearInterval(interval);
-          toast.error("❌ Scan failed. Please try again.");
-        } else {
-          // Either use mapped progress or keep slowly increasing
-          setProgress((prev) =>
-            progressMap[data.phase]
-              ? progressMap[data.phase]
-              : Math.min(prev + 5, 95)
+        // Fetch the first report page (with the whole scan's summary) and save it locally
+        const { ok: okReport, data: reportData } = await apiRef.current.getReport(id);
+        if (okReport && reportData) {
+          localStorage.setItem(
+            "adaptivetest:lastReport",
+            JSON.stringify(reportData)
           );
         }
-      } catch {
-        // ignore transient errors
+        toast.success(
+          data.status === "partial"
+            ? "⏱️ Scan stopped early. Redirecting to the partial report…"
+            : "✅ Scan completed! Redirecting to your report…"
+        );
+        
+        // FIXED: Redirect to dynamic route with the scan ID
+        setTimeout(() => router.push(`/result/${id}`), 1500);
+        return true;
+      }
+      if (data.status === "failed") {
+        finished = true;
+        toast.error("❌ Scan failed. Please try again.");
+        return true;
+      }
+      if (data.status === "cancelled" && (data.done || data.stage === "done")) {
+        finished = true;
+        return true;
+      }
+      // Real stage progress from the scan pipeline; never moves backwards
+      if (typeof data.progress === "number") {
+        setProgress((prev) => Math.max(prev, data.progress));
       }
-    }, 5000); // poll every 5s
+      return false;
+    };
+
+    const startPolling = () => {
+      if (interval || finished) return;
+      interval = setInterval(async () => {
+        try {
+          const { ok, data } = await apiRef.current.getScanStatus(id);
+          if (!ok || !data) return;
+          if (await applyUpdate(data)) clearInterval(interval);
+        } catch {
+          // ignore transient errors
+        }
+      }, 5000); // poll every 5s
+    };
+
+    if (typeof window !== "undefined" && "EventSource" in window) {
+      source = new EventSource(apiRef.current.scanEventsUrl(id));
+      source.addEventListener("progress", async (event) => {
+        const data = JSON.parse(event.data);
+        if (data.done) source.close();
+        await applyUpdate(data);
+      });
+      source.onerror = () => {
+        // Stream dropped (proxy buffering, server restart): keep going by polling
+        source.close();
+        startPolling();
+      };
+    } else {
+      startPolling();
+    }
 
-    return () => clearInterval(interval);
-  }, [id, getScanStatus, getReport, router, scanUrl, scanningCategories]);
+    return () => {
+      finished = true;
+      if (source) source.close();
+      if (interval) clearInterval(interval);
+    };
+  }, [id, router]);
 
   return (
     <div className="min-h-screen bg-white text-black flex flex-col">
@@ -225,7 +285,28 @@ export default function ScanningPage() {
                     style={{ width: `${progress}%` }}
                   />
                 </div>
-                <p className="text-center text-2xl font-semibold">{progress}% Complete</p>
+                {queueInfo ? (
+                  <p className="text-center text-2xl font-semibold">
+                    Waiting in queue: position {queueInfo.position}
+                    {queueInfo.wait ? ` (about ${Math.ceil(queueInfo.wait / 60)} min)` : ""}
+                  </p>
+                ) : (
+                  <p className="text-center text-2xl font-semibold">{progress}% Complete</p>
+                )}
+                {stageMessage && (
+                  <p className="text-center text-gray-600 mt-2">{stageMessage}</p>
+                )}
+                {(status === "pending" || status === "scanning") && (
+                  <div className="text-center mt-4">
+                    <button
+                      onClick={handleCancel}
+                      disabled={isCancelling}
+                      className="px-6 py-2 border border-[#A44A3F] text-[#A44A3F] rounded-lg disabled:opacity-50"
+                    >
+                      {isCancelling ? "Cancelling…" : "Cancel scan"}
+                    </button>
+                  </div>
+                )}
               </div>
             )}
 
@@ -294,6 +375,14 @@ export default function ScanningPage() {
           )}
 
           {/* Error State */}
+          {status === "cancelled" && (
+            <div className="bg-gray-50 border border-gray-200 rounded-2xl p-8 text-center mt-8">
+              <p className="text-gray-700 text-xl">
+                🛑 Scan cancelled before any issues were found.
+              </p>
+            </div>
+          )}
+
           {status === "failed" && (
             <div className="bg-red-50 border border-red-200 rounded-2xl p-8 text-center mt-8">
               <p className="text-red-700 text-xl">